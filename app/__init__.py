@@ -2,6 +2,7 @@
 
 from flask import Flask, redirect
 from app.database import DatabaseConnection
+from app.utils.startup import get_startup_mode, startup_report, warm_in_background
 import logging
 from app.routes.manager_ml import manager_ml_bp
 
@@ -32,13 +33,26 @@ def create_app():
     app.register_blueprint(manager_ml_bp)
     logger.info("Flask app created with configuration")
     
-    # ==================== DATABASE TEST ====================
-    try:
-        test_conn = DatabaseConnection.get_connection()
-        test_conn.close()
-        logger.info("✓ Database connection successful")
-    except Exception as e:
-        logger.warning(f"⚠️ Database connection test failed: {e}")
+    # ==================== STARTUP MODE ====================
+    # eager: test DB and load chatbot/ML now | lazy: load on first use | warm: load in background
+    startup_mode = get_startup_mode()
+    app.config['STARTUP_MODE'] = startup_mode
+    logger.info(f"Startup mode: {startup_mode}")
+    
+    if startup_mode == 'eager':
+        _check_database()
+        from app.chatbot import get_chatbot
+        from app.ml_helper import get_ml_helper
+        get_chatbot()
+        get_ml_helper()
+    elif startup_mode == 'warm':
+        from app.chatbot import get_chatbot
+        from app.ml_helper import get_ml_helper
+        warm_in_background([
+            ('database', _check_database),
+            ('chatbot', get_chatbot),
+            ('ml_helper', get_ml_helper)
+        ])
     
     # ==================== REGISTER BLUEPRINTS ====================
     try:
@@ -192,5 +206,19 @@ def create_app():
         </html>
         ''', 500
     
+    if startup_mode == 'eager':
+        startup_report.log()
+    
     logger.info("App initialization complete")
     return app
+
+
+def _check_database():
+    """Open and close one connection to verify the database is reachable"""
+    with startup_report.track('database'):
+        try:
+            test_conn = DatabaseConnection.get_connection()
+            test_conn.close()
+            logger.info("✓ Database connection successful")
+        except Exception as e:
+            logger.warning(f"⚠️ Database connection test failed: {e}")
@@ -1,39 +1,103 @@
 # app/chatbot.py - WORKING VERSION with correct model
 
-import google.generativeai as genai
+from app.utils.startup import startup_report
+from app.utils.cache import TTLCache
+from app.chatbot_upstream import create_upstream, UpstreamClient
+from app.chatbot_intents import INTENTS, DEFAULT_ANSWER, IntentMatcher
 import os
+import re
+import threading
+import unicodedata
 import logging
 
 logger = logging.getLogger(__name__)
 
+# ==================== MESSAGE NORMALIZATION ====================
+
+# Tashkeel, Quranic marks and tatweel
+_ARABIC_MARKS = re.compile('[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+_ARABIC_LETTERS = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي'})
+_PUNCTUATION = re.compile(r'[^\w\s]', re.UNICODE)
+_WHITESPACE = re.compile(r'\s+')
+
+# Messages about the student's own results are never served from the cache
+_PERSONAL_MARKERS = (
+    'درجتي', 'درجاتي', 'ادائي', 'نتيجتي', 'نتايجي', 'معدلي', 'مستواي', 'تقديري', 'امتحاني', 'اسمي',
+    'my grade', 'my score', 'my performance', 'my result', 'my average', 'my exam', 'my name', 'my level'
+)
+
+
+def normalize_message(text):
+    """Fold case, Arabic diacritics/letter variants, punctuation and whitespace"""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    text = _ARABIC_MARKS.sub('', text).translate(_ARABIC_LETTERS)
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def is_personalized(normalized_message):
+    """True if the (normalized) message asks about the student's own data"""
+    return any(marker in normalized_message for marker in _PERSONAL_MARKERS)
+
+
+def context_bucket(student_context):
+    """Coarse, shareable level derived from the student's context"""
+    if not student_context:
+        return 'none'
+    try:
+        avg = float(student_context.get('avg_score'))
+    except (TypeError, ValueError):
+        return 'new'
+    if avg >= 80:
+        return 'high'
+    elif avg >= 60:
+        return 'mid'
+    return 'low'
+
+
+_BUCKET_DESCRIPTIONS = {
+    'new': 'طالب جديد لم يؤدِ امتحانات بعد',
+    'low': 'مستوى الطالب: يحتاج تحسين (أقل من 60%)',
+    'mid': 'مستوى الطالب: متوسط (60% - 80%)',
+    'high': 'مستوى الطالب: متفوق (أعلى من 80%)'
+}
+
+
 class StudentChatbot:
     """Chatbot ذكي مع Google API"""
 
+    # Shared answers to common questions
+    CACHE_SIZE = 1000
+    CACHE_TTL = 3600
+    
+    # Course material retrieval
+    RETRIEVAL_K = 3
+    CONFIDENT_COVERAGE = 0.75   # answer from the notes without calling the upstream
+    GROUNDING_COVERAGE = 0.5    # minimum coverage for an excerpt to go into the prompt
+    GROUNDING_CHARS = 300
+    PASSAGE_CHARS = 800
+
     def __init__(self):
         """Initialize chatbot"""
         self.use_api = False
-        self.model = None
+        self.client = None
+        self.response_cache = TTLCache(maxsize=self.CACHE_SIZE, ttl=self.CACHE_TTL)
+        self.cache_bypasses = 0
+        self.intents = IntentMatcher(INTENTS, DEFAULT_ANSWER, normalize=normalize_message)
+        
+        # Local course material; built offline with build_course_index.py
+        from app.course_index import get_course_index
+        self.course_index = get_course_index()
+        self.local_answers = 0
 
         try:
-            api_key = os.getenv('GEMINI_API_KEY')
-
-            if api_key:
-                try:
-                    logger.info("Configuring Gemini API...")
-                    genai.configure(api_key=api_key)
-                    self.model = genai.GenerativeModel('gemini-2.5-flash')
-                    self.use_api = True
-                    logger.info("✓ Using Google Gemini API - gemini-2.5-flash")
-
-                except Exception as e:
-                    logger.warning(f"API failed: {str(e)}")
-                    self.use_api = False
-            else:
-                logger.warning("No API key")
-                self.use_api = False
+            upstream = create_upstream()
+            if upstream:
+                self.client = UpstreamClient(upstream)
+                self.use_api = True
 
         except Exception as e:
-            logger.error(f"Init error: {str(e)}")
+            logger.warning(f"API failed: {str(e)}")
             self.use_api = False
 
     
@@ -45,26 +109,150 @@ class StudentChatbot:
             
             logger.info(f"Processing: {user_message[:50]}...")
             
+            hits = self._retrieve(user_message)
+            
             # Try API
-            if self.use_api and self.model:
-                try:
-                    prompt = self._build_prompt(user_message, student_context)
-                    response = self.model.generate_content(prompt)
-                    
-                    if response and response.text:
-                        logger.info("✓ API response received")
-                        return response.text
-                except Exception as e:
-                    logger.warning(f"API error: {str(e)}")
+            if self.use_api and self.client:
+                if self._is_confident(hits):
+                    # The notes answer this directly; no upstream call needed
+                    self.local_answers += 1
+                    return self._answer_from_material(hits)
+                
+                cache_key, cached, prompt = self._prepare(user_message, student_context, hits)
+                if cached is not None:
+                    logger.info("✓ Cached response")
+                    return cached
+                
+                # Bounded, deadline-limited call; None means busy/open circuit/timeout/error
+                text = self.client.generate(prompt)
+                
+                if text:
+                    logger.info("✓ API response received")
+                    if cache_key is not None:
+                        self.response_cache.set(cache_key, text)
+                    return text
             
             # Fallback to local
-            return self._get_local_response(user_message)
+            return self._get_local_response(user_message, student_context, hits)
         
         except Exception as e:
             logger.error(f"Error: {str(e)}")
             return "❌ خطأ. حاول مرة أخرى."
     
-    def _build_prompt(self, user_message, student_context):
+    def stream_response(self, user_message, student_context=None):
+        """
+        Yield the response in chunks as they arrive from the upstream
+
+        Cached and local answers are yielded in line-sized chunks. If the
+        upstream fails before its first chunk the local answer is used
+        instead; only complete upstream answers are cached.
+        """
+        if not user_message or len(user_message.strip()) == 0:
+            yield "⚠️ الرسالة فارغة."
+            return
+        
+        logger.info(f"Streaming: {user_message[:50]}...")
+        
+        hits = self._retrieve(user_message)
+        
+        if self.use_api and self.client:
+            if self._is_confident(hits):
+                self.local_answers += 1
+                yield from self._chunk_text(self._answer_from_material(hits))
+                return
+            
+            cache_key, cached, prompt = self._prepare(user_message, student_context, hits)
+            if cached is not None:
+                logger.info("✓ Cached response")
+                yield from self._chunk_text(cached)
+                return
+            
+            stream = self.client.stream(prompt)
+            if stream is not None:
+                # Only shareable answers are kept, and only to fill the cache
+                parts = [] if cache_key is not None else None
+                for chunk in stream:
+                    if parts is not None:
+                        parts.append(chunk)
+                    yield chunk
+                
+                if stream.completed and parts:
+                    self.response_cache.set(cache_key, ''.join(parts))
+                if stream.started:
+                    return
+        
+        # Fallback to local
+        yield from self._chunk_text(self._get_local_response(user_message, student_context, hits))
+    
+    @staticmethod
+    def _chunk_text(text):
+        """Split a ready answer into line-sized chunks"""
+        return text.splitlines(keepends=True) or [text]
+    
+    def _retrieve(self, user_message):
+        """Course material matching the message (empty if there is no index)"""
+        try:
+            return self.course_index.search(user_message, k=self.RETRIEVAL_K)
+        except Exception as e:
+            logger.warning(f"Course index search failed: {str(e)}")
+            return []
+    
+    def _is_confident(self, hits):
+        """True if the top hit is a notes passage covering most of the question"""
+        return bool(hits) and hits[0]['kind'] == 'note' and hits[0]['coverage'] >= self.CONFIDENT_COVERAGE
+    
+    def _answer_from_material(self, hits):
+        """Answer built from retrieved course material only"""
+        top = hits[0]
+        if top['kind'] == 'note':
+            body = top['body'][:self.PASSAGE_CHARS]
+            return f"📖 **من ملاحظات مقرر {top['course']}:**\n{body}"
+        
+        courses = []
+        for hit in hits:
+            if hit['course'] and hit['course'] not in courses:
+                courses.append(hit['course'])
+        return ("📚 **هذا الموضوع ضمن:** " + '، '.join(courses) +
+                "\n• راجع محاضرات المقرر\n• حل أسئلة التدريب عليه\n• اسأل المحاضر عن النقاط الصعبة")
+    
+    def _material_context(self, hits):
+        """Short course excerpts to ground the prompt, bounded in size"""
+        lines = []
+        for hit in hits:
+            if hit['coverage'] < self.GROUNDING_COVERAGE:
+                continue
+            if hit['kind'] == 'note':
+                lines.append(f"- [{hit['course']}] {hit['body'][:self.GROUNDING_CHARS]}")
+            elif hit['course']:
+                lines.append(f"- المقرر: {hit['course']}")
+        return '\n'.join(lines)
+    
+    def _prepare(self, user_message, student_context, hits=None):
+        """
+        Work out the cache key and the prompt for a message
+
+        Returns:
+            tuple: (cache_key or None, cached answer or None, prompt)
+        """
+        normalized = normalize_message(user_message)
+        cache_key = None
+        prompt_context = student_context
+        
+        if normalized and not is_personalized(normalized):
+            # Shareable answer: key on the message and a coarse level only,
+            # and keep personal details out of the prompt
+            bucket = context_bucket(student_context)
+            cache_key = (normalized, bucket)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cache_key, cached, None
+            prompt_context = _BUCKET_DESCRIPTIONS.get(bucket)
+        else:
+            self.cache_bypasses += 1
+        
+        return cache_key, None, self._build_prompt(user_message, prompt_context, self._material_context(hits or []))
+    
+    def _build_prompt(self, user_message, student_context, material=None):
         """Build prompt"""
         system = """أنت مساعد تعليمي ذكي.
 
@@ -83,24 +271,31 @@ class StudentChatbot:
         if student_context:
             system += f"\n\nالطالب: {student_context}"
         
+        if material:
+            system += f"\n\nمن محتوى المقررات (استخدمه إن كان مفيداً):\n{material}"
+        
         return f"{system}\n\nالسؤال: {user_message}\n\nالإجابة:"
     
-    def _get_local_response(self, user_message):
-        """Local response"""
-        import random
-        
-        message = user_message.lower()
+    def _get_local_response(self, user_message, student_context=None, hits=None):
+        """Local response from the intent table, then from course material"""
+        normalized = normalize_message(user_message)
+        relevant = [hit for hit in hits or [] if hit['coverage'] >= self.GROUNDING_COVERAGE]
+        if relevant and not self.intents.match(normalized):
+            return self._answer_from_material(relevant)
         
-        if any(w in message for w in ['ذاكر', 'دراسة', 'study']):
-            return "📚 **نصائح دراسية:**\n• ذاكر بانتظام يومياً\n• اقسم الدرس لأجزاء\n• خذ فترات راحة\n• اختبر نفسك\n• نم جيداً"
-        elif any(w in message for w in ['امتحان', 'exam', 'test']):
-            return "📝 **نصائح امتحان:**\n• اقرأ الأسئلة كاملة\n• خطط وقتك\n• ابدأ بالسهل\n• تحقق من الإجابات\n• استرخِ"
-        elif any(w in message for w in ['تركيز', 'focus']):
-            return "🧠 **زيادة التركيز:**\n• ابعد الجوال\n• مكان هادئ\n• اشرب ماء\n• فترات راحة\n• أوقات مناسبة"
-        elif any(w in message for w in ['مرحبا', 'hello', 'hi']):
-            return "👋 **مرحباً!** أنا مساعدك الدراسي الذكي.\n\nاسأل عن:\n✓ نصائح دراسية\n✓ امتحانات\n✓ تركيز\n✓ تحفيز\n\nماذا تريد؟ 😊"
-        else:
-            return "💭 **يمكنك السؤال عن:**\n✓ نصائح دراسية\n✓ امتحانات\n✓ تركيز\n✓ تحفيز\n✓ أي موضوع دراسي!\n\nاسأل سؤالاً محدداً 😊"
+        name = (student_context or {}).get('name') or 'صديقي'
+        return self.intents.respond(normalized, {'name': name})
+    
+    def upstream_stats(self):
+        """Upstream call counters and circuit breaker state"""
+        return self.client.stats() if self.client else {'upstream': None}
+    
+    def cache_stats(self):
+        """Response cache counters"""
+        stats = self.response_cache.stats()
+        stats['bypasses'] = self.cache_bypasses
+        stats['answered_from_material'] = self.local_answers
+        return stats
     
     def get_study_tips(self, topic):
         return self.get_response(f"أعطني نصائح دراسية لـ {topic}")
@@ -109,7 +304,15 @@ class StudentChatbot:
         return self.get_response("كيف أحسن أدائي الدراسي")
 
 
-chatbot_instance = StudentChatbot()
+# Created on first use so workers that never chat skip the Gemini import
+chatbot_instance = None
+_instance_lock = threading.Lock()
 
 def get_chatbot():
+    global chatbot_instance
+    if chatbot_instance is None:
+        with _instance_lock:
+            if chatbot_instance is None:
+                with startup_report.track('chatbot'):
+                    chatbot_instance = StudentChatbot()
     return chatbot_instance
@@ -0,0 +1,142 @@
+# app/chatbot_intents.py - Offline intent matching for the chatbot (no API key needed)
+
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== INTENT TABLE ====================
+# priority: higher wins when a message matches several intents
+# patterns: Arabic patterns match inside words (و/ال/بـ prefixes, suffixes),
+#           Latin patterns match whole words only
+# answer:   str.format template; {name} is the student's name when known
+
+INTENTS = [
+    {
+        'name': 'study_tips',
+        'priority': 50,
+        'patterns': ['ذاكر', 'مذاكره', 'دراسه', 'ادرس', 'study', 'studying', 'revise', 'revision'],
+        'answer': "📚 **نصائح دراسية:**\n• ذاكر بانتظام يومياً\n• اقسم الدرس لأجزاء\n• خذ فترات راحة\n• اختبر نفسك\n• نم جيداً"
+    },
+    {
+        'name': 'exam_tips',
+        'priority': 45,
+        'patterns': ['امتحان', 'اختبار', 'exam', 'exams', 'test', 'tests', 'quiz'],
+        'answer': "📝 **نصائح امتحان:**\n• اقرأ الأسئلة كاملة\n• خطط وقتك\n• ابدأ بالسهل\n• تحقق من الإجابات\n• استرخِ"
+    },
+    {
+        'name': 'exam_anxiety',
+        'priority': 60,
+        'patterns': ['قلق', 'توتر', 'خايف', 'خوف', 'رهبه', 'anxiety', 'anxious', 'stress', 'stressed', 'nervous'],
+        'answer': "🌿 **التعامل مع القلق:**\n• تنفس ببطء وعمق\n• راجع ما تعرفه بدل ما ينقصك\n• نم جيداً قبل الامتحان\n• لا تقارن نفسك بغيرك\n• أنت مستعد أكثر مما تظن 💪"
+    },
+    {
+        'name': 'focus',
+        'priority': 40,
+        'patterns': ['تركيز', 'اركز', 'مشتت', 'تشتت', 'focus', 'concentrate', 'concentration', 'distracted'],
+        'answer': "🧠 **زيادة التركيز:**\n• ابعد الجوال\n• مكان هادئ\n• اشرب ماء\n• فترات راحة\n• أوقات مناسبة"
+    },
+    {
+        'name': 'memorization',
+        'priority': 42,
+        'patterns': ['حفظ', 'احفظ', 'انسي', 'بنسي', 'نسيان', 'memorize', 'memorise', 'remember', 'forget'],
+        'answer': "🔁 **تقوية الحفظ:**\n• راجع على فترات متباعدة\n• لخص بكلماتك\n• اشرح الدرس لغيرك\n• استخدم الخرائط الذهنية\n• اختبر نفسك بدل إعادة القراءة"
+    },
+    {
+        'name': 'time_management',
+        'priority': 38,
+        'patterns': ['وقت', 'جدول', 'تنظيم', 'تاجيل', 'time', 'schedule', 'procrastinate', 'procrastination'],
+        'answer': "⏰ **تنظيم الوقت:**\n• اعمل جدول أسبوعي واقعي\n• ابدأ بالمهام الأصعب\n• جلسات 25 دقيقة + راحة 5\n• حدد هدفاً لكل جلسة\n• راجع جدولك كل أسبوع"
+    },
+    {
+        'name': 'motivation',
+        'priority': 35,
+        'patterns': ['تحفيز', 'حافز', 'محبط', 'زهقت', 'ملل', 'motivation', 'motivated', 'bored', 'give up'],
+        'answer': "🚀 **تحفيز:**\n• تذكر هدفك الكبير\n• احتفل بكل تقدم صغير\n• ابدأ بخمس دقائق فقط\n• كل خطوة تقربك من النجاح\n\nأنت قادر يا {name}! 💪"
+    },
+    {
+        'name': 'thanks',
+        'priority': 20,
+        'patterns': ['شكرا', 'متشكر', 'تسلم', 'thanks', 'thank you', 'thx'],
+        'answer': "😊 العفو يا {name}! بالتوفيق في دراستك 🌟"
+    },
+    {
+        'name': 'greeting',
+        'priority': 10,
+        'patterns': ['مرحبا', 'اهلا', 'السلام عليكم', 'hello', 'hi', 'hey'],
+        'answer': "👋 **مرحباً!** أنا مساعدك الدراسي الذكي.\n\nاسأل عن:\n✓ نصائح دراسية\n✓ امتحانات\n✓ تركيز\n✓ تحفيز\n\nماذا تريد؟ 😊"
+    }
+]
+
+DEFAULT_ANSWER = "💭 **يمكنك السؤال عن:**\n✓ نصائح دراسية\n✓ امتحانات\n✓ تركيز\n✓ تحفيز\n✓ أي موضوع دراسي!\n\nاسأل سؤالاً محدداً 😊"
+
+
+# ==================== MATCHER ====================
+
+class _TemplateValues(dict):
+    """Leave unknown {placeholders} in a template as they are"""
+
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
+class IntentMatcher:
+    """
+    All intent patterns compiled into one alternation regex.
+
+    A message is scanned once with finditer; each hit is mapped back to its
+    intent through the pattern -> intent table. The intent with the highest
+    priority wins, then the one with more matched patterns.
+    """
+
+    def __init__(self, intents, default_answer, normalize=None):
+        """
+        Args:
+            intents (list): Intent dicts (name, priority, patterns, answer)
+            default_answer (str): Answer template when nothing matches
+            normalize (callable): Applied to patterns here and expected to have
+                                  been applied to messages passed to match()
+        """
+        normalize = normalize or (lambda text: text.lower())
+        self.intents = {intent['name']: intent for intent in intents}
+        self.default_answer = default_answer
+
+        self._pattern_intent = {}
+        for intent in intents:
+            for pattern in intent['patterns']:
+                key = normalize(pattern)
+                if key and key not in self._pattern_intent:
+                    self._pattern_intent[key] = intent['name']
+
+        # Longest first so the alternation prefers "thank you" over "thank"
+        alternatives = []
+        for key in sorted(self._pattern_intent, key=len, reverse=True):
+            escaped = re.escape(key)
+            alternatives.append(rf'\b{escaped}\b' if key.isascii() else escaped)
+        self._regex = re.compile('|'.join(alternatives)) if alternatives else None
+
+        logger.info(f"✓ Intent matcher compiled: {len(self.intents)} intents, {len(self._pattern_intent)} patterns")
+
+    def match(self, normalized_message):
+        """
+        Returns:
+            str: Name of the best matching intent, or None
+        """
+        if not self._regex or not normalized_message:
+            return None
+
+        hits = {}
+        for m in self._regex.finditer(normalized_message):
+            name = self._pattern_intent[m.group(0)]
+            hits.setdefault(name, set()).add(m.group(0))
+
+        if not hits:
+            return None
+        return max(hits, key=lambda name: (self.intents[name]['priority'], len(hits[name])))
+
+    def respond(self, normalized_message, values=None):
+        """Render the answer of the best matching intent (or the default answer)"""
+        name = self.match(normalized_message)
+        template = self.intents[name]['answer'] if name else self.default_answer
+        return template.format_map(_TemplateValues(values or {}))
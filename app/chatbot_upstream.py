@@ -0,0 +1,302 @@
+# app/chatbot_upstream.py - Upstream LLM backends for the chatbot with deadlines and concurrency limits
+
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.single_flight import SingleFlight
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import os
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== UPSTREAMS ====================
+
+class GeminiUpstream:
+    """Google Gemini via google.generativeai"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name='gemini-2.5-flash'):
+        # Heavy import, deferred until the chatbot is first used
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.model_name = model_name
+
+    def generate(self, prompt, timeout):
+        response = self.model.generate_content(prompt, request_options={'timeout': timeout})
+        return response.text if response else None
+
+    def stream(self, prompt, timeout):
+        response = self.model.generate_content(prompt, stream=True, request_options={'timeout': timeout})
+        for chunk in response:
+            text = getattr(chunk, 'text', None)
+            if text:
+                yield text
+
+
+class HTTPStubUpstream:
+    """
+    Local HTTP stub (see chatbot_stub.py) for testing latency behaviour offline.
+
+    POST {url}/generate  {"prompt": "..."}  ->  {"text": "..."}
+    POST {url}/stream    {"prompt": "..."}  ->  one {"text": "..."} JSON object per line
+    """
+
+    name = 'stub'
+
+    def __init__(self, url):
+        import requests
+        self._session = requests.Session()
+        self.url = url.rstrip('/')
+
+    def generate(self, prompt, timeout):
+        response = self._session.post(f"{self.url}/generate", json={'prompt': prompt}, timeout=timeout)
+        response.raise_for_status()
+        return response.json().get('text')
+
+    def stream(self, prompt, timeout):
+        import json
+        with self._session.post(f"{self.url}/stream", json={'prompt': prompt}, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            # chunk_size=None: hand over each chunk as it arrives instead of filling a buffer
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if line:
+                    text = json.loads(line).get('text')
+                    if text:
+                        yield text
+
+
+def create_upstream():
+    """
+    Build the configured upstream, or None if there is none.
+
+    CHATBOT_UPSTREAM=gemini (default, needs GEMINI_API_KEY) | stub (CHATBOT_STUB_URL)
+    """
+    kind = os.getenv('CHATBOT_UPSTREAM', 'gemini').strip().lower()
+
+    if kind == 'stub':
+        url = os.getenv('CHATBOT_STUB_URL', 'http://127.0.0.1:8765')
+        logger.info(f"✓ Using local chatbot stub at {url}")
+        return HTTPStubUpstream(url)
+
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        logger.warning("No API key")
+        return None
+
+    logger.info("Configuring Gemini API...")
+    upstream = GeminiUpstream(api_key)
+    logger.info(f"✓ Using Google Gemini API - {upstream.model_name}")
+    return upstream
+
+
+# ==================== CLIENT ====================
+
+class UpstreamStream:
+    """
+    Iterator over chunks produced by an upstream on a pool thread.
+
+    Chunks pass through a small bounded queue, so a stream never buffers
+    more than QUEUE_SIZE chunks regardless of how slowly the client reads.
+    `completed` is True only if the upstream finished without error.
+    """
+
+    QUEUE_SIZE = 8
+
+    def __init__(self, client, timeout, max_seconds):
+        self._client = client
+        self._timeout = timeout
+        self._deadline = time.monotonic() + max_seconds
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._stop = threading.Event()
+        self.started = False
+        self.completed = False
+        self._finished = False
+
+    def produce(self, chunks):
+        """Runs on the pool thread: push upstream chunks until done or cancelled"""
+        try:
+            for chunk in chunks:
+                if not self._put(('chunk', chunk)):
+                    return
+            self._put(('done', None))
+        except Exception as e:
+            self._put(('error', e))
+
+    def _put(self, item):
+        # Give up at the deadline too, in case the stream is never read
+        while not self._stop.is_set() and time.monotonic() < self._deadline:
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        try:
+            while True:
+                wait = min(self._timeout, self._deadline - time.monotonic())
+                if wait <= 0:
+                    raise queue.Empty
+                kind, value = self._queue.get(timeout=wait)
+                if kind == 'chunk':
+                    self.started = True
+                    yield value
+                elif kind == 'done':
+                    self.completed = True
+                    self._finished = True
+                    self._client._finish(True)
+                    return
+                else:
+                    self._finished = True
+                    self._client._finish(False, 'failures')
+                    logger.warning(f"API error: {str(value)}")
+                    return
+        except queue.Empty:
+            self._finished = True
+            self._client._finish(False, 'timeouts')
+            logger.warning(f"⏱️ Chatbot upstream stream stalled for {self._timeout}s")
+        finally:
+            # Client went away or we gave up: let the producer thread exit
+            self._stop.set()
+            if not self._finished:
+                # Abandoned mid-stream (e.g. the SSE client disconnected): neither a
+                # success nor a failure, but a half-open probe must not stay taken
+                self._client.breaker.release_probe()
+
+
+class UpstreamClient:
+    """
+    Runs upstream calls on a bounded thread pool.
+
+    - every call has a hard deadline (the request thread stops waiting)
+    - at most max_concurrency calls are in flight; extra callers are
+      rejected immediately instead of queueing behind a slow upstream
+    - a circuit breaker stops calling an upstream that keeps failing
+    - identical prompts already in flight are joined, not sent again
+
+    A rejected or failed call returns None and the caller falls back to
+    its local answer.
+    """
+
+    def __init__(self, upstream, timeout=None, max_concurrency=None, breaker=None):
+        self.upstream = upstream
+        self.timeout = timeout if timeout is not None else float(os.getenv('CHATBOT_TIMEOUT', '8'))
+        self.max_concurrency = max_concurrency or int(os.getenv('CHATBOT_MAX_CONCURRENCY', '4'))
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='chatbot-upstream')
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._inflight = SingleFlight()
+        self._lock = threading.Lock()
+        self._counters = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'rejected_busy': 0,
+            'rejected_open': 0
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def generate(self, prompt):
+        """
+        Call the upstream with a deadline, sharing the call with any
+        concurrent caller that sends the same prompt
+
+        Returns:
+            str: Upstream text, or None if busy / circuit open / timed out / failed
+        """
+        try:
+            text, _ = self._inflight.do(prompt, lambda: self._generate(prompt), timeout=self.timeout)
+        except TimeoutError:
+            return None
+        return text
+
+    def _generate(self, prompt):
+        if not self._acquire():
+            return None
+
+        try:
+            future = self._executor.submit(self.upstream.generate, prompt, self.timeout)
+        except Exception:
+            self._slots.release()
+            self.breaker.release_probe()
+            raise
+        # The slot is held until the upstream really returns, even after we stop waiting
+        future.add_done_callback(lambda f: self._slots.release())
+
+        try:
+            text = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self._finish(False, 'timeouts')
+            logger.warning(f"⏱️ Chatbot upstream timed out after {self.timeout}s")
+            return None
+        except Exception as e:
+            self._finish(False, 'failures')
+            logger.warning(f"API error: {str(e)}")
+            return None
+
+        self._finish(True)
+        return text
+
+    def _acquire(self):
+        """Take a concurrency slot and pass the breaker, or count the rejection"""
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected_busy')
+            return False
+        if not self.breaker.allow():
+            self._slots.release()
+            self._count('rejected_open')
+            return False
+        self._count('calls')
+        return True
+
+    def _finish(self, ok, counter=None):
+        if ok:
+            self._count('successes')
+            self.breaker.record_success()
+        else:
+            self._count(counter)
+            self.breaker.record_failure()
+
+    def stream(self, prompt, max_seconds=60):
+        """
+        Stream the upstream answer chunk by chunk
+
+        Each chunk must arrive within `timeout` seconds of the previous one and
+        the whole answer within `max_seconds`.
+
+        Returns:
+            UpstreamStream: Iterable of text chunks, or None if busy / circuit open
+        """
+        if not hasattr(self.upstream, 'stream') or not self._acquire():
+            return None
+
+        stream = UpstreamStream(self, self.timeout, max_seconds)
+        try:
+            future = self._executor.submit(stream.produce, self.upstream.stream(prompt, self.timeout))
+        except Exception:
+            self._slots.release()
+            self.breaker.release_probe()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        return stream
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['upstream'] = self.upstream.name
+        stats['timeout'] = self.timeout
+        stats['max_concurrency'] = self.max_concurrency
+        stats['breaker'] = self.breaker.stats()
+        stats['coalescing'] = self._inflight.stats()
+        return stats
@@ -0,0 +1,315 @@
+# app/course_index.py - Local BM25 retrieval over course material for the chatbot
+
+from app.database import DatabaseConnection
+from app.chatbot import normalize_message
+from contextlib import closing
+import hashlib
+import heapq
+import math
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Words that carry no meaning for retrieval (already normalized)
+_STOPWORDS = frozenset("""
+في من الي علي عن مع هذا هذه ذلك تلك هو هي هم انا انت نحن ما ماذا لماذا كيف متي اين هل لا نعم او ثم
+كان يكون ان انه التي الذي الذين كل بعض اي قد لقد عند بين بعد قبل حتي اذا لو ايه ازاي ده دي يا
+the a an of to in on for and or is are was were be been it this that what how why when where which who
+do does did can could should would i you we they he she me my your with about from as at by not no
+""".split())
+
+_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+
+
+def tokenize(text):
+    """Normalized terms of a text, without stopwords and with the Arabic article stripped"""
+    terms = []
+    for word in normalize_message(text).split():
+        if word in _STOPWORDS or len(word) < 2:
+            continue
+        for prefix in _PREFIXES:
+            if word.startswith(prefix) and len(word) - len(prefix) >= 3:
+                word = word[len(prefix):]
+                break
+        terms.append(word)
+    return terms
+
+
+class CourseIndex:
+    """
+    BM25 inverted index stored in a local SQLite file.
+
+    Documents:
+        course:<Course_ID>   course name and its topic
+        question:<Quest_ID>  question text and the course that uses it
+                             (choices are left out so exam answers never leak)
+        note:<path>#<n>      a passage from a notes file under COURSE_NOTES_DIR;
+                             <course>/<anything>.md|.txt, or <course>.md|.txt
+
+    refresh() only re-indexes documents whose content hash changed, so it is
+    cheap to run whenever questions or notes are edited.
+    """
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+
+    # Notes are split on blank lines and merged into passages of about this size
+    PASSAGE_CHARS = 800
+
+    FETCH_SIZE = 2000
+
+    def __init__(self, path=None, notes_dir=None):
+        self.path = path or os.getenv('COURSE_INDEX_PATH', os.path.join(_ROOT, 'instance', 'course_index.sqlite3'))
+        self.notes_dir = notes_dir or os.getenv('COURSE_NOTES_DIR', os.path.join(_ROOT, 'course_notes'))
+        self._write_lock = threading.Lock()
+
+    # ==================== STORAGE ====================
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _ensure_schema(self, conn):
+        conn.executescript("""
+        CREATE TABLE IF NOT EXISTS docs (
+            doc_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            course TEXT,
+            title TEXT,
+            body TEXT NOT NULL,
+            length INTEGER NOT NULL,
+            digest TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS postings (
+            term TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            tf INTEGER NOT NULL,
+            dl INTEGER NOT NULL,
+            PRIMARY KEY (term, doc_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS ix_postings_doc ON postings (doc_id);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        """)
+
+    @property
+    def exists(self):
+        return os.path.exists(self.path)
+
+    # ==================== SOURCES ====================
+
+    def _db_documents(self):
+        """Yield (doc_id, kind, course, title, body) for courses and questions"""
+        course_query = """
+        SELECT c.Course_ID, c.name, t.name
+        FROM Course c
+        LEFT JOIN Topic t ON c.Topic_ID = t.Topic_ID
+        """
+        for course_id, course, topic in DatabaseConnection.fetch_all(course_query) or []:
+            body = f"{course} - {topic}" if topic else course
+            yield f"course:{course_id}", 'course', course, course, body
+
+        question_query = """
+        SELECT q.Quest_ID, q.Question_text, MIN(c.name)
+        FROM Question q
+        LEFT JOIN Exam_Question eq ON q.Quest_ID = eq.Quest_ID
+        LEFT JOIN Exam e ON eq.Exam_ID = e.Exam_ID
+        LEFT JOIN Course c ON e.Course_ID = c.Course_ID
+        WHERE q.Question_text IS NOT NULL
+        GROUP BY q.Quest_ID, q.Question_text
+        """
+        with DatabaseConnection.get_cursor() as cursor:
+            cursor.execute(question_query)
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+                if not rows:
+                    break
+                for quest_id, text, course in rows:
+                    yield f"question:{quest_id}", 'question', course, None, text
+
+    def _note_documents(self):
+        """Yield (doc_id, kind, course, title, body) for passages of the notes files"""
+        if not os.path.isdir(self.notes_dir):
+            return
+
+        for folder, _, files in os.walk(self.notes_dir):
+            for filename in sorted(files):
+                if not filename.lower().endswith(('.md', '.txt')):
+                    continue
+                full_path = os.path.join(folder, filename)
+                rel_path = os.path.relpath(full_path, self.notes_dir).replace(os.sep, '/')
+                course = rel_path.split('/')[0] if '/' in rel_path else os.path.splitext(filename)[0]
+                title = os.path.splitext(filename)[0]
+
+                with open(full_path, encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+
+                for n, passage in enumerate(self._passages(text)):
+                    yield f"note:{rel_path}#{n}", 'note', course, title, passage
+
+    def _passages(self, text):
+        """Blank-line separated paragraphs merged up to PASSAGE_CHARS"""
+        current = ''
+        for paragraph in text.split('\n\n'):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if current and len(current) + len(paragraph) > self.PASSAGE_CHARS:
+                yield current
+                current = ''
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+        if current:
+            yield current
+
+    # ==================== BUILD ====================
+
+    def refresh(self, full=False):
+        """
+        Bring the index up to date with the database and the notes folder
+
+        Args:
+            full (bool): Drop everything and re-index from scratch
+
+        Returns:
+            dict: Counts of added / updated / removed / unchanged documents
+        """
+        start = time.time()
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._write_lock, closing(self._connect()) as conn:
+            self._ensure_schema(conn)
+            if full:
+                conn.execute("DELETE FROM postings")
+                conn.execute("DELETE FROM docs")
+
+            known = dict(conn.execute("SELECT doc_id, digest FROM docs"))
+            seen = set()
+
+            for source in (self._db_documents(), self._note_documents()):
+                for doc_id, kind, course, title, body in source:
+                    seen.add(doc_id)
+                    digest = hashlib.sha1(f"{course}|{title}|{body}".encode('utf-8')).hexdigest()
+                    previous = known.get(doc_id)
+                    if previous == digest:
+                        counts['unchanged'] += 1
+                        continue
+
+                    if previous is not None:
+                        conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                        counts['updated'] += 1
+                    else:
+                        counts['added'] += 1
+                    self._index_document(conn, doc_id, kind, course, title, body, digest)
+
+            removed = [doc_id for doc_id in known if doc_id not in seen]
+            for doc_id in removed:
+                conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+            counts['removed'] = len(removed)
+
+            doc_count, total_length = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                ('doc_count', str(doc_count)),
+                ('avg_length', str(total_length / doc_count if doc_count else 0)),
+                ('built_at', str(time.time()))
+            ])
+            conn.commit()
+
+        counts['documents'] = doc_count
+        counts['seconds'] = round(time.time() - start, 2)
+        logger.info(f"✓ Course index refreshed: {counts}")
+        return counts
+
+    def _index_document(self, conn, doc_id, kind, course, title, body, digest):
+        # The course name and title are searchable too
+        terms = tokenize(f"{course or ''} {title or ''} {body}")
+        frequencies = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        length = len(terms)
+
+        conn.execute(
+            "INSERT OR REPLACE INTO docs (doc_id, kind, course, title, body, length, digest) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (doc_id, kind, course, title, body, length, digest)
+        )
+        conn.executemany(
+            "INSERT INTO postings (term, doc_id, tf, dl) VALUES (?, ?, ?, ?)",
+            [(term, doc_id, tf, length) for term, tf in frequencies.items()]
+        )
+
+    # ==================== SEARCH ====================
+
+    def search(self, text, k=3):
+        """
+        Top-k documents for a free-text query
+
+        Returns:
+            list: dicts with doc_id, kind, course, title, body, score and
+                  coverage (share of the query terms found in the document)
+        """
+        terms = set(tokenize(text))
+        if not terms or not self.exists:
+            return []
+
+        with closing(self._connect()) as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('doc_count', 'avg_length')"))
+            doc_count = int(meta.get('doc_count', 0))
+            avg_length = float(meta.get('avg_length', 0)) or 1.0
+            if not doc_count:
+                return []
+
+            scores = {}
+            matched = {}
+            for term in terms:
+                postings = conn.execute("SELECT doc_id, tf, dl FROM postings WHERE term = ?", (term,)).fetchall()
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for doc_id, tf, dl in postings:
+                    norm = tf + self.K1 * (1 - self.B + self.B * dl / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.K1 + 1) / norm
+                    matched[doc_id] = matched.get(doc_id, 0) + 1
+
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            if not top:
+                return []
+
+            placeholders = ','.join('?' * len(top))
+            docs = {
+                row[0]: row for row in conn.execute(
+                    f"SELECT doc_id, kind, course, title, body FROM docs WHERE doc_id IN ({placeholders})",
+                    [doc_id for doc_id, _ in top]
+                )
+            }
+
+        return [
+            {
+                'doc_id': doc_id,
+                'kind': docs[doc_id][1],
+                'course': docs[doc_id][2],
+                'title': docs[doc_id][3],
+                'body': docs[doc_id][4],
+                'score': round(score, 3),
+                'coverage': round(matched[doc_id] / len(terms), 3)
+            }
+            for doc_id, score in top if doc_id in docs
+        ]
+
+
+# Instance واحد
+course_index_instance = CourseIndex()
+
+
+def get_course_index():
+    """الحصول على instance الـ Course Index"""
+    return course_index_instance
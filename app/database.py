@@ -28,8 +28,8 @@ class DatabaseConnection:
         Trusted_Connection=yes;
         '''
     
-    @staticmethod
-    def get_connection():
+    @classmethod
+    def get_connection(cls):
         """
         Get a new database connection
         
@@ -40,15 +40,15 @@ class DatabaseConnection:
             Exception: If connection fails
         """
         try:
-            connection = pyodbc.connect(DatabaseConnection.get_connection_string())
+            connection = pyodbc.connect(cls.get_connection_string())
             return connection
         except Exception as e:
             logger.error(f"Database connection failed: {str(e)}")
             raise
     
-    @staticmethod
+    @classmethod
     @contextmanager
-    def get_cursor():
+    def get_cursor(cls):
         """
         Context manager for database cursor
         Automatically commits on success, rolls back on error
@@ -56,7 +56,7 @@ class DatabaseConnection:
         Yields:
             pyodbc.Cursor: Database cursor
         """
-        conn = DatabaseConnection.get_connection()
+        conn = cls.get_connection()
         cursor = conn.cursor()
         try:
             yield cursor
@@ -69,8 +69,8 @@ class DatabaseConnection:
             cursor.close()
             conn.close()
     
-    @staticmethod
-    def execute_query(query, params=None):
+    @classmethod
+    def execute_query(cls, query, params=None):
         """
         Execute INSERT, UPDATE, or DELETE query
         
@@ -81,15 +81,15 @@ class DatabaseConnection:
         Returns:
             int: Number of affected rows
         """
-        with DatabaseConnection.get_cursor() as cursor:
+        with cls.get_cursor() as cursor:
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
             return cursor.rowcount
     
-    @staticmethod
-    def fetch_all(query, params=None):
+    @classmethod
+    def fetch_all(cls, query, params=None):
         """
         Fetch all rows from SELECT query
         
@@ -100,7 +100,7 @@ class DatabaseConnection:
         Returns:
             list: List of tuples containing rows
         """
-        conn = DatabaseConnection.get_connection()
+        conn = cls.get_connection()
         cursor = conn.cursor()
         try:
             if params:
@@ -116,8 +116,8 @@ class DatabaseConnection:
             cursor.close()
             conn.close()
     
-    @staticmethod
-    def fetch_one(query, params=None):
+    @classmethod
+    def fetch_one(cls, query, params=None):
         """
         Fetch single row from SELECT query
         
@@ -128,7 +128,7 @@ class DatabaseConnection:
         Returns:
             tuple: Single row or None
         """
-        conn = DatabaseConnection.get_connection()
+        conn = cls.get_connection()
         cursor = conn.cursor()
         try:
             if params:
@@ -144,8 +144,8 @@ class DatabaseConnection:
             cursor.close()
             conn.close()
     
-    @staticmethod
-    def execute_scalar(query, params=None):
+    @classmethod
+    def execute_scalar(cls, query, params=None):
         """
         Execute query and return single scalar value
         Useful for COUNT, MAX, or SCOPE_IDENTITY()
@@ -157,11 +157,11 @@ class DatabaseConnection:
         Returns:
             Value or None
         """
-        result = DatabaseConnection.fetch_one(query, params)
+        result = cls.fetch_one(query, params)
         return result[0] if result else None
     
-    @staticmethod
-    def get_last_insert_id():
+    @classmethod
+    def get_last_insert_id(cls):
         """
         Get the last inserted identity value
         Uses SCOPE_IDENTITY() for SQL Server
@@ -169,4 +169,13 @@ class DatabaseConnection:
         Returns:
             int: Last inserted ID
         """
-        return DatabaseConnection.execute_scalar("SELECT CAST(SCOPE_IDENTITY() AS INT)")
+        return cls.execute_scalar("SELECT CAST(SCOPE_IDENTITY() AS INT)")
+
+
+class DWHConnection(DatabaseConnection):
+    """
+    Same helpers against the data warehouse (ITI_Examination_System_DWH)
+    Used by the ETL loaders in etl/
+    """
+    
+    DATABASE = 'ITI_Examination_System_DWH'
@@ -0,0 +1,320 @@
+# app/irt_calibration.py - Item Response Theory calibration of the question bank
+
+from app.database import DatabaseConnection
+from datetime import datetime
+import numpy as np
+from scipy import sparse
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IRTCalibrator:
+    """
+    Fits a 1PL (Rasch) or 2PL IRT model to all graded MCQ answers.
+
+    Responses are held as a sparse student x question CSR matrix; every
+    iteration evaluates the model only on observed cells (the CSR data
+    array) and reduces gradients with sparse mat-vec products, so cost is
+    linear in the number of answers.
+    """
+
+    # Rows fetched per round trip while streaming answers
+    FETCH_SIZE = 50000
+
+    # Questions with fewer responses keep their current Difficulty_Level
+    MIN_RESPONSES = 20
+
+    # Parameter bounds keep perfect / zero scores finite
+    THETA_BOUND = 6.0
+    B_BOUND = 6.0
+    A_MIN = 0.2
+    A_MAX = 4.0
+
+    # Newton steps are damped to this size per iteration
+    MAX_STEP = 1.0
+
+    # Gaussian prior precisions (theta ~ N(0,1), b ~ N(0,2), log a ~ N(0,0.5))
+    THETA_PRIOR = 1.0
+    B_PRIOR = 0.25
+    A_PRIOR = 4.0
+
+    # 2PL alternates three blocks and needs more sweeps to settle
+    MAX_ITER = {'1PL': 100, '2PL': 300}
+
+    def __init__(self, model='2PL', max_iter=None, tol=1e-3):
+        if model not in ('1PL', '2PL'):
+            raise ValueError(f"Unknown IRT model: {model}")
+        self.model = model
+        self.max_iter = max_iter or self.MAX_ITER[model]
+        self.tol = tol
+
+    # ==================== DATA ====================
+
+    def load_responses(self):
+        """
+        Stream (student, question, correct) triples and build the sparse matrix.
+
+        Only the latest answer of a student to each question is kept.
+
+        Returns:
+            tuple: (csr_matrix of 0/1 correctness, student ids, question ids)
+        """
+        query = """
+        SELECT sa.Student_Answer_ID, t.S_ID, sa.Quest_ID, CAST(ISNULL(c.is_correct, 0) AS INT)
+        FROM Student_Answer sa
+        INNER JOIN TAKES t ON t.Takes_ID = sa.Takes_ID
+        INNER JOIN Choice c ON c.Choice_ID = sa.Selected_Choice_ID AND c.Quest_ID = sa.Quest_ID
+        WHERE sa.Selected_Choice_ID IS NOT NULL
+        """
+        answer_ids, students, questions, correct = [], [], [], []
+
+        with DatabaseConnection.get_cursor() as cursor:
+            cursor.execute(query)
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+                if not rows:
+                    break
+                block = np.array([tuple(r) for r in rows], dtype=np.int64)
+                answer_ids.append(block[:, 0])
+                students.append(block[:, 1])
+                questions.append(block[:, 2])
+                correct.append(block[:, 3])
+
+        if not answer_ids:
+            return None, np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+        answer_ids = np.concatenate(answer_ids)
+        students = np.concatenate(students)
+        questions = np.concatenate(questions)
+        correct = np.concatenate(correct).astype(np.float64)
+
+        student_ids, rows = np.unique(students, return_inverse=True)
+        question_ids, cols = np.unique(questions, return_inverse=True)
+
+        # Keep the latest answer per (student, question) cell
+        order = np.argsort(answer_ids, kind='stable')[::-1]
+        cell = rows[order] * len(question_ids) + cols[order]
+        _, first = np.unique(cell, return_index=True)
+        keep = order[first]
+
+        # Incorrect answers are stored as explicit zeros - never call eliminate_zeros()
+        matrix = sparse.csr_matrix(
+            (correct[keep], (rows[keep], cols[keep])),
+            shape=(len(student_ids), len(question_ids))
+        )
+        matrix.sort_indices()
+
+        logger.info(f"✓ Loaded {len(answer_ids)} answers -> {matrix.nnz} cells "
+                    f"({len(student_ids)} students x {len(question_ids)} questions)")
+        return matrix, student_ids, question_ids
+
+    # ==================== FITTING ====================
+
+    def fit(self, matrix):
+        """
+        Joint maximum a-posteriori fit with damped diagonal Newton steps.
+
+        Args:
+            matrix (csr_matrix): 0/1 correctness, observed cells only
+
+        Returns:
+            dict: theta, difficulty (b), discrimination (a), counts, iterations,
+                  converged (False if max_iter was reached first)
+        """
+        n_students, n_items = matrix.shape
+        y = matrix.data
+        cols = matrix.indices
+        rows = np.repeat(np.arange(n_students), np.diff(matrix.indptr))
+
+        # Same sparsity pattern, reused for every residual / information matrix
+        pattern = sparse.csr_matrix((np.ones_like(y), cols, matrix.indptr), shape=matrix.shape)
+
+        item_n = np.asarray(pattern.sum(axis=0)).ravel()
+        item_p = np.asarray(matrix.sum(axis=0)).ravel() / np.maximum(item_n, 1)
+
+        # Start b at the logit of the item p-value, theta at the logit of the student's score
+        p0 = np.clip(item_p, 0.02, 0.98)
+        b = -np.log(p0 / (1 - p0))
+        person_n = np.diff(matrix.indptr)
+        person_p = np.clip(np.asarray(matrix.sum(axis=1)).ravel() / np.maximum(person_n, 1), 0.02, 0.98)
+        theta = np.log(person_p / (1 - person_p))
+        theta = (theta - theta.mean()) / (theta.std() or 1.0)
+        a = np.ones(n_items)
+
+        def with_data(values):
+            pattern.data = values
+            return pattern
+
+        iteration = 0
+        converged = False
+        for iteration in range(1, self.max_iter + 1):
+            prev_b, prev_a = b, a
+
+            # ---------- Person step ----------
+            diff = theta[rows] - b[cols]
+            p = 1.0 / (1.0 + np.exp(-a[cols] * diff))
+            w = p * (1.0 - p)
+            grad_theta = with_data(y - p) @ a - self.THETA_PRIOR * theta
+            info_theta = with_data(w) @ (a * a) + self.THETA_PRIOR
+            step_theta = np.clip(grad_theta / info_theta, -self.MAX_STEP, self.MAX_STEP)
+            theta = np.clip(theta + step_theta, -self.THETA_BOUND, self.THETA_BOUND)
+
+            # ---------- Item step ----------
+            diff = theta[rows] - b[cols]
+            p = 1.0 / (1.0 + np.exp(-a[cols] * diff))
+            w = p * (1.0 - p)
+            r = y - p
+
+            res_by_item = np.bincount(cols, weights=r, minlength=n_items)
+            w_by_item = np.bincount(cols, weights=w, minlength=n_items)
+
+            grad_b = -a * res_by_item - self.B_PRIOR * b
+            info_b = a * a * w_by_item + self.B_PRIOR
+            step_b = np.clip(grad_b / info_b, -self.MAX_STEP, self.MAX_STEP)
+            b = np.clip(b + step_b, -self.B_BOUND, self.B_BOUND)
+
+            if self.model == '2PL':
+                diff = theta[rows] - b[cols]
+                p = 1.0 / (1.0 + np.exp(-a[cols] * diff))
+                w = p * (1.0 - p)
+                log_a = np.log(a)
+                grad_a = np.bincount(cols, weights=diff * (y - p), minlength=n_items) - self.A_PRIOR * log_a / a
+                info_a = np.bincount(cols, weights=diff * diff * w, minlength=n_items) + self.A_PRIOR / (a * a)
+                step_a = np.clip(grad_a / info_a, -self.MAX_STEP, self.MAX_STEP)
+                a = np.clip(a + step_a, self.A_MIN, self.A_MAX)
+
+            # ---------- Identify the scale: theta centred (and unit variance for 2PL) ----------
+            mean = theta.mean()
+            std = (theta.std() or 1.0) if self.model == '2PL' else 1.0
+            theta = (theta - mean) / std
+            b = (b - mean) / std
+            if self.model == '2PL':
+                a = np.clip(a * std, self.A_MIN, self.A_MAX)
+
+            # Converged once item parameters stop moving on the identified scale
+            change = max(np.abs(b - prev_b).max(initial=0), np.abs(a - prev_a).max(initial=0))
+            if change < self.tol:
+                converged = True
+                break
+
+        if not converged:
+            logger.warning(f"⚠️ IRT fit stopped at max_iter={self.max_iter} without converging "
+                           f"(last change {change:.2e}, tol {self.tol})")
+
+        return {
+            'theta': theta,
+            'difficulty': b,
+            'discrimination': a,
+            'responses': item_n.astype(np.int64),
+            'p_value': item_p,
+            'iterations': iteration,
+            'converged': converged
+        }
+
+    # ==================== WRITE BACK ====================
+
+    @staticmethod
+    def difficulty_label(b):
+        """Map an IRT difficulty to the 1-5 Difficulty_Level scale used by Question"""
+        return np.digitize(b, [-1.5, -0.5, 0.5, 1.5]) + 1
+
+    def ensure_table(self):
+        """Create Question_Calibration if it does not exist"""
+        query = """
+        IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'Question_Calibration')
+        BEGIN
+            CREATE TABLE Question_Calibration (
+                Quest_ID INT NOT NULL PRIMARY KEY,
+                Model VARCHAR(3) NOT NULL,
+                Difficulty DECIMAL(6, 3) NOT NULL,
+                Discrimination DECIMAL(6, 3) NOT NULL,
+                P_Value DECIMAL(5, 4) NOT NULL,
+                Responses INT NOT NULL,
+                Calibrated_At DATETIME NOT NULL
+            );
+        END
+        """
+        DatabaseConnection.execute_query(query)
+
+    def save(self, question_ids, result):
+        """
+        Upsert calibrated parameters per Quest_ID and refresh Question.Difficulty_Level
+
+        Returns:
+            int: Number of questions written
+        """
+        mask = result['responses'] >= self.MIN_RESPONSES
+        if not mask.any():
+            return 0
+
+        now = datetime.now()
+        labels = self.difficulty_label(result['difficulty'])
+        params = [
+            (int(q), self.model, round(float(b), 3), round(float(a), 3), round(float(p), 4), int(n), now)
+            for q, b, a, p, n in zip(
+                question_ids[mask], result['difficulty'][mask], result['discrimination'][mask],
+                result['p_value'][mask], result['responses'][mask]
+            )
+        ]
+        levels = [(str(int(l)), int(q)) for q, l in zip(question_ids[mask], labels[mask])]
+
+        with DatabaseConnection.get_cursor() as cursor:
+            cursor.fast_executemany = True
+            cursor.execute("CREATE TABLE #Calibration (Quest_ID INT, Model VARCHAR(3), Difficulty DECIMAL(6, 3), "
+                           "Discrimination DECIMAL(6, 3), P_Value DECIMAL(5, 4), Responses INT, Calibrated_At DATETIME)")
+            cursor.executemany("INSERT INTO #Calibration VALUES (?, ?, ?, ?, ?, ?, ?)", params)
+            cursor.execute("""
+            MERGE Question_Calibration AS t
+            USING #Calibration AS s ON t.Quest_ID = s.Quest_ID
+            WHEN MATCHED THEN UPDATE SET
+                Model = s.Model, Difficulty = s.Difficulty, Discrimination = s.Discrimination,
+                P_Value = s.P_Value, Responses = s.Responses, Calibrated_At = s.Calibrated_At
+            WHEN NOT MATCHED THEN INSERT (Quest_ID, Model, Difficulty, Discrimination, P_Value, Responses, Calibrated_At)
+                VALUES (s.Quest_ID, s.Model, s.Difficulty, s.Discrimination, s.P_Value, s.Responses, s.Calibrated_At);
+            """)
+            cursor.executemany("UPDATE Question SET Difficulty_Level = ? WHERE Quest_ID = ?", levels)
+            cursor.execute("DROP TABLE #Calibration")
+
+        return len(params)
+
+    # ==================== JOB ====================
+
+    def run(self, dry_run=False):
+        """
+        Load, fit and write back in one call
+
+        Returns:
+            dict: Summary of the calibration run
+        """
+        started = time.time()
+        matrix, student_ids, question_ids = self.load_responses()
+        if matrix is None or matrix.nnz == 0:
+            return {'status': 'no_data', 'message': 'No graded MCQ answers to calibrate'}
+
+        loaded = time.time()
+        result = self.fit(matrix)
+        fitted = time.time()
+
+        written = 0
+        if not dry_run:
+            self.ensure_table()
+            written = self.save(question_ids, result)
+
+        summary = {
+            'status': 'success',
+            'model': self.model,
+            'answers': int(matrix.nnz),
+            'students': len(student_ids),
+            'questions': len(question_ids),
+            'calibrated': int((result['responses'] >= self.MIN_RESPONSES).sum()),
+            'written': written,
+            'iterations': result['iterations'],
+            'converged': result['converged'],
+            'load_seconds': round(loaded - started, 2),
+            'fit_seconds': round(fitted - loaded, 2),
+            'total_seconds': round(time.time() - started, 2)
+        }
+        logger.info(f"✓ IRT calibration finished: {summary}")
+        return summary
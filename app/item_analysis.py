@@ -0,0 +1,294 @@
+# app/item_analysis.py - Classical item analysis and distractor statistics per exam
+
+from app.database import DatabaseConnection
+import numpy as np
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _pearson(n, sum_x, sum_y, sum_xx, sum_yy, sum_xy):
+    """Vectorized Pearson correlation from accumulated sums (NaN where undefined)"""
+    num = n * sum_xy - sum_x * sum_y
+    den = (n * sum_xx - sum_x * sum_x) * (n * sum_yy - sum_y * sum_y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den > 0, num / np.sqrt(np.where(den > 0, den, 1.0)), np.nan)
+
+
+class ItemAnalyzer:
+    """
+    Per-exam classical test theory report.
+
+    For every MCQ question: p-value (difficulty), point-biserial and
+    corrected item-rest discrimination, and the selection frequency and
+    discrimination of every Choice. Answers are streamed once per exam and
+    reduced into NumPy accumulators; the report is cached until a new take
+    for that exam is graded.
+    """
+
+    # Rows fetched per round trip while streaming answers
+    FETCH_SIZE = 5000
+
+    # Flag thresholds
+    TOO_HARD = 0.2
+    TOO_EASY = 0.9
+    LOW_DISCRIMINATION = 0.2
+    MIN_DISTRACTOR_RATE = 0.05
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    # ==================== CACHE ====================
+
+    def _get_version(self, exam_id):
+        """Cheap stamp that changes whenever a take for this exam is graded"""
+        query = """
+        SELECT COUNT(*), MAX(Takes_ID), MAX(Date_Taken)
+        FROM TAKES
+        WHERE Exam_ID = ? AND Grade IS NOT NULL
+        """
+        row = DatabaseConnection.fetch_one(query, (exam_id,))
+        return tuple(row) if row else None
+
+    def invalidate(self, exam_id):
+        """Drop the cached report for an exam (called when a take is graded)"""
+        with self._lock:
+            self._cache.pop(exam_id, None)
+
+    def get_report(self, exam_id):
+        """
+        Get the item analysis report for an exam
+
+        Returns:
+            dict: Exam-level summary plus per-question and per-choice statistics
+        """
+        version = self._get_version(exam_id)
+
+        with self._lock:
+            cached = self._cache.get(exam_id)
+            if cached and cached[0] == version:
+                return cached[1]
+
+        try:
+            report = self._compute(exam_id)
+        except Exception as e:
+            logger.error(f"❌ Item analysis failed for exam {exam_id}: {str(e)}")
+            return {'status': 'error', 'message': str(e), 'items': []}
+
+        with self._lock:
+            self._cache[exam_id] = (version, report)
+        return report
+
+    # ==================== COMPUTATION ====================
+
+    def _load_key(self, exam_id):
+        """Load the exam's questions and choices once"""
+        query = """
+        SELECT
+            eq.Quest_ID,
+            eq.Question_order,
+            UPPER(LTRIM(RTRIM(ISNULL(q.Type, 'Essay')))) as Type,
+            ISNULL(eq.marks, 1.0) as marks,
+            LEFT(ISNULL(q.Question_text, ''), 200) as Question_text,
+            c.Choice_ID,
+            LEFT(ISNULL(c.Choice_text, ''), 200) as Choice_text,
+            ISNULL(c.is_correct, 0) as is_correct
+        FROM Exam_Question eq
+        INNER JOIN Question q ON q.Quest_ID = eq.Quest_ID
+        LEFT JOIN Choice c ON c.Quest_ID = eq.Quest_ID
+        WHERE eq.Exam_ID = ?
+        ORDER BY eq.Question_order, c.Choice_ID
+        """
+        return DatabaseConnection.fetch_all(query, (exam_id,)) or []
+
+    def _compute(self, exam_id):
+        key_rows = self._load_key(exam_id)
+
+        # ---------- Index questions and choices ----------
+        questions = []
+        q_index = {}
+        choices = []
+        c_index = {}
+        for quest_id, order, q_type, marks, q_text, choice_id, c_text, is_correct in key_rows:
+            if quest_id not in q_index:
+                q_index[quest_id] = len(questions)
+                questions.append({
+                    'quest_id': quest_id,
+                    'order': order,
+                    'type': q_type,
+                    'marks': float(marks),
+                    'text': q_text,
+                    'is_mcq': any(t in str(q_type) for t in ['MCQ', 'MULTIPLE'])
+                })
+            if choice_id is not None and choice_id not in c_index:
+                c_index[choice_id] = len(choices)
+                choices.append({
+                    'choice_id': choice_id,
+                    'q': q_index[quest_id],
+                    'text': c_text,
+                    'is_correct': bool(is_correct)
+                })
+
+        n_q, n_c = len(questions), len(choices)
+        choice_ids = np.array(sorted(c_index), dtype=np.int64)
+        choice_pos = np.array([c_index[c] for c in choice_ids], dtype=np.int64)
+        choice_correct = np.array([c['is_correct'] for c in choices], dtype=bool)
+        choice_question = np.array([c['q'] for c in choices], dtype=np.int64)
+        question_ids = np.array(sorted(q_index), dtype=np.int64)
+        question_pos = np.array([q_index[q] for q in question_ids], dtype=np.int64)
+        marks = np.array([q['marks'] for q in questions], dtype=np.float64)
+
+        # ---------- Graded takes and their total scores ----------
+        takes = DatabaseConnection.fetch_all(
+            "SELECT Takes_ID, CAST(Score AS FLOAT) FROM TAKES WHERE Exam_ID = ? AND Grade IS NOT NULL",
+            (exam_id,)
+        ) or []
+        n_takes = len(takes)
+        if n_takes == 0 or n_q == 0:
+            return {'status': 'no_data', 'exam_id': exam_id, 'takes': n_takes, 'items': []}
+
+        take_arr = np.array([(t[0], t[1] or 0.0) for t in takes], dtype=np.float64)
+        order = np.argsort(take_arr[:, 0])
+        take_ids = take_arr[order, 0].astype(np.int64)
+        totals = take_arr[order, 1]
+
+        sum_t = totals.sum()
+        sum_tt = (totals * totals).sum()
+
+        # ---------- Accumulators ----------
+        q_answered = np.zeros(n_q)
+        q_correct = np.zeros(n_q)
+        q_correct_t = np.zeros(n_q)
+        c_count = np.zeros(n_c)
+        c_sum_t = np.zeros(n_c)
+
+        # ---------- Single streaming pass over the answers ----------
+        query = """
+        SELECT sa.Takes_ID, sa.Quest_ID, ISNULL(sa.Selected_Choice_ID, 0)
+        FROM Student_Answer sa
+        INNER JOIN TAKES t ON t.Takes_ID = sa.Takes_ID
+        WHERE t.Exam_ID = ? AND t.Grade IS NOT NULL
+        """
+        with DatabaseConnection.get_cursor() as cursor:
+            cursor.execute(query, (exam_id,))
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+                if not rows:
+                    break
+                block = np.array([tuple(r) for r in rows], dtype=np.int64)
+
+                t_pos = np.searchsorted(take_ids, block[:, 0])
+                t_pos = np.minimum(t_pos, n_takes - 1)
+                q_pos = np.searchsorted(question_ids, block[:, 1])
+                q_pos = np.minimum(q_pos, len(question_ids) - 1)
+                valid = (take_ids[t_pos] == block[:, 0]) & (question_ids[q_pos] == block[:, 1])
+                if not valid.any():
+                    continue
+                t = totals[t_pos[valid]]
+                q = question_pos[q_pos[valid]]
+                selected = block[valid, 2]
+
+                q_answered += np.bincount(q, minlength=n_q)
+
+                if n_c:
+                    c_pos = np.minimum(np.searchsorted(choice_ids, selected), n_c - 1)
+                    chose = choice_ids[c_pos] == selected
+                    chose[chose] = choice_question[choice_pos[c_pos[chose]]] == q[chose]
+                    c = choice_pos[c_pos[chose]]
+                    c_count += np.bincount(c, minlength=n_c)
+                    c_sum_t += np.bincount(c, weights=t[chose], minlength=n_c)
+
+                    right = np.zeros(selected.size, dtype=bool)
+                    right[chose] = choice_correct[c]
+                    q_correct += np.bincount(q[right], minlength=n_q)
+                    q_correct_t += np.bincount(q[right], weights=t[right], minlength=n_q)
+
+        # ---------- Item statistics (omitted answers count as incorrect) ----------
+        n = float(n_takes)
+        p_value = q_correct / n
+        point_biserial = _pearson(n, q_correct, sum_t, q_correct, sum_tt, q_correct_t)
+
+        # Item-rest correlation: remove the item's own contribution from the total
+        rest_sum = sum_t - marks * q_correct
+        rest_sumsq = sum_tt - 2 * marks * q_correct_t + marks * marks * q_correct
+        rest_xy = q_correct_t - marks * q_correct
+        item_rest = _pearson(n, q_correct, rest_sum, q_correct, rest_sumsq, rest_xy)
+
+        choice_r = _pearson(n, c_count, sum_t, c_count, sum_tt, c_sum_t) if n_c else np.array([])
+
+        # ---------- Assemble ----------
+        items = []
+        for i, question in enumerate(questions):
+            item = {
+                'quest_id': question['quest_id'],
+                'order': question['order'],
+                'type': question['type'],
+                'text': question['text'],
+                'marks': question['marks'],
+                'answered': int(q_answered[i]),
+                'omitted': int(n_takes - q_answered[i]),
+                'choices': [],
+                'flags': []
+            }
+
+            if question['is_mcq']:
+                item['p_value'] = round(float(p_value[i]), 3)
+                item['point_biserial'] = None if np.isnan(point_biserial[i]) else round(float(point_biserial[i]), 3)
+                item['item_rest'] = None if np.isnan(item_rest[i]) else round(float(item_rest[i]), 3)
+
+                for j, choice in enumerate(choices):
+                    if choice['q'] != i:
+                        continue
+                    rate = c_count[j] / n
+                    r = None if np.isnan(choice_r[j]) else round(float(choice_r[j]), 3)
+                    item['choices'].append({
+                        'choice_id': choice['choice_id'],
+                        'text': choice['text'],
+                        'is_correct': choice['is_correct'],
+                        'count': int(c_count[j]),
+                        'rate': round(float(rate), 3),
+                        'mean_score': round(float(c_sum_t[j] / c_count[j]), 2) if c_count[j] else None,
+                        'discrimination': r
+                    })
+                    if not choice['is_correct']:
+                        if rate < self.MIN_DISTRACTOR_RATE:
+                            item['flags'].append(f"Distractor {choice['choice_id']} rarely chosen")
+                        if r is not None and r > 0:
+                            item['flags'].append(f"Distractor {choice['choice_id']} attracts strong students")
+
+                if not any(c['is_correct'] for c in item['choices']):
+                    item['flags'].append('No correct choice defined')
+                if item['p_value'] < self.TOO_HARD:
+                    item['flags'].append('Too hard')
+                elif item['p_value'] > self.TOO_EASY:
+                    item['flags'].append('Too easy')
+                if item['item_rest'] is not None:
+                    if item['item_rest'] < 0:
+                        item['flags'].append('Negative discrimination')
+                    elif item['item_rest'] < self.LOW_DISCRIMINATION:
+                        item['flags'].append('Low discrimination')
+
+            items.append(item)
+
+        logger.info(f"✓ Item analysis computed for exam {exam_id}: {n_takes} takes, {n_q} questions")
+
+        return {
+            'status': 'success',
+            'exam_id': exam_id,
+            'takes': n_takes,
+            'mean_score': round(float(sum_t / n), 2),
+            'std_dev': round(float(np.sqrt(max(sum_tt / n - (sum_t / n) ** 2, 0.0))), 2),
+            'flagged': sum(1 for item in items if item['flags']),
+            'items': items
+        }
+
+
+# Instance واحد
+item_analyzer_instance = ItemAnalyzer()
+
+
+def get_item_analyzer():
+    """الحصول على instance الـ Item Analyzer"""
+    return item_analyzer_instance
@@ -1,8 +1,8 @@
 # app/ml_helper.py - مساعد ML لتحليل وتوقع أداء الطالب
 
 from app.database import DatabaseConnection
-import numpy as np
-from sklearn.linear_model import LinearRegression
+from app.utils.startup import startup_report
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,6 +13,8 @@ class StudentMLHelper:
     """
     
     def __init__(self):
+        # Heavy imports, deferred until the helper is first used
+        from sklearn.linear_model import LinearRegression
         self.model = LinearRegression()
         self.trained = False
     
@@ -88,6 +90,8 @@ class StudentMLHelper:
             dict: التنبؤ والثقة
         """
         try:
+            import numpy as np
+            
             # جلب آخر 5 درجات للطالب
             query = """
             SELECT TOP 5 Score, DATEDIFF(day, '2024-01-01', Date_Taken) as days
@@ -266,10 +270,17 @@ class StudentMLHelper:
             return "💪 اهتم بالدراسة أكثر لتحسين نتائجك"
 
 
-# Instance واحد
-ml_helper_instance = StudentMLHelper()
+# Instance واحد - created on first use so non-ML workers skip numpy/sklearn
+ml_helper_instance = None
+_instance_lock = threading.Lock()
 
 
 def get_ml_helper():
     """الحصول على instance الـ ML Helper"""
+    global ml_helper_instance
+    if ml_helper_instance is None:
+        with _instance_lock:
+            if ml_helper_instance is None:
+                with startup_report.track('ml_helper'):
+                    ml_helper_instance = StudentMLHelper()
     return ml_helper_instance
@@ -3,6 +3,7 @@
 
 from app.database import DatabaseConnection
 import logging
+import time
 import traceback
 
 logger = logging.getLogger(__name__)
@@ -12,6 +13,22 @@ logger = logging.getLogger(__name__)
 class User:
     """User model for Person table"""
     
+    # Person.Password is added by hash_passwords.py, not by sql/script_DB.sql;
+    # a missing column is re-checked every PASSWORD_COLUMN_RECHECK seconds
+    PASSWORD_COLUMN_RECHECK = 60
+    _password_column = False
+    _password_column_checked = 0.0
+    
+    @classmethod
+    def has_password_column(cls):
+        """True once Person.Password exists"""
+        if not cls._password_column and time.monotonic() - cls._password_column_checked >= cls.PASSWORD_COLUMN_RECHECK:
+            with DatabaseConnection.get_cursor() as cursor:
+                cursor.execute("SELECT COL_LENGTH('Person', 'Password')")
+                cls._password_column = cursor.fetchone()[0] is not None
+            cls._password_column_checked = time.monotonic()
+        return cls._password_column
+    
     @staticmethod
     def get_by_email(email):
         """Get user by email"""
@@ -23,6 +40,49 @@ class User:
         """Get user by ID"""
         query = "SELECT ID, F_name, L_name, Email, Person_type FROM Person WHERE ID = ?"
         return DatabaseConnection.fetch_one(query, (user_id,))
+    
+    @staticmethod
+    def get_login_profile(email):
+        """
+        Get a user and their role-specific ID in one query
+        
+        Returns:
+            tuple: (ID, F_name, L_name, Email, Person_type, S_ID, I_ID, M_ID) or None
+
+        Raises:
+            Exception: On query errors, so a failed lookup is never mistaken
+            for (and cached as) an unknown email
+        """
+        query = """
+        SELECT p.ID, p.F_name, p.L_name, p.Email, p.Person_type, s.S_ID, i.I_ID, m.M_ID
+        FROM Person p
+        LEFT JOIN Student s ON s.Person_ID = p.ID
+        LEFT JOIN Instructor i ON i.Person_ID = p.ID
+        LEFT JOIN Manager m ON m.Person_id = p.ID
+        WHERE p.Email = ?
+        """
+        with DatabaseConnection.get_cursor() as cursor:
+            cursor.execute(query, (email,))
+            return cursor.fetchone()
+    
+    @staticmethod
+    def get_password_hash(person_id):
+        """
+        Stored password hash, read fresh on every login (never cached, so a
+        reset takes effect at once)
+        
+        Returns:
+            str: Hash, or None if the user has none yet (or Person.Password does not exist)
+        
+        Raises:
+            Exception: On query errors
+        """
+        if not User.has_password_column():
+            return None
+        with DatabaseConnection.get_cursor() as cursor:
+            cursor.execute("SELECT Password FROM Person WHERE ID = ?", (person_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
 
 
 class Student:
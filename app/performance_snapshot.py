@@ -0,0 +1,153 @@
+# app/performance_snapshot.py - Per-student performance snapshots for the ML analytics pages
+
+from app.database import DatabaseConnection
+import hashlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceSnapshot:
+    """
+    Everything student_ml needs for one student, computed from a single
+    TAKES query: summary stats, a downsampled score series and the most
+    recent exams.
+    """
+
+    # Points kept in the trend series
+    MAX_TREND_POINTS = 20
+
+    # Rows kept for the "Recent Exams" table
+    HISTORY_SIZE = 10
+
+    def __init__(self, student_id, rows):
+        """
+        Args:
+            student_id (int): S_ID
+            rows (list): (Takes_ID, Date_Taken, Score, Grade, Total_marks, Course_name)
+                         ordered by Date_Taken ascending
+        """
+        self.student_id = student_id
+        self.built_at = time.time()
+
+        graded = [float(r[2]) for r in rows if r[2] is not None and r[2] > 0]
+        self.exam_count = len(graded)
+        self.avg_score = sum(graded) / len(graded) if graded else 0.0
+        self.max_score = max(graded) if graded else 0.0
+        self.min_score = min(graded) if graded else 0.0
+
+        self.trend = self._downsample([
+            {
+                'date': str(r[1]) if r[1] else '',
+                'score': float(r[2]) if r[2] else 0,
+                'percentage': round(float(r[2]) * 100.0 / r[4], 2) if r[2] and r[4] else 0
+            }
+            for r in rows
+        ])
+
+        self.history = [
+            (r[5], r[4], r[2], r[3], r[1])
+            for r in reversed(rows[-self.HISTORY_SIZE:])
+        ]
+
+        fingerprint = f"{student_id}|{len(rows)}|{rows[-1][0] if rows else 0}|{rows[-1][1] if rows else ''}|{sum(graded):.2f}"
+        self.etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+    def _downsample(self, points):
+        """Average consecutive points into at most MAX_TREND_POINTS buckets, keeping the last date"""
+        n = len(points)
+        if n <= self.MAX_TREND_POINTS:
+            return points
+
+        buckets = []
+        for i in range(self.MAX_TREND_POINTS):
+            start = i * n // self.MAX_TREND_POINTS
+            end = (i + 1) * n // self.MAX_TREND_POINTS
+            chunk = points[start:end]
+            buckets.append({
+                'date': chunk[-1]['date'],
+                'score': round(sum(p['score'] for p in chunk) / len(chunk), 2),
+                'percentage': round(sum(p['percentage'] for p in chunk) / len(chunk), 2)
+            })
+        return buckets
+
+    @property
+    def performance_level(self):
+        if self.avg_score >= 90:
+            return 'Excellent'
+        elif self.avg_score >= 80:
+            return 'Very Good'
+        elif self.avg_score >= 70:
+            return 'Good'
+        elif self.avg_score >= 60:
+            return 'Acceptable'
+        return 'Needs Improvement'
+
+
+class SnapshotStore:
+    """
+    In-memory snapshots keyed by S_ID.
+
+    Snapshots are materialized when a take is graded; the TTL only bounds
+    staleness for takes graded by another worker process.
+    """
+
+    TTL = 300
+    MAX_ENTRIES = 5000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _build(self, student_id):
+        query = """
+        SELECT t.Takes_ID, t.Date_Taken, t.Score, t.Grade, e.Total_marks, c.name
+        FROM TAKES t
+        JOIN Exam e ON t.Exam_ID = e.Exam_ID
+        JOIN Course c ON e.Course_ID = c.Course_ID
+        WHERE t.S_ID = ? AND t.Score IS NOT NULL
+        ORDER BY t.Date_Taken ASC, t.Takes_ID ASC
+        """
+        rows = DatabaseConnection.fetch_all(query, (student_id,)) or []
+        return PerformanceSnapshot(student_id, rows)
+
+    def materialize(self, student_id):
+        """Rebuild and store a student's snapshot (called when a take is graded)"""
+        try:
+            snapshot = self._build(student_id)
+        except Exception as e:
+            logger.error(f"❌ Error building performance snapshot for student {student_id}: {str(e)}")
+            with self._lock:
+                self._snapshots.pop(student_id, None)
+            return None
+
+        with self._lock:
+            if len(self._snapshots) >= self.MAX_ENTRIES and student_id not in self._snapshots:
+                oldest = min(self._snapshots, key=lambda k: self._snapshots[k].built_at)
+                self._snapshots.pop(oldest, None)
+            self._snapshots[student_id] = snapshot
+        return snapshot
+
+    def get(self, student_id):
+        """Get a student's snapshot from memory, building it on a miss"""
+        with self._lock:
+            snapshot = self._snapshots.get(student_id)
+            if snapshot and time.time() - snapshot.built_at < self.TTL:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        return self.materialize(student_id)
+
+
+# Instance واحد
+snapshot_store_instance = SnapshotStore()
+
+
+def get_snapshot_store():
+    """الحصول على instance الـ Snapshot Store"""
+    return snapshot_store_instance
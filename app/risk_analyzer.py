@@ -0,0 +1,302 @@
+# app/risk_analyzer.py - Population at-risk detection for managers
+
+from app.database import DatabaseConnection
+from datetime import datetime
+import numpy as np
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AtRiskAnalyzer:
+    """
+    Scores every active student for academic risk.
+
+    Raw rows are pulled incrementally (TAKES by Date_Taken watermark,
+    Attendance by attendance_id watermark) and kept in memory; the scoring
+    itself is one vectorized NumPy pass over the whole population.
+    """
+
+    # How many recent exams define the trend slope
+    TREND_WINDOW = 5
+
+    # Minimum seconds between two incremental refreshes
+    REFRESH_INTERVAL = 30
+
+    # Component weights (sum to 1.0)
+    WEIGHTS = {
+        'low_average': 0.35,
+        'declining_trend': 0.25,
+        'high_variance': 0.15,
+        'low_attendance': 0.25
+    }
+
+    SORT_FIELDS = ('risk_score', 'avg_score', 'trend', 'std_dev', 'attendance_rate', 'exam_count', 'name')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+
+        # Takes_ID -> position in the column lists below
+        self._take_pos = {}
+        self._take_sid = []
+        self._take_score = []
+        self._take_time = []
+        self._takes_watermark = None
+
+        # S_ID -> [total_sessions, present_sessions]
+        self._attendance = {}
+        self._attendance_watermark = 0
+
+        self._students = []
+        self._report = []
+
+    # ==================== INCREMENTAL LOAD ====================
+
+    def _load_students(self):
+        """Load the active student roster in one query"""
+        query = """
+        SELECT s.S_ID, p.F_name, p.L_name, p.Email
+        FROM Student s
+        INNER JOIN Person p ON s.Person_ID = p.ID
+        WHERE ISNULL(s.Is_graduated, 0) = 0
+        ORDER BY s.S_ID
+        """
+        self._students = DatabaseConnection.fetch_all(query) or []
+
+    def _load_new_takes(self):
+        """Pull only graded TAKES rows at or after the Date_Taken watermark"""
+        query = """
+        SELECT Takes_ID, S_ID, CAST(Score AS FLOAT), Date_Taken
+        FROM TAKES
+        WHERE Score IS NOT NULL AND Score > 0
+        """
+        params = None
+        if self._takes_watermark is not None:
+            query += " AND Date_Taken >= ?"
+            params = (self._takes_watermark,)
+
+        rows = DatabaseConnection.fetch_all(query, params) or []
+        for takes_id, s_id, score, date_taken in rows:
+            ts = date_taken.timestamp() if date_taken else 0.0
+            pos = self._take_pos.get(takes_id)
+            if pos is None:
+                self._take_pos[takes_id] = len(self._take_sid)
+                self._take_sid.append(s_id)
+                self._take_score.append(float(score))
+                self._take_time.append(ts)
+            else:
+                # Re-graded or re-submitted take: overwrite in place
+                self._take_sid[pos] = s_id
+                self._take_score[pos] = float(score)
+                self._take_time[pos] = ts
+
+            if date_taken and (self._takes_watermark is None or date_taken > self._takes_watermark):
+                self._takes_watermark = date_taken
+
+        return len(rows)
+
+    def _load_new_attendance(self):
+        """Pull only Attendance rows above the attendance_id watermark"""
+        query = """
+        SELECT attendance_id, student_id, CAST(is_present AS INT)
+        FROM Attendance
+        WHERE attendance_id > ?
+        """
+        rows = DatabaseConnection.fetch_all(query, (self._attendance_watermark,)) or []
+        for attendance_id, s_id, is_present in rows:
+            counts = self._attendance.setdefault(s_id, [0, 0])
+            counts[0] += 1
+            counts[1] += 1 if is_present else 0
+            if attendance_id > self._attendance_watermark:
+                self._attendance_watermark = attendance_id
+
+        return len(rows)
+
+    def refresh(self, force=False):
+        """Fetch new rows since the last watermarks and rescore the population"""
+        with self._lock:
+            if not force and self._report and time.time() - self._last_refresh < self.REFRESH_INTERVAL:
+                return
+
+            try:
+                self._load_students()
+                new_takes = self._load_new_takes()
+                new_attendance = self._load_new_attendance()
+                self._report = self._score_population()
+                self._last_refresh = time.time()
+                logger.info(
+                    f"✓ At-risk report refreshed: {len(self._report)} students, "
+                    f"+{new_takes} takes, +{new_attendance} attendance rows"
+                )
+            except Exception as e:
+                logger.error(f"Error refreshing at-risk report: {str(e)}")
+
+    # ==================== VECTORIZED SCORING ====================
+
+    def _score_population(self):
+        """Compute all risk components for every active student at once"""
+        n = len(self._students)
+        if n == 0:
+            return []
+
+        sids = np.array([s[0] for s in self._students], dtype=np.int64)
+        row_of = {int(sid): i for i, sid in enumerate(sids)}
+
+        # ---------- Exam statistics ----------
+        take_rows = np.array([row_of.get(sid, -1) for sid in self._take_sid], dtype=np.int64)
+        scores = np.array(self._take_score, dtype=np.float64)
+        times = np.array(self._take_time, dtype=np.float64)
+
+        keep = take_rows >= 0
+        take_rows, scores, times = take_rows[keep], scores[keep], times[keep]
+
+        counts = np.bincount(take_rows, minlength=n).astype(np.float64)
+        sums = np.bincount(take_rows, weights=scores, minlength=n)
+        sumsq = np.bincount(take_rows, weights=scores * scores, minlength=n)
+
+        has_exams = counts > 0
+        safe_counts = np.where(has_exams, counts, 1.0)
+        avg = np.where(has_exams, sums / safe_counts, 0.0)
+        var = np.where(counts > 1, (sumsq - sums * avg) / np.maximum(counts - 1, 1), 0.0)
+        std = np.sqrt(np.maximum(var, 0.0))
+
+        # ---------- Trend over the most recent exams ----------
+        slope = np.zeros(n)
+        if take_rows.size:
+            order = np.lexsort((times, take_rows))
+            g, y = take_rows[order], scores[order]
+
+            # Position of each take within its student's history
+            starts = np.r_[0, np.flatnonzero(np.diff(g)) + 1]
+            group_start = np.repeat(starts, np.diff(np.r_[starts, g.size]))
+            pos = np.arange(g.size) - group_start
+            from_end = counts[g] - 1 - pos
+
+            window = from_end < self.TREND_WINDOW
+            g, y = g[window], y[window]
+            x = (self.TREND_WINDOW - 1 - from_end[window]).astype(np.float64)
+
+            k = np.bincount(g, minlength=n)
+            sx = np.bincount(g, weights=x, minlength=n)
+            sy = np.bincount(g, weights=y, minlength=n)
+            sxx = np.bincount(g, weights=x * x, minlength=n)
+            sxy = np.bincount(g, weights=x * y, minlength=n)
+
+            denom = k * sxx - sx * sx
+            valid = (k >= 2) & (denom > 0)
+            slope[valid] = (k[valid] * sxy[valid] - sx[valid] * sy[valid]) / denom[valid]
+
+        # ---------- Attendance ----------
+        att = np.array([self._attendance.get(int(sid), (0, 0)) for sid in sids], dtype=np.float64).reshape(n, 2)
+        has_attendance = att[:, 0] > 0
+        attendance_rate = np.where(has_attendance, att[:, 1] / np.where(has_attendance, att[:, 0], 1.0), 1.0)
+
+        # ---------- Risk components in [0, 1] ----------
+        low_average = np.where(has_exams, np.clip((70.0 - avg) / 40.0, 0.0, 1.0), 0.0)
+        declining = np.clip(-slope / 5.0, 0.0, 1.0)
+        high_variance = np.clip((std - 5.0) / 15.0, 0.0, 1.0)
+        low_attendance = np.where(has_attendance, np.clip((0.85 - attendance_rate) / 0.35, 0.0, 1.0), 0.0)
+
+        risk = (
+            self.WEIGHTS['low_average'] * low_average
+            + self.WEIGHTS['declining_trend'] * declining
+            + self.WEIGHTS['high_variance'] * high_variance
+            + self.WEIGHTS['low_attendance'] * low_attendance
+        )
+
+        report = []
+        for i, s in enumerate(self._students):
+            factors = []
+            if low_average[i] > 0:
+                factors.append('Low average')
+            if declining[i] > 0:
+                factors.append('Declining trend')
+            if high_variance[i] > 0:
+                factors.append('High variance')
+            if low_attendance[i] > 0:
+                factors.append('Low attendance')
+
+            score = float(risk[i])
+            report.append({
+                'student_id': int(s[0]),
+                'name': f"{s[1]} {s[2]}",
+                'email': s[3],
+                'exam_count': int(counts[i]),
+                'avg_score': round(float(avg[i]), 1),
+                'std_dev': round(float(std[i]), 1),
+                'trend': round(float(slope[i]), 2),
+                'attendance_rate': round(float(attendance_rate[i]) * 100, 1) if has_attendance[i] else None,
+                'risk_score': round(score * 100, 1),
+                'risk_level': self._get_risk_level(score),
+                'factors': factors
+            })
+
+        return report
+
+    def _get_risk_level(self, score):
+        """Map a [0, 1] risk score to a level"""
+        if score >= 0.6:
+            return 'high'
+        elif score >= 0.35:
+            return 'medium'
+        return 'low'
+
+    # ==================== QUERY ====================
+
+    def get_report(self, page=1, per_page=25, sort='risk_score', order='desc', level=None):
+        """
+        Get one page of the at-risk report
+
+        Returns:
+            dict: rows for the page plus paging and summary info
+        """
+        self.refresh()
+
+        if sort not in self.SORT_FIELDS:
+            sort = 'risk_score'
+        descending = order != 'asc'
+
+        rows = self._report
+        if level in ('high', 'medium', 'low'):
+            rows = [r for r in rows if r['risk_level'] == level]
+
+        # None (no attendance data) always sorts last
+        rows = (
+            sorted((r for r in rows if r[sort] is not None), key=lambda r: r[sort], reverse=descending)
+            + [r for r in rows if r[sort] is None]
+        )
+
+        per_page = max(1, min(int(per_page), 200))
+        total = len(rows)
+        pages = max(1, (total + per_page - 1) // per_page)
+        page = max(1, min(int(page), pages))
+        start = (page - 1) * per_page
+
+        summary = {'high': 0, 'medium': 0, 'low': 0}
+        for r in self._report:
+            summary[r['risk_level']] += 1
+
+        return {
+            'rows': rows[start:start + per_page],
+            'page': page,
+            'per_page': per_page,
+            'pages': pages,
+            'total': total,
+            'sort': sort,
+            'order': 'desc' if descending else 'asc',
+            'level': level,
+            'summary': summary,
+            'refreshed_at': datetime.fromtimestamp(self._last_refresh).strftime('%Y-%m-%d %H:%M:%S') if self._last_refresh else None
+        }
+
+
+# Instance واحد
+risk_analyzer_instance = AtRiskAnalyzer()
+
+
+def get_risk_analyzer():
+    """الحصول على instance الـ At-Risk Analyzer"""
+    return risk_analyzer_instance
@@ -1,13 +1,69 @@
 # app/routes/auth.py - Professional Authentication - COMPLETE VERSION
 
-from flask import Blueprint, render_template_string, request, session, redirect, flash
-from app.models import User, Student, Instructor, Manager
+from flask import Blueprint, render_template_string, request, session, redirect, flash, make_response
+from app.models import User
+from app.utils.cache import TTLCache
+from app.utils.single_flight import SingleFlight
+from app.utils.login_throttle import get_login_throttle
+from app.utils.security import PasswordHelper, PasswordPoolBusy
+import math
 import traceback
 import logging
 
 logger = logging.getLogger(__name__)
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+# ==================== PROFILE CACHE ====================
+
+# Resolved login profiles by email; unknown emails are cached too, for less time
+login_profile_cache = TTLCache(maxsize=10000, ttl=300)
+UNKNOWN_EMAIL_TTL = 60
+_UNKNOWN = 'unknown'
+
+# Concurrent misses for the same email (double-submitted forms) share one query
+_profile_lookups = SingleFlight()
+
+# Retry-After (seconds) when the password pool is saturated
+PASSWORD_BUSY_RETRY_AFTER = 3
+
+# Person_type -> (session key, dashboard)
+ROLES = {
+    'Student': ('student_id', '/student/dashboard'),
+    'Instructor': ('instructor_id', '/instructor/dashboard'),
+    'manager': ('manager_id', '/manager/dashboard')
+}
+
+
+def get_login_profile(email):
+    """
+    Person and role ID for an email, from the cache or one joined query
+    
+    Returns:
+        dict: id, first_name, last_name, email, type, role_id - or None if unknown
+    """
+    key = email.lower()
+    profile = login_profile_cache.get(key)
+    if profile is not None:
+        return None if profile == _UNKNOWN else profile
+    
+    # Query errors raise here; only a real empty result is cached as unknown
+    row, _ = _profile_lookups.do(key, lambda: User.get_login_profile(email), timeout=10)
+    if not row:
+        login_profile_cache.set(key, _UNKNOWN, ttl=UNKNOWN_EMAIL_TTL)
+        return None
+    
+    role_ids = {'Student': row[5], 'Instructor': row[6], 'manager': row[7]}
+    profile = {
+        'id': row[0],
+        'first_name': row[1],
+        'last_name': row[2],
+        'email': row[3],
+        'type': row[4],
+        'role_id': role_ids.get(row[4])
+    }
+    login_profile_cache.set(key, profile)
+    return profile
+
 # ==================== ROUTES ====================
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
@@ -22,56 +78,71 @@ def login():
                 flash('يرجى إدخال البريد الإلكتروني وكلمة المرور', 'danger')
                 return redirect('/auth/login')
             
-            # Get user from database
-            user = User.get_by_email(email)
+            # Throttle before touching the database or any password hash
+            throttle = get_login_throttle()
+            ip = request.remote_addr or 'unknown'
+            allowed, retry_after = throttle.check(email, ip)
+            if not allowed:
+                wait = max(1, math.ceil(retry_after))
+                logger.warning(f"Login throttled for: {email} ({ip}), retry in {wait}s")
+                flash(f'محاولات كثيرة. حاول مرة أخرى بعد {wait} ثانية.', 'danger')
+                response = make_response(render_template_string(LOGIN_TEMPLATE), 429)
+                response.headers['Retry-After'] = str(wait)
+                return response
+            
+            # Person and role ID in one round trip (cached)
+            user = get_login_profile(email)
             
             if not user:
                 logger.warning(f"Login attempt with non-existent email: {email}")
+                throttle.record_failure(email, ip)
                 flash('البريد الإلكتروني أو كلمة المرور غير صحيحة', 'danger')
                 return redirect('/auth/login')
             
-            # Demo password verification (use proper hashing in production)
-            if password != 'password':
+            # bcrypt on the bounded password pool; users without a stored hash
+            # (hash_passwords.py not run for them yet) keep the demo password
+            try:
+                # Not part of the cached profile: read fresh so a reset applies at once
+                password_hash = User.get_password_hash(user['id'])
+                if password_hash:
+                    valid = PasswordHelper.check_password(password, password_hash)
+                else:
+                    valid = password == 'password'
+            except PasswordPoolBusy:
+                logger.warning(f"Password pool busy, login deferred for: {email}")
+                flash(f'الخادم مشغول حالياً. حاول مرة أخرى بعد {PASSWORD_BUSY_RETRY_AFTER} ثوانٍ.', 'warning')
+                response = make_response(render_template_string(LOGIN_TEMPLATE), 503)
+                response.headers['Retry-After'] = str(PASSWORD_BUSY_RETRY_AFTER)
+                return response
+            
+            if not valid:
                 logger.warning(f"Failed login attempt for: {email}")
+                throttle.record_failure(email, ip)
                 flash('البريد الإلكتروني أو كلمة المرور غير صحيحة', 'danger')
                 return redirect('/auth/login')
             
+            throttle.record_success(email)
+            
             # Clear old session
             session.clear()
             
             # Set session data
-            session['user_id'] = user[0]          # ID
-            session['user_email'] = user[3]       # Email
-            session['user_type'] = user[4]        # Person_type
-            session['user_name'] = f"{user[1]} {user[2]}"  # F_name + L_name
+            session['user_id'] = user['id']
+            session['user_email'] = user['email']
+            session['user_type'] = user['type']
+            session['user_name'] = f"{user['first_name']} {user['last_name']}"
             session.modified = True
             
-            logger.info(f"Successful login: {email} ({user[4]})")
+            logger.info(f"Successful login: {email} ({user['type']})")
             
             # Redirect based on user type
-            if user[4] == 'Student':
-                student = Student.get_by_person_id(user[0])
-                if student:
-                    session['student_id'] = student[0]
-                    session.modified = True
-                    flash(f'أهلاً بك {session["user_name"]}! 👋', 'success')
-                    return redirect('/student/dashboard')
-            
-            elif user[4] == 'Instructor':
-                instructor = Instructor.get_by_person_id(user[0])
-                if instructor:
-                    session['instructor_id'] = instructor[0]
-                    session.modified = True
-                    flash(f'أهلاً بك {session["user_name"]}! 👋', 'success')
-                    return redirect('/instructor/dashboard')
-            
-            elif user[4] == 'manager':
-                manager = Manager.get_by_person_id(user[0])
-                if manager:
-                    session['manager_id'] = manager[0]
-                    session.modified = True
-                    flash(f'أهلاً بك {session["user_name"]}! 👋', 'success')
-                    return redirect('/manager/dashboard')
+            role = ROLES.get(user['type'])
+            if role and user['role_id']:
+                session_key, dashboard = role
+                session[session_key] = user['role_id']
+                session.modified = True
+                flash(f'أهلاً بك {session["user_name"]}! 👋', 'success')
+                return redirect(dashboard)
             
             flash('نوع المستخدم غير معروف', 'danger')
             return redirect('/auth/login')
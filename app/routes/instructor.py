@@ -1,7 +1,7 @@
 # app/routes/instructor.py - COMPLETE FINAL VERSION
 # Place in: app/routes/instructor.py
 
-from flask import Blueprint, render_template_string, session, redirect, request, flash
+from flask import Blueprint, render_template_string, session, redirect, request, flash, jsonify
 from app.models import Instructor, Exam, Course, Student
 from app.database import DatabaseConnection
 from functools import wraps
@@ -421,6 +421,10 @@ EXAM_STUDENTS_PAGE = '''
             border-radius: 10px;
             margin-bottom: 20px;
         }
+        .item-analysis { margin-top: 40px; }
+        .item-analysis h2 { color: #333; margin-bottom: 15px; }
+        .choice-list { font-size: 0.85rem; color: #555; }
+        .choice-correct { color: #155724; font-weight: 600; }
     </style>
 </head>
 <body>
@@ -466,6 +470,54 @@ EXAM_STUDENTS_PAGE = '''
         {% else %}
             <p style="text-align: center; padding: 60px; color: #999;">لم يقم أي طالب بإجراء هذا الامتحان بعد</p>
         {% endif %}
+        
+        {% if analysis and analysis.status == 'success' %}
+        <div class="item-analysis">
+            <h2>🔬 تحليل الأسئلة</h2>
+            <div class="exam-info">
+                <p><strong>عدد المحاولات المصححة:</strong> {{ analysis.takes }} |
+                   <strong>متوسط الدرجة:</strong> {{ analysis.mean_score }} |
+                   <strong>الانحراف المعياري:</strong> {{ analysis.std_dev }}</p>
+                <p><strong>أسئلة تحتاج مراجعة:</strong> {{ analysis.flagged }} |
+                   <a href="/instructor/exam/{{ analysis.exam_id }}/item-analysis">JSON</a></p>
+            </div>
+            <table>
+                <thead>
+                    <tr>
+                        <th>#</th>
+                        <th>السؤال</th>
+                        <th>معامل السهولة (p)</th>
+                        <th>معامل التمييز (r)</th>
+                        <th>توزيع الاختيارات</th>
+                        <th>ملاحظات</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {% for item in analysis['items'] %}
+                    <tr>
+                        <td>{{ item.order }}</td>
+                        <td>{{ item.text[:80] }}<br><small>{{ item.type }} | لم يُجب: {{ item.omitted }}</small></td>
+                        <td>{{ item.p_value if item.p_value is defined else '-' }}</td>
+                        <td>{{ item.item_rest if item.item_rest is defined and item.item_rest is not none else '-' }}</td>
+                        <td class="choice-list">
+                            {% for c in item.choices %}
+                                <div class="{{ 'choice-correct' if c.is_correct }}">
+                                    {{ c.text[:30] }}: {{ (c.rate * 100)|round(1) }}%
+                                    {% if c.discrimination is not none %}(r={{ c.discrimination }}){% endif %}
+                                </div>
+                            {% endfor %}
+                        </td>
+                        <td>
+                            {% for flag in item.flags %}
+                                <span class="badge badge-{{ 'danger' if 'Negative' in flag or 'No correct' in flag else 'warning' }}">{{ flag }}</span><br>
+                            {% endfor %}
+                        </td>
+                    </tr>
+                    {% endfor %}
+                </tbody>
+            </table>
+        </div>
+        {% endif %}
     </div>
 </body>
 </html>
@@ -571,13 +623,33 @@ def exam_students(exam_id):
         print(f"✅ Found {len(students)} students who took this exam")
         print(f"{'='*60}\n")
         
+        from app.item_analysis import get_item_analyzer
+        analysis = get_item_analyzer().get_report(exam_id)
+        
         return render_template_string(
             EXAM_STUDENTS_PAGE,
             exam=exam,
-            students=students
+            students=students,
+            analysis=analysis
         )
     except Exception as e:
         print(f"❌ Exam students error: {str(e)}")
         print(traceback.format_exc())
         flash(f'حدث خطأ في عرض الطلاب', 'danger')
         return redirect('/instructor/dashboard')
+
+@instructor_bp.route('/exam/<int:exam_id>/item-analysis')
+@require_instructor
+def exam_item_analysis(exam_id):
+    """Item analysis report for an exam as JSON"""
+    try:
+        exam = Exam.get_exam_by_id(exam_id)
+        if not exam:
+            return jsonify({'status': 'error', 'message': 'الامتحان غير موجود'}), 404
+        
+        from app.item_analysis import get_item_analyzer
+        return jsonify(get_item_analyzer().get_report(exam_id))
+    except Exception as e:
+        print(f"❌ Item analysis error: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'status': 'error', 'message': str(e)}), 500
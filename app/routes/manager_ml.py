@@ -1,6 +1,6 @@
 # app/routes/manager_ml.py - FIXED VERSION
 
-from flask import Blueprint, render_template_string, session, redirect, jsonify
+from flask import Blueprint, render_template_string, session, redirect, jsonify, request
 import logging
 
 logger = logging.getLogger(__name__)
@@ -105,6 +105,53 @@ def analytics_dashboard():
             message=f"Error: {str(e)}"
         )
 
+@manager_ml_bp.route('/at-risk')
+@require_manager
+def at_risk_report():
+    """Paginated, sortable at-risk report over all active students"""
+    try:
+        from app.risk_analyzer import get_risk_analyzer
+        
+        report = get_risk_analyzer().get_report(
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 25, type=int),
+            sort=request.args.get('sort', 'risk_score'),
+            order=request.args.get('order', 'desc'),
+            level=request.args.get('level')
+        )
+        
+        return render_template_string(AT_RISK_TEMPLATE,
+            username=session.get('username', 'Manager'),
+            report=report
+        )
+    except Exception as e:
+        logger.error(f"At-risk report error: {str(e)}")
+        return render_template_string(TEMPLATE,
+            username=session.get('username', 'Manager'),
+            has_data=False,
+            message=f"Error: {str(e)}"
+        )
+
+@manager_ml_bp.route('/api/at-risk')
+@require_manager
+def api_at_risk():
+    """API: at-risk report as JSON"""
+    try:
+        from app.risk_analyzer import get_risk_analyzer
+        
+        report = get_risk_analyzer().get_report(
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', 25, type=int),
+            sort=request.args.get('sort', 'risk_score'),
+            order=request.args.get('order', 'desc'),
+            level=request.args.get('level')
+        )
+        report['status'] = 'success'
+        return jsonify(report)
+    except Exception as e:
+        logger.error(f"API at-risk error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 TEMPLATE = '''
 <!DOCTYPE html>
 <html>
@@ -131,6 +178,7 @@ TEMPLATE = '''
             <h1>📊 Analytics</h1>
             <p>Welcome {{ username }}</p>
         </div>
+        <p style="margin-bottom: 20px;"><a href="/manager/ml/at-risk">⚠️ At-Risk Students Report →</a></p>
         
         {% if has_data %}
             <div class="stats">
@@ -187,3 +235,110 @@ TEMPLATE = '''
 </body>
 </html>
 '''
+
+AT_RISK_TEMPLATE = '''
+<!DOCTYPE html>
+<html>
+<head>
+    <title>At-Risk Students</title>
+    <style>
+        body { font-family: Arial; margin: 20px; background: #f5f5f5; }
+        .container { max-width: 1200px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; }
+        .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; }
+        .stats { display: grid; grid-template-columns: repeat(3, 1fr); gap: 15px; margin-bottom: 20px; }
+        .stat { background: #f9f9f9; padding: 15px; border-radius: 5px; text-align: center; }
+        .stat h3 { color: #666; font-size: 12px; margin-bottom: 10px; }
+        .stat-value { font-size: 28px; font-weight: bold; }
+        .high { color: #dc3545; }
+        .medium { color: #fd7e14; }
+        .low { color: #28a745; }
+        a { color: #667eea; text-decoration: none; }
+        table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+        th { background: #f5f5f5; padding: 10px; text-align: left; }
+        td { padding: 10px; border-bottom: 1px solid #eee; }
+        .pager { margin-top: 20px; display: flex; gap: 15px; align-items: center; }
+        .filters a { margin-right: 10px; }
+    </style>
+</head>
+<body>
+    {% macro sort_link(field, label) -%}
+        <a href="?sort={{ field }}&order={{ 'asc' if report.sort == field and report.order == 'desc' else 'desc' }}&per_page={{ report.per_page }}{% if report.level %}&level={{ report.level }}{% endif %}">
+            {{ label }}{% if report.sort == field %} {{ '▼' if report.order == 'desc' else '▲' }}{% endif %}
+        </a>
+    {%- endmacro %}
+    <div class="container">
+        <a href="/manager/ml/dashboard">← Back</a>
+        <div class="header">
+            <h1>⚠️ At-Risk Students</h1>
+            <p>Welcome {{ username }}{% if report.refreshed_at %} - updated {{ report.refreshed_at }}{% endif %}</p>
+        </div>
+        
+        <div class="stats">
+            <div class="stat">
+                <h3>High Risk</h3>
+                <div class="stat-value high">{{ report.summary.high }}</div>
+            </div>
+            <div class="stat">
+                <h3>Medium Risk</h3>
+                <div class="stat-value medium">{{ report.summary.medium }}</div>
+            </div>
+            <div class="stat">
+                <h3>Low Risk</h3>
+                <div class="stat-value low">{{ report.summary.low }}</div>
+            </div>
+        </div>
+        
+        <div class="filters">
+            Filter:
+            <a href="?sort={{ report.sort }}&order={{ report.order }}&per_page={{ report.per_page }}">All</a>
+            <a href="?sort={{ report.sort }}&order={{ report.order }}&per_page={{ report.per_page }}&level=high" class="high">High</a>
+            <a href="?sort={{ report.sort }}&order={{ report.order }}&per_page={{ report.per_page }}&level=medium" class="medium">Medium</a>
+            <a href="?sort={{ report.sort }}&order={{ report.order }}&per_page={{ report.per_page }}&level=low" class="low">Low</a>
+        </div>
+        
+        {% if report.rows %}
+        <table>
+            <thead>
+                <tr>
+                    <th>{{ sort_link('name', 'Name') }}</th>
+                    <th>{{ sort_link('risk_score', 'Risk') }}</th>
+                    <th>{{ sort_link('avg_score', 'Avg') }}</th>
+                    <th>{{ sort_link('trend', 'Trend') }}</th>
+                    <th>{{ sort_link('std_dev', 'Std Dev') }}</th>
+                    <th>{{ sort_link('attendance_rate', 'Attendance') }}</th>
+                    <th>{{ sort_link('exam_count', 'Exams') }}</th>
+                    <th>Factors</th>
+                </tr>
+            </thead>
+            <tbody>
+            {% for r in report.rows %}
+            <tr>
+                <td>{{ r.name }}<br><small>{{ r.email }}</small></td>
+                <td class="{{ r.risk_level }}"><strong>{{ r.risk_score }}</strong></td>
+                <td>{{ r.avg_score }}</td>
+                <td>{{ r.trend }}</td>
+                <td>{{ r.std_dev }}</td>
+                <td>{{ r.attendance_rate ~ '%' if r.attendance_rate is not none else 'N/A' }}</td>
+                <td>{{ r.exam_count }}</td>
+                <td>{{ r.factors|join(', ') if r.factors else '-' }}</td>
+            </tr>
+            {% endfor %}
+            </tbody>
+        </table>
+        
+        <div class="pager">
+            {% set qs = '&sort=' ~ report.sort ~ '&order=' ~ report.order ~ '&per_page=' ~ report.per_page ~ ('&level=' ~ report.level if report.level else '') %}
+            {% if report.page > 1 %}<a href="?page={{ report.page - 1 }}{{ qs }}">← Prev</a>{% endif %}
+            <span>Page {{ report.page }} of {{ report.pages }} ({{ report.total }} students)</span>
+            {% if report.page < report.pages %}<a href="?page={{ report.page + 1 }}{{ qs }}">Next →</a>{% endif %}
+        </div>
+        {% else %}
+            <div style="padding: 40px; text-align: center; color: #999;">
+                <h2>📚 No Data</h2>
+                <p>No active students match this filter</p>
+            </div>
+        {% endif %}
+    </div>
+</body>
+</html>
+'''
@@ -1,14 +1,14 @@
 # app/routes/student.py - Student Routes - PROFESSIONAL COMPLETE VERSION
 # All bugs fixed, all features preserved, professional design
 
-from flask import Blueprint, jsonify, render_template_string, session, redirect, request, flash
+from flask import Blueprint, Response, jsonify, render_template_string, session, redirect, request, flash, stream_with_context
 from app.models import Student, Question, Exam
+from app.utils.cache import TTLCache
+from app.utils.rate_limit import rate_limit
 from functools import wraps
 from datetime import datetime
 import traceback
 import logging
-from app.chatbot import get_chatbot
-from app.ml_helper import get_ml_helper
 import json
 
 logger = logging.getLogger(__name__)
@@ -46,8 +46,48 @@ def chatbot_page():
     return render_template_string(CHATBOT_TEMPLATE, username=username)
 
 
+# Chatbot context per student; built on the first message and dropped when the student submits an exam
+chatbot_context_cache = TTLCache(maxsize=5000, ttl=3600)
+
+
+def _chatbot_context(student_id):
+    """معلومات الطالب اللي بتتبعت للـ Chatbot كسياق"""
+    context = chatbot_context_cache.get(student_id)
+    if context is None:
+        context = _build_chatbot_context(student_id)
+        chatbot_context_cache.set(student_id, context)
+    return context
+
+
+def _build_chatbot_context(student_id):
+    avg_score = Student.get_average_score(student_id)
+    completed_exams = Student.get_completed_exams(student_id)
+    exam_count = len(completed_exams) if completed_exams else 0
+    
+    last_exam = None
+    last_score = None
+    if completed_exams:
+        last_exam = completed_exams[0][0]  # اسم آخر امتحان
+        last_score = completed_exams[0][1]  # درجة آخر امتحان
+    
+    return {
+        'name': session.get('username'),
+        'avg_score': f"{avg_score:.1f}" if avg_score else 'N/A',
+        'exam_count': exam_count,
+        'last_exam': last_exam or 'لا يوجد',
+        'last_score': f"{last_score:.1f}" if last_score else 'N/A'
+    }
+
+
+def _sse(data, event=None):
+    """Format one Server-Sent Event"""
+    frame = f"event: {event}\n" if event else ''
+    return frame + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @student_bp.route('/chatbot/ask', methods=['POST'])
 @require_student
+@rate_limit('chat')
 def chatbot_ask():
     """API للتحدث مع الـ Chatbot"""
     try:
@@ -57,28 +97,10 @@ def chatbot_ask():
         if not user_message:
             return jsonify({'error': 'الرسالة فارغة'}), 400
         
-        # جلب معلومات الطالب للسياق
-        from app.models import Student
-        
-        avg_score = Student.get_average_score(student_id)
-        completed_exams = Student.get_completed_exams(student_id)
-        exam_count = len(completed_exams) if completed_exams else 0
-        
-        last_exam = None
-        last_score = None
-        if completed_exams:
-            last_exam = completed_exams[0][0]  # اسم آخر امتحان
-            last_score = completed_exams[0][1]  # درجة آخر امتحان
-        
-        student_context = {
-            'name': session.get('username'),
-            'avg_score': f"{avg_score:.1f}" if avg_score else 'N/A',
-            'exam_count': exam_count,
-            'last_exam': last_exam or 'لا يوجد',
-            'last_score': f"{last_score:.1f}" if last_score else 'N/A'
-        }
+        student_context = _chatbot_context(student_id)
         
         # الحصول على الرد من الـ Chatbot
+        from app.chatbot import get_chatbot
         chatbot = get_chatbot()
         bot_response = chatbot.get_response(user_message, student_context)
         
@@ -95,10 +117,47 @@ def chatbot_ask():
         }), 500
 
 
+@student_bp.route('/chatbot/ask/stream', methods=['POST'])
+@require_student
+@rate_limit('chat')
+def chatbot_ask_stream():
+    """نفس /chatbot/ask لكن الرد بيوصل كـ Server-Sent Events أول بأول"""
+    user_message = request.form.get('message', '').strip()
+    if not user_message:
+        return jsonify({'error': 'الرسالة فارغة'}), 400
+    
+    try:
+        student_context = _chatbot_context(session.get('student_id'))
+        from app.chatbot import get_chatbot
+        chatbot = get_chatbot()
+    except Exception as e:
+        logger.error(f"Chatbot error: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'response': 'عذراً، حدث خطأ. حاول مرة أخرى.'
+        }), 500
+    
+    def events():
+        try:
+            # Each chunk is relayed as soon as it arrives; nothing is buffered here
+            for chunk in chatbot.stream_response(user_message, student_context):
+                yield _sse({'text': chunk})
+            yield _sse({}, event='done')
+        except Exception as e:
+            logger.error(f"Chatbot stream error: {str(e)}")
+            yield _sse({'text': 'عذراً، حدث خطأ. حاول مرة أخرى.'}, event='error')
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 # ==================== ML INSIGHTS ROUTES ====================
 
 @student_bp.route('/insights')
 @require_student
+@rate_limit('ml', json_response=False)
 def student_insights():
     """صفحة رؤى الأداء المدعومة بـ ML"""
     try:
@@ -106,6 +165,7 @@ def student_insights():
         username = session.get('username', 'Student')
         
         # الحصول على التحليلات من ML Helper
+        from app.ml_helper import get_ml_helper
         ml_helper = get_ml_helper()
         insights = ml_helper.get_student_insights(student_id)
         prediction = ml_helper.predict_next_exam(student_id)
@@ -124,9 +184,11 @@ def student_insights():
 
 @student_bp.route('/study-tips/<topic>')
 @require_student
+@rate_limit('chat')
 def get_study_tips(topic):
     """الحصول على نصائح دراسية لموضوع معين"""
     try:
+        from app.chatbot import get_chatbot
         chatbot = get_chatbot()
         tips = chatbot.get_study_tips(topic)
         
@@ -177,6 +239,7 @@ def dashboard():
 
 @student_bp.route('/exam/<int:exam_id>')
 @require_student
+@rate_limit('exam', json_response=False)
 def take_exam(exam_id):
     """Start taking an exam - FIXED"""
     try:
@@ -261,6 +324,7 @@ def take_exam(exam_id):
         flash(f'حدث خطأ: {str(e)}', 'danger')
         return redirect('/student/dashboard')
 
+# Not rate limited: a 429 here would drop the student's answers
 @student_bp.route('/exam/submit', methods=['POST'])
 @require_student
 def submit_exam():
@@ -361,6 +425,17 @@ def submit_exam():
         # Update TAKES record with final score
         Student.submit_exam(takes_id, total_score, grade)
         
+        # Graded take invalidates the exam's cached item analysis
+        from app.item_analysis import get_item_analyzer
+        get_item_analyzer().invalidate(exam_id)
+        
+        # ...and re-materializes the student's performance snapshot
+        from app.performance_snapshot import get_snapshot_store
+        get_snapshot_store().materialize(student_id)
+        
+        # ...and drops the chatbot's cached context for the student
+        chatbot_context_cache.delete(student_id)
+        
         # Clear session
         session.pop('current_takes_id', None)
         session.pop('current_exam_id', None)
@@ -1055,41 +1130,80 @@ CHATBOT_TEMPLATE = '''
             chatBox.appendChild(typingDiv);
             chatBox.scrollTop = chatBox.scrollHeight;
             
-            // إرسال للسيرفر
-            fetch('/student/chatbot/ask', {
+            // إرسال للسيرفر - الرد بيوصل كـ Server-Sent Events
+            fetch('/student/chatbot/ask/stream', {
                 method: 'POST',
                 headers: {'Content-Type': 'application/x-www-form-urlencoded'},
                 body: 'message=' + encodeURIComponent(message)
             })
-            .then(res => res.json())
-            .then(data => {
-                // إزالة typing indicator
-                document.getElementById('typing').remove();
-                
-                if (data.status === 'success') {
-                    addMessage(data.response, 'bot');
-                } else {
-                    addMessage('عذراً، حدث خطأ. حاول مرة أخرى.', 'bot');
-                }
+            .then(res => {
+                if (!res.ok || !res.body) throw new Error('stream unavailable');
+                return readStream(res.body.getReader());
             })
             .catch(error => {
-                document.getElementById('typing').remove();
+                const typing = document.getElementById('typing');
+                if (typing) typing.remove();
                 addMessage('عذراً، حدث خطأ في الاتصال.', 'bot');
             });
         }
         
+        function readStream(reader) {
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let textSpan = null;
+            
+            function handleEvent(frame) {
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (event === 'done' || !data) return;
+                
+                const payload = JSON.parse(data);
+                if (!textSpan) {
+                    // أول جزء: شيل الـ typing indicator وابدأ رسالة المساعد
+                    document.getElementById('typing').remove();
+                    textSpan = addMessage('', 'bot');
+                }
+                textSpan.textContent += payload.text;
+                chatBox.scrollTop = chatBox.scrollHeight;
+            }
+            
+            function pump() {
+                return reader.read().then(({done, value}) => {
+                    if (done) {
+                        if (buffer.trim()) handleEvent(buffer);
+                        if (!textSpan) throw new Error('empty stream');
+                        return;
+                    }
+                    buffer += decoder.decode(value, {stream: true});
+                    const frames = buffer.split('\n\n');
+                    buffer = frames.pop();
+                    frames.forEach(handleEvent);
+                    return pump();
+                });
+            }
+            
+            return pump();
+        }
+        
         function addMessage(text, type) {
             const div = document.createElement('div');
             div.className = 'message ' + type + '-message';
             
-            if (type === 'user') {
-                div.innerHTML = '<strong>أنت:</strong> ' + text;
-            } else {
-                div.innerHTML = '<strong>المساعد:</strong> ' + text;
-            }
+            const label = document.createElement('strong');
+            label.textContent = type === 'user' ? 'أنت: ' : 'المساعد: ';
+            const span = document.createElement('span');
+            span.style.whiteSpace = 'pre-wrap';
+            span.textContent = text;
+            div.appendChild(label);
+            div.appendChild(span);
             
             chatBox.appendChild(div);
             chatBox.scrollTop = chatBox.scrollHeight;
+            return span;
         }
     </script>
 </body>
@@ -1,7 +1,7 @@
 # app/routes/student_ml.py - FIXED VERSION
 # Handles missing data gracefully, shows useful messages
 
-from flask import Blueprint, render_template_string, session, redirect, jsonify
+from flask import Blueprint, render_template_string, session, redirect, jsonify, request, make_response
 import logging
 import traceback
 import json
@@ -26,8 +26,15 @@ def require_student(f=None):
     else:
         return decorator(f)
 
+def _conditional(response, etag):
+    """Attach the snapshot ETag and turn the response into a 304 if the client has it"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 # ==================== ANALYTICS DASHBOARD ====================
 
+# Not rate limited: served from the snapshot, and 304 revalidations must not spend the ml budget
 @student_ml_bp.route('/analytics')
 @require_student
 def analytics_dashboard():
@@ -38,71 +45,24 @@ def analytics_dashboard():
         
         logger.info(f"ML Analytics requested for student {student_id}")
         
-        # Get data from database directly
-        from app.models import Student
-        from app.database import DatabaseConnection
-        
-        # Get student performance data
-        query = """
-        SELECT COUNT(*) as exam_count, AVG(Score) as avg_score, MAX(Score) as max_score, MIN(Score) as min_score
-        FROM TAKES
-        WHERE S_ID = ? AND Score IS NOT NULL AND Score > 0
-        """
-        result = DatabaseConnection.fetch_one(query, (student_id,))
+        # Served from the in-memory performance snapshot
+        from app.performance_snapshot import get_snapshot_store
+        snapshot = get_snapshot_store().get(student_id)
         
-        if result and result[0] > 0:  # Has exam data
-            exam_count, avg_score, max_score, min_score = result
-            
-            # Get detailed exam history
-            exam_history_query = """
-            SELECT TOP 10
-                c.name as course,
-                e.Total_marks,
-                t.Score,
-                t.Grade,
-                t.Date_Taken
-            FROM TAKES t
-            JOIN Exam e ON t.Exam_ID = e.Exam_ID
-            JOIN Course c ON e.Course_ID = c.Course_ID
-            WHERE t.S_ID = ? AND t.Score IS NOT NULL
-            ORDER BY t.Date_Taken DESC
-            """
-            exam_history = DatabaseConnection.fetch_all(exam_history_query, (student_id,)) or []
-            
-            performance_summary = {
-                'exam_count': exam_count,
-                'avg_score': float(avg_score) if avg_score else 0,
-                'max_score': float(max_score) if max_score else 0,
-                'min_score': float(min_score) if min_score else 0,
-                'status': 'Data Available',
-                'trend': 'Calculating...'
-            }
-            
-            # Calculate performance percentage
-            percentage = float(avg_score) if avg_score else 0
-            if percentage >= 90:
-                performance_level = 'Excellent'
-            elif percentage >= 80:
-                performance_level = 'Very Good'
-            elif percentage >= 70:
-                performance_level = 'Good'
-            elif percentage >= 60:
-                performance_level = 'Acceptable'
-            else:
-                performance_level = 'Needs Improvement'
-            
-            logger.info(f"✓ Found {exam_count} exams for student {student_id}")
+        if snapshot and snapshot.exam_count > 0:  # Has exam data
+            logger.info(f"✓ Found {snapshot.exam_count} exams for student {student_id}")
             
-            return render_template_string(ML_ANALYTICS_TEMPLATE,
+            html = render_template_string(ML_ANALYTICS_TEMPLATE,
                 username=username,
                 has_data=True,
-                exam_count=exam_count,
-                avg_score=f"{avg_score:.1f}" if avg_score else "0",
-                max_score=f"{max_score:.1f}" if max_score else "0",
-                min_score=f"{min_score:.1f}" if min_score else "0",
-                performance_level=performance_level,
-                exam_history=exam_history
+                exam_count=snapshot.exam_count,
+                avg_score=f"{snapshot.avg_score:.1f}",
+                max_score=f"{snapshot.max_score:.1f}",
+                min_score=f"{snapshot.min_score:.1f}",
+                performance_level=snapshot.performance_level,
+                exam_history=snapshot.history
             )
+            return _conditional(make_response(html), f"{snapshot.etag}-html")
         else:
             # No exam data yet
             logger.info(f"No exam data for student {student_id} - showing prompt")
@@ -129,22 +89,17 @@ def api_performance():
     """API: Get performance summary"""
     try:
         student_id = session.get('student_id')
-        from app.database import DatabaseConnection
-        
-        query = """
-        SELECT COUNT(*) as exams, AVG(Score) as avg, MAX(Score) as max, MIN(Score) as min
-        FROM TAKES WHERE S_ID = ? AND Score IS NOT NULL AND Score > 0
-        """
-        result = DatabaseConnection.fetch_one(query, (student_id,))
+        from app.performance_snapshot import get_snapshot_store
+        snapshot = get_snapshot_store().get(student_id)
         
-        if result and result[0] > 0:
-            return jsonify({
-                'exams_taken': result[0],
-                'average_score': float(result[1]) if result[1] else 0,
-                'max_score': float(result[2]) if result[2] else 0,
-                'min_score': float(result[3]) if result[3] else 0,
+        if snapshot and snapshot.exam_count > 0:
+            return _conditional(jsonify({
+                'exams_taken': snapshot.exam_count,
+                'average_score': snapshot.avg_score,
+                'max_score': snapshot.max_score,
+                'min_score': snapshot.min_score,
                 'status': 'success'
-            })
+            }), snapshot.etag)
         else:
             return jsonify({
                 'status': 'no_data',
@@ -160,31 +115,13 @@ def api_trend():
     """API: Get performance trend"""
     try:
         student_id = session.get('student_id')
-        from app.database import DatabaseConnection
-        
-        query = """
-        SELECT TOP 20
-            t.Date_Taken,
-            t.Score,
-            e.Total_marks,
-            CAST(t.Score * 100.0 / e.Total_marks AS DECIMAL(5,2)) as percentage
-        FROM TAKES t
-        JOIN Exam e ON t.Exam_ID = e.Exam_ID
-        WHERE t.S_ID = ? AND t.Score IS NOT NULL
-        ORDER BY t.Date_Taken ASC
-        """
-        results = DatabaseConnection.fetch_all(query, (student_id,)) or []
+        from app.performance_snapshot import get_snapshot_store
+        snapshot = get_snapshot_store().get(student_id)
         
-        trend_data = [
-            {
-                'date': str(r[0]) if r[0] else '',
-                'score': float(r[1]) if r[1] else 0,
-                'percentage': float(r[3]) if r[3] else 0
-            }
-            for r in results
-        ]
+        if not snapshot:
+            return jsonify({'trend': [], 'status': 'success'})
         
-        return jsonify({'trend': trend_data, 'status': 'success'})
+        return _conditional(jsonify({'trend': snapshot.trend, 'status': 'success'}), snapshot.etag)
     except Exception as e:
         logger.error(f"API trend error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,170 @@
+# app/utils/login_throttle.py - Sliding-window login throttling with progressive back-off
+
+from app.utils.rate_limit import create_redis_client
+from collections import OrderedDict, deque
+import os
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== STORES ====================
+
+class MemoryWindowStore:
+    """Event timestamps per key in this process; least recently used keys are dropped past max_keys"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._events = OrderedDict()
+
+    def add(self, key, now, window):
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                events = self._events[key] = deque()
+            events.append(now)
+            self._trim(events, now - window)
+            self._events.move_to_end(key)
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+
+    def recent(self, key, now, window):
+        """Timestamps of the key's events inside the window, oldest first"""
+        with self._lock:
+            events = self._events.get(key)
+            if not events:
+                return []
+            self._trim(events, now - window)
+            return list(events)
+
+    def clear(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+    @staticmethod
+    def _trim(events, cutoff):
+        while events and events[0] <= cutoff:
+            events.popleft()
+
+
+class RedisWindowStore:
+    """Event timestamps in Redis sorted sets, shared by every worker"""
+
+    def __init__(self, client, prefix='login:'):
+        self.client = client
+        self.prefix = prefix
+
+    def add(self, key, now, window):
+        pipe = self.client.pipeline()
+        pipe.zadd(self.prefix + key, {uuid.uuid4().hex: now})
+        pipe.zremrangebyscore(self.prefix + key, 0, now - window)
+        pipe.expire(self.prefix + key, int(window) + 1)
+        pipe.execute()
+
+    def recent(self, key, now, window):
+        return [score for _, score in self.client.zrangebyscore(self.prefix + key, now - window, '+inf', withscores=True)]
+
+    def clear(self, key):
+        self.client.delete(self.prefix + key)
+
+
+# ==================== THROTTLE ====================
+
+class LoginThrottle:
+    """
+    Checked before any DB lookup or password hash:
+
+    - per IP: at most IP_FAILURES failed logins per IP_WINDOW seconds
+      (LOGIN_IP_FAILURES); successful logins are not counted, so a whole
+      class signing in from one NAT address is never blocked
+    - per email: after EMAIL_FAILURES failed logins within EMAIL_WINDOW,
+      each further attempt waits BACKOFF_BASE * 2^(extra failures) seconds
+      after the last failure, capped at BACKOFF_MAX
+
+    A successful login clears the email's failures. Uses Redis when
+    REDIS_URL is set; a failing store never blocks logins.
+    """
+
+    IP_FAILURES = int(os.getenv('LOGIN_IP_FAILURES', '100'))
+    IP_WINDOW = 300
+
+    EMAIL_FAILURES = 5
+    EMAIL_WINDOW = 900
+    BACKOFF_BASE = 30
+    BACKOFF_MAX = 900
+
+    def __init__(self, store=None):
+        self._store = store
+        self._lock = threading.Lock()
+        self.rejected_ip = 0
+        self.rejected_email = 0
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    client = create_redis_client()
+                    self._store = RedisWindowStore(client) if client else MemoryWindowStore()
+        return self._store
+
+    def check(self, email, ip):
+        """
+        Decide whether an attempt may proceed
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        now = time.time()
+        try:
+            # Email back-off first, so a locked account does not use up the IP's budget
+            failures = self.store.recent(f"email:{email.lower()}", now, self.EMAIL_WINDOW)
+            if len(failures) >= self.EMAIL_FAILURES:
+                extra = len(failures) - self.EMAIL_FAILURES
+                wait = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** extra)
+                remaining = failures[-1] + wait - now
+                if remaining > 0:
+                    self.rejected_email += 1
+                    return False, remaining
+
+            failures = self.store.recent(f"ip:{ip}", now, self.IP_WINDOW)
+            if len(failures) >= self.IP_FAILURES:
+                self.rejected_ip += 1
+                return False, failures[len(failures) - self.IP_FAILURES] + self.IP_WINDOW - now
+        except Exception as e:
+            logger.warning(f"Login throttle store error: {str(e)}")
+        return True, 0.0
+
+    def record_failure(self, email, ip):
+        now = time.time()
+        try:
+            self.store.add(f"email:{email.lower()}", now, self.EMAIL_WINDOW)
+            self.store.add(f"ip:{ip}", now, self.IP_WINDOW)
+        except Exception as e:
+            logger.warning(f"Login throttle store error: {str(e)}")
+
+    def record_success(self, email):
+        try:
+            self.store.clear(f"email:{email.lower()}")
+        except Exception as e:
+            logger.warning(f"Login throttle store error: {str(e)}")
+
+    def stats(self):
+        return {
+            'store': type(self._store).__name__ if self._store else None,
+            'rejected_ip': self.rejected_ip,
+            'rejected_email': self.rejected_email
+        }
+
+
+# Instance واحد
+login_throttle_instance = LoginThrottle()
+
+
+def get_login_throttle():
+    """الحصول على instance الـ Login Throttle"""
+    return login_throttle_instance
@@ -0,0 +1,203 @@
+# app/utils/rate_limit.py - Token-bucket rate limiting per user and endpoint
+
+from collections import OrderedDict, namedtuple
+from functools import wraps
+import math
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# capacity: burst size; per_second: refill rate
+Policy = namedtuple('Policy', ['capacity', 'per_second'])
+
+# Each group has its own buckets, so chat traffic can never use up the exam budget
+POLICIES = {
+    'exam': Policy(capacity=120, per_second=2.0),
+    'chat': Policy(capacity=10, per_second=1 / 6),
+    'ml': Policy(capacity=6, per_second=1 / 10)
+}
+
+
+# ==================== STORES ====================
+
+class MemoryBucketStore:
+    """Buckets in this process only; least recently used buckets are dropped past max_keys"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, policy, cost=1):
+        """
+        Take `cost` tokens from a bucket
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (policy.capacity, now))
+            tokens = min(policy.capacity, tokens + (now - updated_at) * policy.per_second)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        if allowed:
+            return True, 0.0
+        return False, (cost - tokens) / policy.per_second
+
+
+class RedisBucketStore:
+    """Buckets in Redis, shared by every worker; each take is one atomic Lua call"""
+
+    _SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self.prefix = prefix
+        self._take = client.register_script(self._SCRIPT)
+
+    def take(self, key, policy, cost=1):
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[policy.capacity, policy.per_second, cost])
+        if allowed:
+            return True, 0.0
+        return False, (cost - float(tokens)) / policy.per_second
+
+
+def create_redis_client():
+    """Redis client from REDIS_URL, or None when unset or unavailable"""
+    url = os.getenv('REDIS_URL')
+    if not url:
+        return None
+    try:
+        import redis
+        client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        client.ping()
+        return client
+    except Exception as e:
+        logger.warning(f"⚠️ Redis unavailable ({str(e)}), using in-process limits")
+        return None
+
+
+# ==================== LIMITER ====================
+
+class RateLimiter:
+    """
+    Token buckets keyed by policy group and user.
+
+    Uses Redis when REDIS_URL is set (limits shared by all workers),
+    otherwise one in-memory store per process. A failing shared store
+    never blocks requests.
+    """
+
+    def __init__(self, policies=None, store=None):
+        self.policies = dict(policies or POLICIES)
+        self._store = store
+        self._store_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.allowed = {}
+        self.limited = {}
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    client = create_redis_client()
+                    self._store = RedisBucketStore(client) if client else MemoryBucketStore()
+                    logger.info(f"✓ Rate limiter using {type(self._store).__name__}")
+        return self._store
+
+    def check(self, group, identity, cost=1):
+        """
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        policy = self.policies[group]
+        try:
+            allowed, retry_after = self.store.take(f"{group}:{identity}", policy, cost)
+        except Exception as e:
+            logger.warning(f"Rate limit store error: {str(e)}")
+            allowed, retry_after = True, 0.0
+
+        with self._lock:
+            counter = self.allowed if allowed else self.limited
+            counter[group] = counter.get(group, 0) + 1
+        return allowed, retry_after
+
+    def stats(self):
+        with self._lock:
+            return {
+                'store': type(self._store).__name__ if self._store else None,
+                'allowed': dict(self.allowed),
+                'limited': dict(self.limited)
+            }
+
+
+# Instance واحد
+rate_limiter_instance = RateLimiter()
+
+
+def get_rate_limiter():
+    """الحصول على instance الـ Rate Limiter"""
+    return rate_limiter_instance
+
+
+def rate_limit(group, json_response=True):
+    """
+    Decorator: take one token from the user's `group` bucket or answer 429
+
+    The user is the logged-in user_id, or the client address when anonymous.
+    """
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            from flask import session, request, jsonify, make_response
+
+            identity = session.get('user_id') or request.remote_addr or 'anonymous'
+            allowed, retry_after = get_rate_limiter().check(group, identity)
+            if allowed:
+                return func(*args, **kwargs)
+
+            wait = max(1, math.ceil(retry_after))
+            message = f'طلبات كثيرة. حاول مرة أخرى بعد {wait} ثانية.'
+            if json_response:
+                response = make_response(jsonify({'status': 'error', 'response': message}), 429)
+            else:
+                response = make_response(message, 429)
+                response.mimetype = 'text/plain'
+            response.headers['Retry-After'] = str(wait)
+            return response
+        return decorated_function
+    return decorator
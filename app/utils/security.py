@@ -1,17 +1,133 @@
 import bcrypt
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolBusy(RuntimeError):
+    """Too many password operations are already queued"""
+
+
+# ==================== WORKER FUNCTIONS ====================
+# Module level so the pool processes can import them
+
+def _lower_priority():
+    """Pool initializer: hashing yields the CPU to request threads"""
+    try:
+        os.nice(5)
+    except (AttributeError, OSError):
+        pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, hashed_password):
+    if hashed_password.startswith('$2'):
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    # Hashes written by werkzeug (pbkdf2 / scrypt)
+    from werkzeug.security import check_password_hash
+    return check_password_hash(hashed_password, password)
+
 
 class PasswordHelper:
+    """
+    bcrypt on a bounded process pool.
+
+    - PASSWORD_WORKERS processes (default: CPU count - 1), at lower priority
+    - at most MAX_QUEUE_PER_WORKER operations waiting per worker; beyond that
+      PasswordPoolBusy is raised instead of queueing without bound
+    - the bcrypt cost is calibrated once so a hash takes about
+      PASSWORD_HASH_TARGET_MS (or fixed with BCRYPT_ROUNDS)
+    """
+
+    MIN_ROUNDS = 10
+    MAX_ROUNDS = 15
+    MAX_QUEUE_PER_WORKER = 8
+    TIMEOUT = 30
+
+    _executor = None
+    _slots = None
+    _rounds = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _pool(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    workers = int(os.getenv('PASSWORD_WORKERS', '0')) or max(1, (os.cpu_count() or 2) - 1)
+                    methods = multiprocessing.get_all_start_methods()
+                    # forkserver is safe with the web server's threads; Windows only has spawn
+                    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                    cls._slots = threading.BoundedSemaphore(workers * (1 + cls.MAX_QUEUE_PER_WORKER))
+                    cls._executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                                        initializer=_lower_priority)
+                    logger.info(f"✓ Password pool started: {workers} processes")
+        return cls._executor
+
+    @classmethod
+    def _run(cls, fn, *args):
+        pool = cls._pool()
+        if not cls._slots.acquire(blocking=False):
+            raise PasswordPoolBusy('Password pool queue is full')
+        try:
+            future = pool.submit(fn, *args)
+        except Exception:
+            cls._slots.release()
+            raise
+        future.add_done_callback(lambda f: cls._slots.release())
+        return future.result(timeout=cls.TIMEOUT)
+
+    @classmethod
+    def rounds(cls):
+        """bcrypt cost factor, calibrated on first use"""
+        if cls._rounds is None:
+            with cls._lock:
+                if cls._rounds is None:
+                    fixed = os.getenv('BCRYPT_ROUNDS')
+                    cls._rounds = int(fixed) if fixed else cls._calibrate()
+        return cls._rounds
+
+    @classmethod
+    def _calibrate(cls):
+        """Highest cost whose hash time stays within the target"""
+        target = float(os.getenv('PASSWORD_HASH_TARGET_MS', '250')) / 1000
+        rounds = cls.MIN_ROUNDS
+        start = time.perf_counter()
+        _hash('calibration', rounds)
+        elapsed = time.perf_counter() - start
+
+        # Each extra round doubles the work
+        while rounds < cls.MAX_ROUNDS and elapsed * 2 <= target:
+            rounds += 1
+            elapsed *= 2
+
+        logger.info(f"✓ bcrypt cost calibrated: {rounds} rounds (~{elapsed * 1000:.0f} ms per hash)")
+        return rounds
+
     @staticmethod
     def hash_password(password):
         """Hash a password for storing"""
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
-    
+        return PasswordHelper._run(_hash, password, PasswordHelper.rounds())
+
     @staticmethod
     def check_password(password, hashed_password):
         """Verify a password against a hash"""
-        return bcrypt.checkpw(
-            password.encode('utf-8'), 
-            hashed_password.encode('utf-8')
-        )
+        return PasswordHelper._run(_check, password, hashed_password)
+
+    @staticmethod
+    def needs_rehash(hashed_password):
+        """True if a stored hash is not bcrypt or uses a lower cost than the current one"""
+        if not hashed_password.startswith('$2'):
+            return True
+        try:
+            return int(hashed_password.split('$')[2]) < PasswordHelper.rounds()
+        except (IndexError, ValueError):
+            return True
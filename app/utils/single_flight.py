@@ -0,0 +1,81 @@
+# app/utils/single_flight.py - Coalesce identical concurrent calls into one
+
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    While a call for a key is in flight, other callers with the same key
+    wait for it and get its result (or its exception) instead of making
+    their own call. Nothing is kept once the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.wait_timeouts = 0
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn() for key, or join the call already running for key
+
+        Args:
+            timeout (float): Max seconds a follower waits for the leader
+
+        Returns:
+            tuple: (result, shared) - shared is True if another caller made the call
+
+        Raises:
+            TimeoutError: A follower gave up waiting for the leader
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self.wait_timeouts += 1
+                raise TimeoutError("Timed out waiting for in-flight call")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                'in_flight': len(self._calls),
+                'calls_made': self.leaders,
+                'calls_saved': self.coalesced,
+                'saved_rate': round(self.coalesced / total, 3) if total else 0.0,
+                'wait_timeouts': self.wait_timeouts
+            }
@@ -0,0 +1,98 @@
+# app/utils/startup.py - Startup modes, lazy subsystem loading and import-time report
+
+from contextlib import contextmanager
+import os
+import sys
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# eager: load everything in create_app (old behaviour)
+# lazy:  load heavy subsystems on first use
+# warm:  start serving immediately, load subsystems in a background thread
+STARTUP_MODES = ('eager', 'lazy', 'warm')
+
+
+def get_startup_mode():
+    """Read APP_STARTUP_MODE (default: lazy)"""
+    mode = os.getenv('APP_STARTUP_MODE', 'lazy').strip().lower()
+    if mode not in STARTUP_MODES:
+        logger.warning(f"⚠️ Unknown APP_STARTUP_MODE '{mode}', using 'lazy'")
+        return 'lazy'
+    return mode
+
+
+def _rss_mb():
+    """Peak resident memory in MB where the platform exposes it"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except Exception:
+        return None
+
+
+class StartupReport:
+    """Records how long each subsystem took to load and how many modules it pulled in"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+
+    @contextmanager
+    def track(self, name):
+        modules_before = len(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = {
+                'name': name,
+                'seconds': round(time.perf_counter() - started, 3),
+                'modules': len(sys.modules) - modules_before,
+                'peak_rss_mb': _rss_mb(),
+                'thread': threading.current_thread().name
+            }
+            with self._lock:
+                self._entries.append(entry)
+            logger.info(f"⏱️ Loaded {name} in {entry['seconds']}s (+{entry['modules']} modules)")
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+    def log(self):
+        """Log a summary table of everything tracked so far"""
+        entries = self.entries()
+        if not entries:
+            logger.info("⏱️ Startup report: no heavy subsystems loaded yet")
+            return
+        lines = [f"  {e['name']:<20} {e['seconds']:>7.3f}s  +{e['modules']:<5} modules  [{e['thread']}]" for e in entries]
+        total = sum(e['seconds'] for e in entries)
+        logger.info("⏱️ Startup report:\n" + "\n".join(lines) + f"\n  {'total':<20} {total:>7.3f}s")
+
+
+startup_report = StartupReport()
+
+
+def warm_in_background(loaders):
+    """
+    Run loaders in a daemon thread so the first request does not pay for them
+
+    Args:
+        loaders (list): (name, callable) pairs, run in order
+    """
+    def run():
+        for name, loader in loaders:
+            try:
+                loader()
+            except Exception as e:
+                logger.warning(f"⚠️ Background warm-up of {name} failed: {e}")
+        startup_report.log()
+
+    thread = threading.Thread(target=run, name='startup-warmup', daemon=True)
+    thread.start()
+    return thread
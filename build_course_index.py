@@ -0,0 +1,34 @@
+import argparse
+from app.course_index import get_course_index
+
+def build_course_index(full=False):
+    """Index courses, questions and notes for the chatbot (only changed documents unless full)"""
+    
+    index = get_course_index()
+    
+    print("\n" + "="*60)
+    print(f"📖 {'Rebuilding' if full else 'Refreshing'} course index...")
+    print("="*60 + "\n")
+    print(f"📌 Index: {index.path}")
+    print(f"📌 Notes: {index.notes_dir}\n")
+    
+    counts = index.refresh(full=full)
+    
+    print(f"✅ Added: {counts['added']} | Updated: {counts['updated']} | "
+          f"Removed: {counts['removed']} | Unchanged: {counts['unchanged']}")
+    
+    print("\n" + "="*60)
+    print(f"✅ {counts['documents']} documents indexed in {counts['seconds']}s")
+    print("="*60 + "\n")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the local retrieval index used by the chatbot')
+    parser.add_argument('--full', action='store_true', help='Drop the index and rebuild it from scratch')
+    args = parser.parse_args()
+    
+    try:
+        build_course_index(args.full)
+    except Exception as e:
+        print(f"\n❌ Fatal error: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,48 @@
+import argparse
+from app.irt_calibration import IRTCalibrator
+
+def calibrate_questions(model='2PL', max_iter=None, dry_run=False):
+    """Fit IRT parameters for every answered question and write them back"""
+    
+    print("\n" + "="*60)
+    print(f"📐 Starting {model} IRT Calibration...")
+    print("="*60 + "\n")
+    
+    summary = IRTCalibrator(model=model, max_iter=max_iter).run(dry_run=dry_run)
+    
+    if summary['status'] != 'success':
+        print(f"❌ {summary['message']}")
+        return
+    
+    print(f"✅ Answers: {summary['answers']} "
+          f"({summary['students']} students x {summary['questions']} questions)")
+    if summary['converged']:
+        print(f"✅ Converged in {summary['iterations']} iterations")
+    else:
+        print(f"⚠️  Not converged after {summary['iterations']} iterations - "
+              f"parameters may be imprecise, re-run with a higher --max-iter")
+    print(f"   Load: {summary['load_seconds']}s | Fit: {summary['fit_seconds']}s")
+    
+    print("\n" + "="*60)
+    if dry_run:
+        print(f"ℹ️  Dry run - {summary['calibrated']} questions calibrated, nothing written")
+    else:
+        print(f"✅ Calibration completed!")
+        print(f"   Written: {summary['written']}/{summary['questions']} questions "
+              f"(min {IRTCalibrator.MIN_RESPONSES} responses)")
+    print("="*60 + "\n")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calibrate the question bank with IRT')
+    parser.add_argument('--model', choices=['1PL', '2PL'], default='2PL')
+    parser.add_argument('--max-iter', type=int, default=None,
+                        help='Iteration cap (default: 100 for 1PL, 300 for 2PL)')
+    parser.add_argument('--dry-run', action='store_true', help='Fit without writing to the database')
+    args = parser.parse_args()
+    
+    try:
+        calibrate_questions(args.model, args.max_iter, args.dry_run)
+    except Exception as e:
+        print(f"\n❌ Fatal error: {e}")
+        import traceback
+        traceback.print_exc()
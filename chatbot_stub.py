@@ -0,0 +1,111 @@
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Gemini upstream, for testing chatbot latency behaviour offline.
+# Run:  python chatbot_stub.py --delay 2 --jitter 1 --fail-rate 0.1
+# Then: CHATBOT_UPSTREAM=stub CHATBOT_STUB_URL=http://127.0.0.1:8765 python run.py
+
+STUB_ANSWER = "🤖 (stub) هذه إجابة تجريبية من الخادم المحلي.\n• ذاكر بانتظام\n• خذ فترات راحة\n• اختبر نفسك"
+
+class StubHandler(BaseHTTPRequestHandler):
+    delay = 0.5
+    jitter = 0.0
+    fail_rate = 0.0
+    chunk_delay = 0.05
+
+    def _read_prompt(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b'{}'
+        try:
+            return json.loads(body.decode('utf-8')).get('prompt', '')
+        except ValueError:
+            return ''
+
+    def _simulate_latency(self):
+        time.sleep(max(0.0, self.delay + random.uniform(-self.jitter, self.jitter)))
+        return random.random() >= self.fail_rate
+
+    def do_POST(self):
+        if self.path == '/stream':
+            self._stream()
+            return
+        if self.path != '/generate':
+            self.send_error(404)
+            return
+
+        prompt = self._read_prompt()
+        if not self._simulate_latency():
+            self.send_error(500, 'Simulated upstream failure')
+            return
+
+        payload = json.dumps({'text': f"{STUB_ANSWER}\n\n({len(prompt)} chars)"}, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self):
+        """First chunk after the usual latency, then one word every chunk_delay seconds"""
+        prompt = self._read_prompt()
+        if not self._simulate_latency():
+            self.send_error(500, 'Simulated upstream failure')
+            return
+
+        # Chunked transfer encoding so clients see each line as soon as it is written
+        self.protocol_version = 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        words = f"{STUB_ANSWER}\n\n({len(prompt)} chars)".split(' ')
+        for i, word in enumerate(words):
+            chunk = word if i == len(words) - 1 else word + ' '
+            line = json.dumps({'text': chunk}, ensure_ascii=False).encode('utf-8') + b'\n'
+            self.wfile.write(f"{len(line):X}\r\n".encode('ascii') + line + b'\r\n')
+            self.wfile.flush()
+            time.sleep(self.chunk_delay)
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, format, *args):
+        print(f"[stub] {self.address_string()} - {format % args}")
+
+def run_stub(port=8765, delay=0.5, jitter=0.0, fail_rate=0.0, chunk_delay=0.05):
+    """Serve the stub upstream until interrupted"""
+    StubHandler.delay = delay
+    StubHandler.jitter = jitter
+    StubHandler.fail_rate = fail_rate
+    StubHandler.chunk_delay = chunk_delay
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+
+    print("\n" + "="*60)
+    print("🧪 Chatbot Stub Upstream")
+    print("="*60)
+    print(f"📌 Listening on: http://127.0.0.1:{port}")
+    print(f"📌 Latency: {delay}s ± {jitter}s | Failure rate: {fail_rate:.0%}")
+    print(f"📌 Streaming: one word every {chunk_delay}s")
+    print("="*60 + "\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local HTTP stub for the chatbot upstream')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.5, help='Base response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- latency in seconds')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500')
+    parser.add_argument('--chunk-delay', type=float, default=0.05, help='Seconds between streamed chunks')
+    args = parser.parse_args()
+
+    run_stub(args.port, args.delay, args.jitter, args.fail_rate, args.chunk_delay)
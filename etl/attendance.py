@@ -0,0 +1,297 @@
+# etl/attendance.py - Streaming attendance ETL (replaces the SSIS attendance package)
+
+from app.database import DatabaseConnection
+import csv
+import os
+import time
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Source Status values -> (is_present, is_late)
+STATUS_MAP = {
+    'PRESENT': (1, 0), 'P': (1, 0), '1': (1, 0), 'TRUE': (1, 0), 'YES': (1, 0), 'حاضر': (1, 0),
+    'ABSENT': (0, 0), 'A': (0, 0), '0': (0, 0), 'FALSE': (0, 0), 'NO': (0, 0), 'غائب': (0, 0),
+    'LATE': (1, 1), 'L': (1, 1), 'متاخر': (1, 1), 'متأخر': (1, 1)
+}
+
+# Accepted spellings of the source columns
+COLUMN_ALIASES = {
+    'student_id': 'Student_ID', 's_id': 'Student_ID',
+    'course_id': 'Course_ID',
+    'date': 'Date', 'attendance_date': 'Date',
+    'status': 'Status',
+    'instructor_id': 'Instructor_ID', 'i_id': 'Instructor_ID'
+}
+
+REQUIRED_COLUMNS = ('Student_ID', 'Course_ID', 'Date', 'Status')
+
+# Fixed reject file layout, whatever columns (and order) each input file has
+REJECT_COLUMNS = REQUIRED_COLUMNS + ('Instructor_ID', 'Reason', 'Source_File')
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+class AttendanceLoader:
+    """
+    CSV / Excel attendance files -> Attendance, in chunks.
+
+    - Student and Course IDs are checked against key sets loaded once
+    - Status is normalized to is_present / is_late
+    - each student/course/date is loaded once: duplicates inside the file
+      and rows already in Attendance (for the dates seen) are rejected
+    - the instructor comes from the file's Instructor_ID column when present,
+      otherwise from Teaching for the course and year
+    - rows go in with fast_executemany, one commit per chunk
+    - rejected rows are written with a reason and their source file to the
+      reject file; several inputs sharing one reject file append to it
+    """
+
+    CHUNK_SIZE = 50000
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.students = None
+        self.courses = None
+        self.instructors = None
+        self.teaching = {}
+        self._seen = set()
+        self._seeded_dates = set()
+        # Reject files this loader has started; later input files append to them
+        self._reject_paths = set()
+
+    # ==================== LOOKUPS ====================
+
+    def load_lookups(self):
+        """Master-data key sets, loaded once per run"""
+        self.students = np.array(sorted(r[0] for r in DatabaseConnection.fetch_all("SELECT S_ID FROM Student") or []), dtype=np.int64)
+        self.courses = np.array(sorted(r[0] for r in DatabaseConnection.fetch_all("SELECT Course_ID FROM Course") or []), dtype=np.int64)
+        self.instructors = np.array(sorted(r[0] for r in DatabaseConnection.fetch_all("SELECT I_ID FROM Instructor") or []), dtype=np.int64)
+
+        # (course, year) -> instructor; (course, None) -> instructor of the latest year
+        rows = DatabaseConnection.fetch_all("SELECT Course_ID, year, MIN(I_ID) FROM Teaching GROUP BY Course_ID, year ORDER BY Course_ID, year") or []
+        self.teaching = {}
+        for course_id, year, instructor_id in rows:
+            self.teaching[(course_id, year)] = instructor_id
+            self.teaching[(course_id, None)] = instructor_id
+
+        logger.info(f"✓ Lookups: {len(self.students)} students, {len(self.courses)} courses, {len(rows)} teaching rows")
+
+    def _seed_existing(self, day_numbers):
+        """Add keys already in Attendance for dates not seen before"""
+        new_days = sorted(set(int(d) for d in np.unique(day_numbers)) - self._seeded_dates)
+        if not new_days:
+            return
+
+        first = (_EPOCH + new_days[0]).astype(object)
+        last = (_EPOCH + new_days[-1]).astype(object)
+        query = """
+        SELECT student_id, course_id, DATEDIFF(DAY, '1970-01-01', attendance_date)
+        FROM Attendance
+        WHERE attendance_date BETWEEN ? AND ?
+        """
+        wanted = set(new_days)
+        with DatabaseConnection.get_cursor() as cursor:
+            cursor.execute(query, (first, last))
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                for student_id, course_id, day in rows:
+                    if day in wanted:
+                        self._seen.add(self._pack(student_id, course_id, day))
+        self._seeded_dates.update(new_days)
+
+    @staticmethod
+    def _pack(student_id, course_id, day):
+        return (int(student_id) << 42) | (int(course_id) << 21) | int(day)
+
+    # ==================== EXTRACT ====================
+
+    def read_chunks(self, path):
+        """Yield DataFrames of at most chunk_size rows, all columns as text"""
+        if path.lower().endswith(('.xlsx', '.xlsm')):
+            yield from self._read_excel(path)
+            return
+
+        for chunk in pd.read_csv(path, dtype=str, chunksize=self.chunk_size, encoding='utf-8-sig',
+                                 keep_default_na=False, skipinitialspace=True):
+            yield chunk
+
+    def _read_excel(self, path):
+        # openpyxl read-only mode streams rows instead of loading the workbook
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+            batch = []
+            for row in rows:
+                batch.append(['' if v is None else str(v) for v in row])
+                if len(batch) >= self.chunk_size:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+
+    # ==================== TRANSFORM ====================
+
+    def transform(self, chunk):
+        """
+        Validate and normalize one chunk
+
+        Returns:
+            tuple: (rows ready to insert as a DataFrame, rejected rows with a Reason column)
+        """
+        chunk = chunk.rename(columns=lambda c: COLUMN_ALIASES.get(str(c).strip().lower(), str(c).strip()))
+        missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        reason = pd.Series('', index=chunk.index, dtype=object)
+
+        student = pd.to_numeric(chunk['Student_ID'].str.strip(), errors='coerce')
+        course = pd.to_numeric(chunk['Course_ID'].str.strip(), errors='coerce')
+        date = pd.to_datetime(chunk['Date'].str.strip(), errors='coerce', format='mixed', dayfirst=False)
+        status = chunk['Status'].str.strip().str.upper().map(STATUS_MAP)
+
+        reason[status.isna()] = 'invalid status'
+        reason[date.isna()] = 'invalid date'
+        reason[course.isna()] = 'invalid Course_ID'
+        reason[student.isna()] = 'invalid Student_ID'
+
+        valid = reason == ''
+        reason[valid & ~np.isin(student.fillna(-1).astype(np.int64), self.students)] = 'unknown Student_ID'
+        reason[valid & ~np.isin(course.fillna(-1).astype(np.int64), self.courses)] = 'unknown Course_ID'
+
+        # Instructor: from the file if given, else whoever teaches the course that year
+        years = date.dt.year
+        if 'Instructor_ID' in chunk.columns:
+            instructor = pd.to_numeric(chunk['Instructor_ID'].str.strip(), errors='coerce')
+        else:
+            instructor = pd.Series(np.nan, index=chunk.index)
+        need = instructor.isna() & (reason == '')
+        if need.any():
+            instructor[need] = [
+                self.teaching.get((int(c), int(y)), self.teaching.get((int(c), None)))
+                for c, y in zip(course[need], years[need])
+            ]
+        valid = reason == ''
+        reason[valid & (instructor.isna() | ~np.isin(instructor.fillna(-1).astype(np.int64), self.instructors))] = 'no instructor for course'
+
+        # Duplicates inside the file and against rows already loaded
+        valid = reason == ''
+        days = ((date[valid].values.astype('datetime64[D]') - _EPOCH).astype(np.int64))
+        self._seed_existing(days)
+        keys = [self._pack(s, c, d) for s, c, d in zip(student[valid], course[valid], days)]
+        duplicate = np.zeros(len(keys), dtype=bool)
+        for i, key in enumerate(keys):
+            if key in self._seen:
+                duplicate[i] = True
+            else:
+                self._seen.add(key)
+        reason[reason.index[valid][duplicate]] = 'duplicate student/course/date'
+
+        good = reason == ''
+        flags = status[good]
+        rows = pd.DataFrame({
+            'student_id': student[good].astype(np.int64),
+            'instructor_id': instructor[good].astype(np.int64),
+            'course_id': course[good].astype(np.int64),
+            'day_of_week': date[good].dt.day_name(),
+            'attendance_date': date[good].dt.date,
+            'is_present': [f[0] for f in flags],
+            'is_late': [f[1] for f in flags]
+        })
+
+        rejects = chunk[~good].copy()
+        rejects['Reason'] = reason[~good]
+        return rows, rejects
+
+    # ==================== LOAD ====================
+
+    def run(self, path, reject_path=None, dry_run=False):
+        """
+        Load one attendance file
+
+        Returns:
+            dict: Counts and timing for the run
+        """
+        start = time.time()
+        reject_path = reject_path or os.path.splitext(path)[0] + '.rejects.csv'
+        if self.students is None:
+            self.load_lookups()
+
+        summary = {'read': 0, 'loaded': 0, 'rejected': 0, 'reject_file': None}
+        insert_query = """
+        INSERT INTO Attendance (attendance_id, student_id, instructor_id, course_id, day_of_week, attendance_date, is_present, is_late)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """
+
+        conn = None if dry_run else DatabaseConnection.get_connection()
+        reject_file = None
+        try:
+            next_id = 1
+            if conn is not None:
+                cursor = conn.cursor()
+                cursor.fast_executemany = True
+                # attendance_id is not an IDENTITY column (run one loader at a time)
+                cursor.execute("SELECT ISNULL(MAX(attendance_id), 0) FROM Attendance")
+                next_id = int(cursor.fetchone()[0]) + 1
+
+            for chunk in self.read_chunks(path):
+                summary['read'] += len(chunk)
+                rows, rejects = self.transform(chunk)
+
+                if len(rejects):
+                    rejects = rejects.assign(Source_File=os.path.basename(path)).reindex(columns=list(REJECT_COLUMNS)).fillna('')
+                    if reject_file is None:
+                        # One shared --rejects file for several inputs: header once, then append
+                        started = reject_path in self._reject_paths
+                        reject_file = open(reject_path, 'a' if started else 'w', newline='',
+                                           encoding='utf-8' if started else 'utf-8-sig')
+                        writer = csv.writer(reject_file)
+                        if not started:
+                            writer.writerow(REJECT_COLUMNS)
+                            self._reject_paths.add(reject_path)
+                    writer.writerows(rejects.itertuples(index=False, name=None))
+                    summary['rejected'] += len(rejects)
+
+                if len(rows) and conn is not None:
+                    ids = np.arange(next_id, next_id + len(rows), dtype=np.int64)
+                    params = list(zip(
+                        ids.tolist(),
+                        rows['student_id'].tolist(),
+                        rows['instructor_id'].tolist(),
+                        rows['course_id'].tolist(),
+                        rows['day_of_week'].tolist(),
+                        rows['attendance_date'].tolist(),
+                        rows['is_present'].tolist(),
+                        rows['is_late'].tolist()
+                    ))
+                    cursor.executemany(insert_query, params)
+                    conn.commit()
+                    next_id += len(rows)
+                summary['loaded'] += len(rows)
+
+                logger.info(f"⏳ Attendance: {summary['read']} read, {summary['loaded']} loaded, {summary['rejected']} rejected")
+        except Exception:
+            if conn is not None:
+                conn.rollback()
+            raise
+        finally:
+            if reject_file is not None:
+                reject_file.close()
+                summary['reject_file'] = reject_path
+            if conn is not None:
+                conn.close()
+
+        elapsed = time.time() - start
+        summary['seconds'] = round(elapsed, 2)
+        summary['rows_per_minute'] = int(summary['read'] / elapsed * 60) if elapsed else 0
+        return summary
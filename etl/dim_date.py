@@ -0,0 +1,167 @@
+# etl/dim_date.py - Vectorized Dim_Date generator
+
+from app.database import DWHConnection
+from etl.warehouse import fetch_frame, bulk_insert, column_values
+from etl.dimensions import row_hashes
+from collections import namedtuple
+import datetime
+import os
+import time
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# start: (month, day) the academic year begins
+# semesters: (month, day) each semester begins, in academic-year order (semester 1, 2, ...)
+# weekend: weekday numbers (Monday = 0)
+AcademicCalendar = namedtuple('AcademicCalendar', ['start', 'semesters', 'weekend'])
+
+# ITI: Sep-Jan fall, Feb-Jun spring, Jul-Aug summer; Friday/Saturday weekend
+DEFAULT_CALENDAR = AcademicCalendar(start=(9, 1), semesters=((9, 1), (2, 1), (7, 1)), weekend=(4, 5))
+
+# Fixed-date public holidays (month, day); moving ones (Eid, Sham El-Nessim...)
+# come from the DIM_DATE_HOLIDAYS file, one YYYY-MM-DD per line
+FIXED_HOLIDAYS = ((1, 7), (1, 25), (4, 25), (5, 1), (6, 30), (7, 23), (10, 6))
+
+DATE_COLUMNS = (
+    'Date_Key', 'Full_Date', 'Day', 'Day_Name', 'Day_Of_Week', 'Day_Of_Year', 'Week_Of_Year',
+    'Month', 'Month_Name', 'Quarter', 'Year', 'Is_Weekend', 'Is_Holiday', 'Academic_Year', 'Semester'
+)
+
+DAY_NAMES = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+MONTH_NAMES = np.array(['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                        'August', 'September', 'October', 'November', 'December'])
+
+
+def load_holidays(path=None):
+    """Extra holiday dates from a text file (DIM_DATE_HOLIDAYS; unset = none)"""
+    path = path or os.getenv('DIM_DATE_HOLIDAYS')
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        lines = [line.split('#')[0].strip() for line in f]
+    return [datetime.date.fromisoformat(line) for line in lines if line]
+
+
+def _academic_position(month, day, start):
+    """month/day -> a number that increases through the academic year"""
+    mmdd = np.asarray(month) * 100 + np.asarray(day)
+    start_mmdd = start[0] * 100 + start[1]
+    return np.where(mmdd >= start_mmdd, mmdd - start_mmdd, mmdd + 1300 - start_mmdd)
+
+
+def build_dates(start, end, calendar=DEFAULT_CALENDAR, holidays=()):
+    """
+    Every Dim_Date row from start to end (inclusive), in one vectorized pass
+
+    Returns:
+        DataFrame: DATE_COLUMNS
+    """
+    dates = pd.date_range(start, end, freq='D')
+    year = dates.year.to_numpy()
+    month = dates.month.to_numpy()
+    day = dates.day.to_numpy()
+    weekday = dates.weekday.to_numpy()
+
+    # Academic year "2024-2025" starts on calendar.start
+    position = _academic_position(month, day, calendar.start)
+    first_year = np.where(month * 100 + day >= calendar.start[0] * 100 + calendar.start[1], year, year - 1)
+    academic_year = pd.Series(first_year).astype(str) + '-' + pd.Series(first_year + 1).astype(str)
+
+    boundaries = np.sort(_academic_position([m for m, _ in calendar.semesters],
+                                            [d for _, d in calendar.semesters], calendar.start))
+    semester = np.searchsorted(boundaries, position, side='right')
+
+    fixed = np.isin(month * 100 + day, [m * 100 + d for m, d in FIXED_HOLIDAYS])
+    listed = dates.isin(pd.to_datetime(list(holidays))) if len(holidays) else np.zeros(len(dates), dtype=bool)
+
+    return pd.DataFrame({
+        'Date_Key': year * 10000 + month * 100 + day,
+        'Full_Date': dates.date,
+        'Day': day,
+        'Day_Name': DAY_NAMES[weekday],
+        # Same numbering as SQL Server DATEPART(weekday): Sunday = 1
+        'Day_Of_Week': (weekday + 1) % 7 + 1,
+        'Day_Of_Year': dates.dayofyear.to_numpy(),
+        'Week_Of_Year': dates.isocalendar().week.to_numpy(np.int64),
+        'Month': month,
+        'Month_Name': MONTH_NAMES[month - 1],
+        'Quarter': dates.quarter.to_numpy(),
+        'Year': year,
+        'Is_Weekend': np.isin(weekday, calendar.weekend),
+        'Is_Holiday': fixed | listed,
+        'Academic_Year': academic_year.values,
+        'Semester': semester
+    })
+
+
+class DateDimensionLoader:
+    """
+    Generates Dim_Date for a date range and upserts it:
+    missing dates are inserted, existing rows are updated only where the
+    generated values differ (e.g. after a calendar or holiday change).
+
+    The default range is DIM_DATE_START (2015-01-01) to the end of next year.
+    """
+
+    def __init__(self, start=None, end=None, calendar=None, holidays=None, batch_size=None):
+        self.start = pd.Timestamp(start or os.getenv('DIM_DATE_START', '2015-01-01')).date()
+        self.end = pd.Timestamp(end or datetime.date(datetime.date.today().year + 1, 12, 31)).date()
+        self.calendar = calendar or DEFAULT_CALENDAR
+        self.holidays = load_holidays() if holidays is None else holidays
+
+    def run(self):
+        """
+        Returns:
+            dict: Counts and timing
+        """
+        start = time.time()
+        dates = build_dates(self.start, self.end, self.calendar, self.holidays)
+        generated = time.time() - start
+
+        first, last = int(dates['Date_Key'].iloc[0]), int(dates['Date_Key'].iloc[-1])
+        conn = DWHConnection.get_connection()
+        try:
+            cursor = conn.cursor()
+            existing = fetch_frame(cursor, f"SELECT {', '.join(DATE_COLUMNS)} FROM Dim_Date WHERE Date_Key BETWEEN ? AND ?",
+                                   (first, last))
+
+            attributes = [c for c in DATE_COLUMNS if c != 'Date_Key']
+            known = dates['Date_Key'].isin(existing['Date_Key']).values
+            inserts = dates[~known]
+
+            # Compare existing rows by hash; only differing ones are rewritten
+            current = dates[known].set_index('Date_Key')
+            stored = existing.set_index('Date_Key').reindex(current.index)
+            changed = row_hashes(current, attributes).values != row_hashes(stored, attributes).values
+            updates = current[changed].reset_index()
+
+            bulk_insert(cursor, 'Dim_Date', DATE_COLUMNS, inserts)
+            if len(updates):
+                cursor.fast_executemany = True
+                assignments = ', '.join(f"{c} = ?" for c in attributes)
+                values = [column_values(updates, c) for c in attributes + ['Date_Key']]
+                cursor.executemany(f"UPDATE Dim_Date SET {assignments} WHERE Date_Key = ?", list(zip(*values)))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        elapsed = time.time() - start
+        summary = {
+            'read': len(dates),
+            'loaded': len(inserts) + len(updates),
+            'inserted': len(inserts),
+            'updated': len(updates),
+            'range': f"{self.start} -> {self.end}",
+            'generate_seconds': round(generated, 3),
+            'seconds': round(elapsed, 2),
+            'rows_per_second': int(len(dates) / elapsed) if elapsed else 0
+        }
+        logger.info(f"✓ Dim_Date: {summary}")
+        return summary
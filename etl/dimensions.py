@@ -0,0 +1,326 @@
+# etl/dimensions.py - Dimension sync with hash-diff change detection (SCD type 1 / type 2)
+
+from app.database import DatabaseConnection, DWHConnection
+from etl.warehouse import fetch_frame, bulk_insert, column_values
+from collections import namedtuple
+import datetime
+import time
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# tracked: attributes whose change opens a new version (SCD2, needs Effective/Expiry/Is_Current)
+# overwrite: attributes corrected in place on the current row (SCD1)
+Dimension = namedtuple('Dimension', ['table', 'key', 'business_key', 'query', 'tracked', 'overwrite'])
+
+_LATEST_ENROLLMENT = """
+    SELECT S_ID, Track_ID, Intake_ID, Enrollment_date,
+           ROW_NUMBER() OVER (PARTITION BY S_ID ORDER BY Enrollment_date DESC, Intake_ID DESC) AS rn
+    FROM When_Enroll
+"""
+
+DIMENSIONS = {
+    'Dim_Student': Dimension(
+        table='Dim_Student', key='Student_Key', business_key='Student_ID',
+        query=f"""
+        SELECT s.S_ID AS Student_ID, p.F_name + ' ' + p.L_name AS Full_Name, p.Gender, p.city AS City,
+               p.B_Date AS Birth_Date,
+               (CONVERT(INT, CONVERT(CHAR(8), GETDATE(), 112)) - CONVERT(INT, CONVERT(CHAR(8), p.B_Date, 112))) / 10000 AS Age,
+               p.Email, e.Enrollment_date AS Enrollment_Date, t.Track_name AS Current_Track,
+               i.Type + ' ' + CAST(i.number AS VARCHAR(10)) AS Current_Intake,
+               s.Is_graduated AS Is_Graduated,
+               CASE WHEN s.Is_graduated = 1 THEN i.End_date END AS Graduation_Date
+        FROM Student s
+        JOIN Person p ON p.ID = s.Person_ID
+        LEFT JOIN ({_LATEST_ENROLLMENT}) e ON e.S_ID = s.S_ID AND e.rn = 1
+        LEFT JOIN Track t ON t.Track_ID = e.Track_ID
+        LEFT JOIN Intake i ON i.Intake_ID = e.Intake_ID
+        """,
+        tracked=('Full_Name', 'Gender', 'City', 'Birth_Date', 'Email', 'Enrollment_Date',
+                 'Current_Track', 'Current_Intake', 'Is_Graduated', 'Graduation_Date'),
+        overwrite=('Age',)
+    ),
+    'Dim_Instructor': Dimension(
+        table='Dim_Instructor', key='Instructor_Key', business_key='Instructor_ID',
+        query="""
+        SELECT ins.I_ID AS Instructor_ID, p.F_name + ' ' + p.L_name AS Full_Name, p.Gender, p.city AS City,
+               p.Email, ins.Salary,
+               YEAR(GETDATE()) - (SELECT MIN(year) FROM Teaching te WHERE te.I_ID = ins.I_ID) AS Years_Of_Experience
+        FROM Instructor ins
+        JOIN Person p ON p.ID = ins.Person_ID
+        """,
+        tracked=('Full_Name', 'Gender', 'City', 'Email', 'Salary'),
+        overwrite=('Years_Of_Experience',)
+    ),
+    'Dim_Course': Dimension(
+        table='Dim_Course', key='Course_Key', business_key='Course_ID',
+        query="""
+        SELECT c.Course_ID, c.name AS Course_Name, c.hours AS Course_Hours, t.name AS Topic_Name,
+               d.Dept_name AS Department_Name
+        FROM Course c
+        JOIN Topic t ON t.Topic_ID = c.Topic_ID
+        JOIN Department d ON d.Dept_ID = c.Dept_ID
+        """,
+        tracked=('Course_Name', 'Course_Hours', 'Topic_Name', 'Department_Name'),
+        overwrite=()
+    ),
+    'Dim_Exam': Dimension(
+        table='Dim_Exam', key='Exam_Key', business_key='Exam_ID',
+        query="""
+        SELECT e.Exam_ID, e.Semester, e.year AS Year, e.Total_marks AS Total_Marks,
+               (SELECT COUNT(*) FROM Exam_Question eq WHERE eq.Exam_ID = e.Exam_ID) AS Total_Questions
+        FROM Exam e
+        """,
+        tracked=(),
+        overwrite=('Semester', 'Year', 'Total_Marks', 'Total_Questions')
+    ),
+    'Dim_Question': Dimension(
+        table='Dim_Question', key='Question_Key', business_key='Question_ID',
+        query="""
+        SELECT q.Quest_ID AS Question_ID, q.Type AS Question_Type,
+               TRY_CAST(q.Difficulty_Level AS INT) AS Difficulty_Level, topic.name AS Topic
+        FROM Question q
+        OUTER APPLY (
+            SELECT TOP 1 t.name
+            FROM Exam_Question eq
+            JOIN Exam e ON e.Exam_ID = eq.Exam_ID
+            JOIN Course c ON c.Course_ID = e.Course_ID
+            JOIN Topic t ON t.Topic_ID = c.Topic_ID
+            WHERE eq.Quest_ID = q.Quest_ID
+            ORDER BY e.Exam_ID
+        ) topic
+        """,
+        tracked=(),
+        overwrite=('Question_Type', 'Difficulty_Level', 'Topic')
+    ),
+    'Dim_Track': Dimension(
+        table='Dim_Track', key='Track_Key', business_key='Track_ID',
+        query="""
+        SELECT t.Track_ID, t.Track_name AS Track_Name, CAST(t.Description AS VARCHAR(MAX)) AS Description,
+               COUNT(ct.Course_ID) AS Total_Courses,
+               SUM(CASE WHEN ct.is_required = 1 THEN 1 ELSE 0 END) AS Required_Courses
+        FROM Track t
+        LEFT JOIN Course_Track ct ON ct.Track_ID = t.Track_ID
+        GROUP BY t.Track_ID, t.Track_name, CAST(t.Description AS VARCHAR(MAX))
+        """,
+        tracked=(),
+        overwrite=('Track_Name', 'Description', 'Total_Courses', 'Required_Courses')
+    ),
+    'Dim_Intake': Dimension(
+        table='Dim_Intake', key='Intake_Key', business_key='Intake_ID',
+        query="""
+        SELECT i.Intake_ID, i.Type AS Intake_Type, i.number AS Intake_Number, i.Start_date AS Start_Date,
+               i.End_date AS End_Date, DATEDIFF(MONTH, i.Start_date, i.End_date) AS Duration_Months,
+               (SELECT COUNT(DISTINCT we.S_ID) FROM When_Enroll we WHERE we.Intake_ID = i.Intake_ID) AS Total_Students
+        FROM Intake i
+        """,
+        tracked=(),
+        overwrite=('Intake_Type', 'Intake_Number', 'Start_Date', 'End_Date', 'Duration_Months', 'Total_Students')
+    ),
+    'Dim_Branch': Dimension(
+        table='Dim_Branch', key='Branch_Key', business_key='Branch_ID',
+        query="""
+        SELECT b.Branch_ID, b.Branch_Name, b.Location, b.Opening_Date,
+               p.F_name + ' ' + p.L_name AS Manager_Name,
+               (SELECT SUM(bo.Capacity) FROM Branch_Offered bo WHERE bo.Branch_ID = b.Branch_ID) AS Capacity
+        FROM Branch b
+        LEFT JOIN Manager m ON m.M_ID = b.M_ID
+        LEFT JOIN Person p ON p.ID = m.Person_id
+        """,
+        tracked=(),
+        overwrite=('Branch_Name', 'Location', 'Opening_Date', 'Manager_Name', 'Capacity')
+    ),
+    'Dim_Classroom': Dimension(
+        table='Dim_Classroom', key='Classroom_Key', business_key='Classroom_ID',
+        query="""
+        SELECT c.classroom_id AS Classroom_ID, c.classroom_name AS Classroom_Name, c.capacity AS Capacity,
+               b.Branch_Name, c.resources AS Resources, c.is_active AS Is_Active
+        FROM Classroom c
+        LEFT JOIN Branch b ON b.Branch_ID = c.branch_id
+        """,
+        tracked=(),
+        overwrite=('Classroom_Name', 'Capacity', 'Branch_Name', 'Resources', 'Is_Active')
+    )
+}
+
+
+def row_hashes(frame, columns):
+    """One uint64 per row over the given columns; equal values hash equal whatever side they came from"""
+    if not columns:
+        return pd.Series(0, index=frame.index, dtype='uint64')
+    text = pd.DataFrame(index=frame.index)
+    for column in columns:
+        series = frame[column]
+        if series.dtype.kind == 'f':
+            # Floats formatted value by value, so 3.0 hashes like the int 3 (an int column
+            # with NULLs arrives as float) and 85.5 like 85.50000000001
+            formatted = np.char.mod('%.10g', series.fillna(0).to_numpy())
+            text[column] = np.where(series.isna().to_numpy(), 'None', formatted)
+        else:
+            text[column] = series.astype(object).where(series.notna(), None).astype(str).fillna('None')
+    return pd.util.hash_pandas_object(text, index=False)
+
+
+class DimensionSync:
+    """
+    Brings one dimension in line with its OLTP source.
+
+    The source extract and the current dimension rows are hashed in memory
+    (tracked and overwrite attributes separately) and compared by business
+    key, so only the differences are written:
+
+    - new business key: insert
+    - tracked attribute changed (SCD2): expire the current row, insert a new version
+    - only overwrite attributes changed: update the current row in place
+    - business key gone from the source (SCD2): expire the current row
+
+    All writes go out as bulk statements in one transaction, so cost follows
+    the number of changes, not the size of the table.
+    """
+
+    def __init__(self, dimension, batch_size=None):
+        self.dim = DIMENSIONS[dimension] if isinstance(dimension, str) else dimension
+        self.scd2 = bool(self.dim.tracked)
+
+    @property
+    def attributes(self):
+        return tuple(self.dim.tracked) + tuple(self.dim.overwrite)
+
+    # ==================== EXTRACT ====================
+
+    def extract(self):
+        with DatabaseConnection.get_cursor() as cursor:
+            source = fetch_frame(cursor, self.dim.query)
+        with DWHConnection.get_cursor() as cursor:
+            columns = ', '.join((self.dim.key, self.dim.business_key) + self.attributes)
+            query = f"SELECT {columns} FROM {self.dim.table}"
+            if self.scd2:
+                query += " WHERE Is_Current = 1"
+            current = fetch_frame(cursor, query)
+        return source, current
+
+    # ==================== DIFF ====================
+
+    def diff(self, source, current):
+        """
+        Returns:
+            dict: DataFrames of 'inserts', 'versions', 'updates' and a Series of 'expired' surrogate keys
+        """
+        bk = self.dim.business_key
+        source = source.drop_duplicates(bk, keep='last').reset_index(drop=True)
+
+        # Only keys and hashes are joined; the rows written come from `source` untouched
+        current_hashes = pd.DataFrame({
+            bk: current[bk].values,
+            self.dim.key: current[self.dim.key].values,
+            '_tracked': row_hashes(current, self.dim.tracked).values,
+            '_overwrite': row_hashes(current, self.dim.overwrite).values
+        })
+        matched = pd.DataFrame({
+            bk: source[bk].values,
+            '_tracked': row_hashes(source, self.dim.tracked).values,
+            '_overwrite': row_hashes(source, self.dim.overwrite).values
+        }).merge(current_hashes, on=bk, how='left', suffixes=('', '_current'))
+
+        new = matched[self.dim.key].isna().values
+        tracked_changed = ~new & (matched['_tracked'] != matched['_tracked_current']).values
+        overwrite_changed = ~new & ~tracked_changed & (matched['_overwrite'] != matched['_overwrite_current']).values
+
+        columns = [bk] + list(self.attributes)
+        updates = source.loc[overwrite_changed, list(self.dim.overwrite)]
+        updates.insert(0, self.dim.key, matched.loc[overwrite_changed, self.dim.key].astype('int64').values)
+
+        expired = matched.loc[tracked_changed, self.dim.key]
+        if self.scd2:
+            gone = ~current_hashes[bk].isin(source[bk])
+            expired = pd.concat([expired, current_hashes.loc[gone, self.dim.key]])
+
+        return {
+            'inserts': source.loc[new, columns],
+            'versions': source.loc[tracked_changed, columns],
+            'updates': updates,
+            'expired': expired.astype('int64')
+        }
+
+    # ==================== LOAD ====================
+
+    def ensure_current_index(self, cursor):
+        """
+        The DWH script indexes (business key, Is_Current) as unique, which allows a
+        single expired version per key; history needs the index filtered to current rows
+        """
+        index = f"IX_{self.dim.table}_BusinessKey"
+        cursor.execute(f"""
+        IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{index}'
+                   AND object_id = OBJECT_ID('dbo.{self.dim.table}') AND has_filter = 0)
+        BEGIN
+            DROP INDEX {index} ON dbo.{self.dim.table};
+            CREATE UNIQUE NONCLUSTERED INDEX {index} ON dbo.{self.dim.table} ({self.dim.business_key})
+            WHERE Is_Current = 1;
+        END
+        """)
+
+    def run(self):
+        """
+        Sync the dimension
+
+        Returns:
+            dict: Change counts and timing
+        """
+        start = time.time()
+        source, current = self.extract()
+        changes = self.diff(source, current)
+        today = datetime.date.today()
+
+        conn = DWHConnection.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.fast_executemany = True
+            if self.scd2:
+                self.ensure_current_index(cursor)
+
+            # Expire first: the unique index allows one current row per business key
+            if len(changes['expired']):
+                cursor.executemany(
+                    f"UPDATE {self.dim.table} SET Is_Current = 0, Expiry_Date = ?, Updated_Date = SYSDATETIME() "
+                    f"WHERE {self.dim.key} = ?",
+                    [(today, key) for key in changes['expired'].tolist()])
+
+            if len(changes['updates']) and self.dim.overwrite:
+                assignments = ', '.join(f"{c} = ?" for c in self.dim.overwrite)
+                updates = changes['updates']
+                values = [column_values(updates, c) for c in list(self.dim.overwrite) + [self.dim.key]]
+                cursor.executemany(
+                    f"UPDATE {self.dim.table} SET {assignments}, Updated_Date = SYSDATETIME() WHERE {self.dim.key} = ?",
+                    list(zip(*values)))
+
+            rows = pd.concat([changes['inserts'], changes['versions']])
+            columns = [self.dim.business_key] + list(self.attributes)
+            if self.scd2:
+                rows = rows.assign(Effective_Date=today, Is_Current=True)
+                columns += ['Effective_Date', 'Is_Current']
+            bulk_insert(cursor, self.dim.table, columns, rows)
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        summary = {
+            'read': len(source),
+            'loaded': len(rows) + len(changes['updates']) + len(changes['expired']),
+            'inserted': len(changes['inserts']),
+            'new_versions': len(changes['versions']),
+            'updated': len(changes['updates']),
+            'expired': len(changes['expired']) - len(changes['versions'])
+        }
+        elapsed = time.time() - start
+        summary['seconds'] = round(elapsed, 2)
+        summary['rows_per_second'] = int(summary['read'] / elapsed) if elapsed else 0
+        logger.info(f"✓ {self.dim.table}: {summary}")
+        return summary
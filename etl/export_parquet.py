@@ -0,0 +1,138 @@
+# etl/export_parquet.py - Incremental Parquet export of warehouse facts for analytics
+
+from app.database import DWHConnection
+from etl.warehouse import get_watermark, save_watermark
+import datetime
+import decimal
+import os
+import time
+import pyarrow as pa
+import pyarrow.dataset as ds
+import logging
+
+logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Fact table -> its identity key, the export watermark
+EXPORTS = {
+    'Fact_Exam_Performance': 'Exam_Performance_Key',
+    'Fact_Student_Answer': 'Student_Answer_Key',
+    'Fact_Attendance': 'Attendance_Key'
+}
+
+# pyodbc cursor.description type -> Arrow type (Decimal keeps the column's precision/scale)
+ARROW_TYPES = {
+    int: pa.int64(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+    str: pa.string(),
+    datetime.datetime: pa.timestamp('us'),
+    datetime.date: pa.date32()
+}
+
+PARTITIONING = ds.partitioning(pa.schema([('Year', pa.int32()), ('Course_Key', pa.int64())]), flavor='hive')
+
+
+def arrow_schema(description):
+    """Arrow schema from a pyodbc cursor.description, so every batch writes identical column types"""
+    fields = []
+    for name, type_code, _, _, precision, scale, _ in description:
+        if type_code is decimal.Decimal:
+            arrow_type = pa.decimal128(precision, scale)
+        else:
+            arrow_type = ARROW_TYPES.get(type_code, pa.string())
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+class ParquetExporter:
+    """
+    Appends a fact table's new rows to a Parquet dataset for analytics and ML.
+
+    - layout: <WAREHOUSE_EXPORT_DIR>/<table>/Year=YYYY/Course_Key=N/part-<first key>-<i>.parquet
+      (Year from Date_Key), readable as one hive-partitioned dataset by
+      pyarrow, pandas, DuckDB or Spark
+    - surrogate keys and text columns are dictionary-encoded, everything zstd-compressed
+    - incremental: only rows past the export_<table> watermark in
+      ETL_Watermark are read, in identity-key batches. Files are named
+      after the batch's first key, so a batch retried after a failure
+      overwrites its own files instead of duplicating rows
+    """
+
+    BATCH_SIZE = 200000
+    COMPRESSION = 'zstd'
+
+    def __init__(self, table, output_dir=None, batch_size=None):
+        self.table = table
+        self.key = EXPORTS[table]
+        self.stage = f"export_{table.lower()}"
+        base = output_dir or os.getenv('WAREHOUSE_EXPORT_DIR', os.path.join(_ROOT, 'instance', 'warehouse_export'))
+        self.path = os.path.join(base, table)
+        self.batch_size = batch_size or self.BATCH_SIZE
+
+    def to_arrow(self, rows, schema):
+        """Rows from the cursor -> Arrow table plus the Year partition column"""
+        columns = list(zip(*rows))
+        table = pa.table([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema)
+        date_keys = table.column('Date_Key').to_numpy()
+        return table.append_column('Year', pa.array(date_keys // 10000, type=pa.int32()))
+
+    def write(self, table, first_key):
+        fmt = ds.ParquetFileFormat()
+        dictionary = [name for name, type_ in zip(table.column_names, table.schema.types)
+                      if (name.endswith('_Key') and name not in (self.key, 'Course_Key')) or pa.types.is_string(type_)]
+        options = fmt.make_write_options(compression=self.COMPRESSION, use_dictionary=dictionary)
+        written = []
+        ds.write_dataset(table, self.path, format=fmt, partitioning=PARTITIONING, file_options=options,
+                         basename_template=f"part-{first_key:015d}-{{i}}.parquet",
+                         existing_data_behavior='overwrite_or_ignore',
+                         file_visitor=lambda f: written.append(f.path))
+        return len(written)
+
+    def run(self):
+        """
+        Export every row past the watermark
+
+        Returns:
+            dict: Counts, watermark and timing
+        """
+        start = time.time()
+        watermark, _ = get_watermark(self.stage)
+        summary = {'read': 0, 'loaded': 0, 'files': 0, 'start_watermark': watermark}
+
+        conn = DWHConnection.get_connection()
+        try:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute(f"SELECT TOP (?) * FROM {self.table} WHERE {self.key} > ? ORDER BY {self.key}",
+                               (self.batch_size, watermark))
+                schema = arrow_schema(cursor.description)
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                table = self.to_arrow(rows, schema)
+                first_key = int(table.column(self.key)[0].as_py())
+                summary['files'] += self.write(table, first_key)
+                summary['read'] += len(rows)
+                summary['loaded'] += len(rows)
+
+                # Files are on disk before the watermark moves past them
+                watermark = int(table.column(self.key)[-1].as_py())
+                save_watermark(cursor, self.stage, watermark, None, len(rows))
+                conn.commit()
+                logger.info(f"⏳ {self.table} -> Parquet: {summary['loaded']} rows, {summary['files']} files")
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        elapsed = time.time() - start
+        summary['watermark'] = watermark
+        summary['seconds'] = round(elapsed, 2)
+        summary['rows_per_second'] = int(summary['read'] / elapsed) if elapsed else 0
+        logger.info(f"✓ {self.table} export: {summary}")
+        return summary
@@ -0,0 +1,163 @@
+# etl/fact_exam_performance.py - Incremental TAKES -> Fact_Exam_Performance load
+
+from app.database import DatabaseConnection
+from etl.warehouse import (IncrementalFactLoader, load_key_map, load_date_keys, map_keys,
+                           date_keys, fetch_frame)
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Same scale as submit_exam in app/routes/student.py
+GRADE_POINTS = {'A': 4.0, 'B': 3.0, 'C': 2.0, 'D': 1.0, 'F': 0.0}
+PASS_PERCENTAGE = 60
+
+FACT_COLUMNS = (
+    'Date_Key', 'Student_Key', 'Instructor_Key', 'Course_Key', 'Exam_Key',
+    'Track_Key', 'Intake_Key', 'Branch_Key', 'Takes_ID', 'Score', 'Total_Marks',
+    'Percentage', 'Grade', 'Grade_Point', 'Pass_Fail_Flag',
+    'Questions_Attempted', 'Questions_Correct', 'Questions_Incorrect'
+)
+
+KEY_COLUMNS = ('Date_Key', 'Student_Key', 'Instructor_Key', 'Course_Key', 'Exam_Key',
+               'Track_Key', 'Intake_Key', 'Branch_Key')
+
+
+class ExamPerformanceLoader(IncrementalFactLoader):
+    """
+    Appends TAKES rows newer than the stage's watermark to Fact_Exam_Performance.
+
+    - TAKES is read in Takes_ID order, BATCH_SIZE rows per round trip
+    - answer counts come from one grouped Student_Answer query per batch
+    - surrogate keys are resolved from dimension maps loaded once per run
+    - a take that is not submitted yet (no Grade, started less than
+      SETTLE_HOURS ago) or whose dimension rows are not loaded yet is held
+      back until a later run
+    """
+
+    STAGE = 'fact_exam_performance'
+    FACT_TABLE = 'Fact_Exam_Performance'
+    SOURCE_KEY = 'Takes_ID'
+    DATE_COLUMN = 'Date_Taken'
+    FACT_COLUMNS = FACT_COLUMNS
+    BATCH_SIZE = 5000
+    SETTLE_HOURS = 24
+
+    def __init__(self, batch_size=None):
+        super().__init__(batch_size)
+        self.exams = None
+        self.enrollment = None
+        self.keys = {}
+        self.date_keys = None
+
+    # ==================== LOOKUPS ====================
+
+    def load_lookups(self):
+        """Exam and enrollment attributes from the OLTP side, surrogate keys from the DWH"""
+        with DatabaseConnection.get_cursor() as cursor:
+            self.exams = fetch_frame(cursor, "SELECT Exam_ID, I_ID, Course_ID, Total_marks FROM Exam").set_index('Exam_ID')
+
+            # Latest enrollment per student; a branch per intake
+            self.enrollment = fetch_frame(cursor, """
+            SELECT e.S_ID, e.Track_ID, e.Intake_ID, b.Branch_ID
+            FROM (
+                SELECT S_ID, Track_ID, Intake_ID,
+                       ROW_NUMBER() OVER (PARTITION BY S_ID ORDER BY Enrollment_date DESC, Intake_ID DESC) AS rn
+                FROM When_Enroll
+            ) e
+            LEFT JOIN (SELECT Intake_ID, MIN(Branch_ID) AS Branch_ID FROM Branch_Offered GROUP BY Intake_ID) b
+                ON b.Intake_ID = e.Intake_ID
+            WHERE e.rn = 1
+            """).set_index('S_ID')
+
+        self.keys = {
+            'student': load_key_map('Dim_Student', 'Student_ID', 'Student_Key', current_only=True),
+            'instructor': load_key_map('Dim_Instructor', 'Instructor_ID', 'Instructor_Key', current_only=True),
+            'course': load_key_map('Dim_Course', 'Course_ID', 'Course_Key', current_only=True),
+            'exam': load_key_map('Dim_Exam', 'Exam_ID', 'Exam_Key'),
+            'track': load_key_map('Dim_Track', 'Track_ID', 'Track_Key'),
+            'intake': load_key_map('Dim_Intake', 'Intake_ID', 'Intake_Key'),
+            'branch': load_key_map('Dim_Branch', 'Branch_ID', 'Branch_Key')
+        }
+        self.date_keys = load_date_keys()
+
+        logger.info(f"✓ Lookups: {len(self.exams)} exams, {len(self.enrollment)} enrollments, "
+                    f"{len(self.keys['student'])} student keys, {len(self.date_keys)} dates")
+
+    # ==================== EXTRACT ====================
+
+    def extract(self, cursor, after_id):
+        """Next batch of TAKES after a Takes_ID, with per-take answer counts"""
+        takes = fetch_frame(cursor, """
+        SELECT TOP (?) Takes_ID, S_ID, Exam_ID, Score, Date_Taken, Grade,
+               CASE WHEN Grade IS NOT NULL OR Date_Taken < DATEADD(HOUR, -?, GETDATE()) THEN 1 ELSE 0 END AS Settled
+        FROM TAKES
+        WHERE Takes_ID > ?
+        ORDER BY Takes_ID
+        """, (self.batch_size, self.SETTLE_HOURS, after_id))
+        if takes.empty:
+            return takes
+
+        # Set-based: one grouped query covers the whole batch
+        counts = fetch_frame(cursor, """
+        SELECT sa.Takes_ID,
+               COUNT(CASE WHEN sa.Selected_Choice_ID IS NOT NULL OR NULLIF(LTRIM(sa.Answer_Text), '') IS NOT NULL THEN 1 END) AS Questions_Attempted,
+               COUNT(CASE WHEN c.is_correct = 1 THEN 1 END) AS Questions_Correct,
+               COUNT(CASE WHEN sa.Selected_Choice_ID IS NOT NULL AND ISNULL(c.is_correct, 0) = 0 THEN 1 END) AS Questions_Incorrect
+        FROM Student_Answer sa
+        LEFT JOIN Choice c ON c.Choice_ID = sa.Selected_Choice_ID AND c.Quest_ID = sa.Quest_ID
+        WHERE sa.Takes_ID BETWEEN ? AND ?
+        GROUP BY sa.Takes_ID
+        """, (int(takes['Takes_ID'].iloc[0]), int(takes['Takes_ID'].iloc[-1])))
+
+        return takes.merge(counts, on='Takes_ID', how='left')
+
+    # ==================== TRANSFORM ====================
+
+    def transform(self, takes):
+        """
+        Measures and surrogate keys for one batch
+
+        Returns:
+            DataFrame: FACT_COLUMNS plus a Ready flag (settled and every key resolved)
+        """
+        exams = self.exams.reindex(takes['Exam_ID'].values)
+        enrollment = self.enrollment.reindex(takes['S_ID'].values)
+
+        score = pd.to_numeric(takes['Score'], errors='coerce').fillna(0).astype(float).values
+        total = pd.to_numeric(pd.Series(exams['Total_marks'].values), errors='coerce').fillna(100).astype(float).values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentage = np.where(total > 0, score / total * 100, 0.0)
+        percentage = np.clip(np.round(percentage, 2), 0, 999.99)
+
+        grade = takes['Grade'].str.strip().str.upper()
+        fact = pd.DataFrame({
+            'Date_Key': date_keys(takes['Date_Taken']).values,
+            'Student_Key': map_keys(takes['S_ID'].values, self.keys['student']).values,
+            'Instructor_Key': map_keys(exams['I_ID'].values, self.keys['instructor']).values,
+            'Course_Key': map_keys(exams['Course_ID'].values, self.keys['course']).values,
+            'Exam_Key': map_keys(takes['Exam_ID'].values, self.keys['exam']).values,
+            'Track_Key': map_keys(enrollment['Track_ID'].values, self.keys['track']).values,
+            'Intake_Key': map_keys(enrollment['Intake_ID'].values, self.keys['intake']).values,
+            'Branch_Key': map_keys(enrollment['Branch_ID'].values, self.keys['branch']).values,
+            'Takes_ID': takes['Takes_ID'].astype(np.int64).values,
+            'Score': np.round(score).astype(np.int64),
+            'Total_Marks': total.astype(np.int64),
+            'Percentage': percentage,
+            'Grade': grade.values,
+            'Grade_Point': grade.map(GRADE_POINTS).values,
+            'Pass_Fail_Flag': percentage >= PASS_PERCENTAGE,
+            'Questions_Attempted': takes['Questions_Attempted'].fillna(0).astype(np.int64).values,
+            'Questions_Correct': takes['Questions_Correct'].fillna(0).astype(np.int64).values,
+            'Questions_Incorrect': takes['Questions_Incorrect'].fillna(0).astype(np.int64).values
+        })
+
+        # Date keys must exist in Dim_Date (FK)
+        known_date = np.isin(fact['Date_Key'].fillna(-1).astype(np.int64).values, self.date_keys)
+        fact.loc[~known_date, 'Date_Key'] = pd.NA
+
+        resolved = fact[list(KEY_COLUMNS)].notna().all(axis=1).values
+        fact['Ready'] = resolved & (takes['Settled'].values == 1)
+        return fact
@@ -0,0 +1,144 @@
+# etl/fact_student_answer.py - Incremental Student_Answer -> Fact_Student_Answer load
+
+from app.database import DatabaseConnection
+from etl.warehouse import (IncrementalFactLoader, load_key_map, load_date_keys, map_keys,
+                           date_keys, fetch_frame)
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+FACT_COLUMNS = (
+    'Date_Key', 'Student_Key', 'Exam_Key', 'Question_Key', 'Course_Key',
+    'Student_Answer_ID', 'Takes_ID', 'Is_Correct', 'Points_Earned', 'Points_Possible'
+)
+
+KEY_COLUMNS = ('Date_Key', 'Student_Key', 'Exam_Key', 'Question_Key', 'Course_Key')
+
+# Exam_Question.marks default (and submit_exam's fallback)
+DEFAULT_MARKS = 1.0
+
+
+def _pack(high, low):
+    """Two int32 ids -> one int64 key, so pair lookups are plain NumPy searches"""
+    return (np.asarray(high, dtype=np.int64) << 32) | np.asarray(low, dtype=np.int64)
+
+
+class StudentAnswerLoader(IncrementalFactLoader):
+    """
+    Appends Student_Answer rows newer than the stage's watermark to Fact_Student_Answer.
+
+    The answer key is held in memory as sorted NumPy arrays:
+    - correct (Quest_ID, Choice_ID) pairs from Choice.is_correct
+    - (Exam_ID, Quest_ID) -> marks from Exam_Question
+
+    so correctness and points for a batch are two vectorized searches. A
+    selected choice is graded like check_mcq_answer; text answers are not
+    auto-graded and keep Is_Correct / Points_Earned NULL. Memory stays at
+    one batch plus the answer key, whatever the size of Student_Answer.
+    """
+
+    STAGE = 'fact_student_answer'
+    FACT_TABLE = 'Fact_Student_Answer'
+    SOURCE_KEY = 'Student_Answer_ID'
+    DATE_COLUMN = 'Submission_Date'
+    FACT_COLUMNS = FACT_COLUMNS
+    BATCH_SIZE = 50000
+
+    def __init__(self, batch_size=None):
+        super().__init__(batch_size)
+        self.correct = None
+        self.mark_keys = None
+        self.mark_values = None
+        self.exam_courses = {}
+        self.keys = {}
+        self.date_keys = None
+
+    # ==================== LOOKUPS ====================
+
+    def load_lookups(self):
+        """Answer key and exam courses from the OLTP side, surrogate keys from the DWH"""
+        with DatabaseConnection.get_cursor() as cursor:
+            choices = fetch_frame(cursor, "SELECT Quest_ID, Choice_ID FROM Choice WHERE is_correct = 1")
+            marks = fetch_frame(cursor, "SELECT Exam_ID, Quest_ID, marks FROM Exam_Question")
+            exams = fetch_frame(cursor, "SELECT Exam_ID, Course_ID FROM Exam")
+
+        self.correct = np.sort(_pack(choices['Quest_ID'], choices['Choice_ID']))
+
+        # A trailing sentinel keeps every searchsorted position inside the arrays
+        keys = _pack(marks['Exam_ID'], marks['Quest_ID'])
+        order = np.argsort(keys)
+        values = pd.to_numeric(marks['marks'], errors='coerce').fillna(DEFAULT_MARKS).to_numpy(float)
+        self.mark_keys = np.append(keys[order], np.iinfo(np.int64).max)
+        self.mark_values = np.append(values[order], DEFAULT_MARKS)
+
+        self.exam_courses = dict(zip(exams['Exam_ID'], exams['Course_ID']))
+        self.keys = {
+            'student': load_key_map('Dim_Student', 'Student_ID', 'Student_Key', current_only=True),
+            'course': load_key_map('Dim_Course', 'Course_ID', 'Course_Key', current_only=True),
+            'exam': load_key_map('Dim_Exam', 'Exam_ID', 'Exam_Key'),
+            'question': load_key_map('Dim_Question', 'Question_ID', 'Question_Key')
+        }
+        self.date_keys = load_date_keys()
+
+        logger.info(f"✓ Answer key: {len(self.correct)} correct choices, {len(self.mark_keys) - 1} exam questions")
+
+    # ==================== EXTRACT ====================
+
+    def extract(self, cursor, after_id):
+        """Next batch of answers after a Student_Answer_ID, with the take's student and exam"""
+        return fetch_frame(cursor, """
+        SELECT TOP (?) sa.Student_Answer_ID, sa.Takes_ID, sa.Quest_ID, sa.Selected_Choice_ID,
+               sa.Submission_Date, t.S_ID, t.Exam_ID
+        FROM Student_Answer sa
+        JOIN TAKES t ON t.Takes_ID = sa.Takes_ID
+        WHERE sa.Student_Answer_ID > ?
+        ORDER BY sa.Student_Answer_ID
+        """, (self.batch_size, after_id))
+
+    # ==================== TRANSFORM ====================
+
+    def transform(self, answers):
+        """
+        Correctness, points and surrogate keys for one batch
+
+        Returns:
+            DataFrame: FACT_COLUMNS plus a Ready flag (every key resolved)
+        """
+        exam = answers['Exam_ID'].to_numpy(np.int64)
+        quest = answers['Quest_ID'].to_numpy(np.int64)
+        choice = pd.to_numeric(answers['Selected_Choice_ID'], errors='coerce')
+        graded = choice.notna().to_numpy()
+
+        # Correct when (question, selected choice) is in the answer key
+        is_correct = np.isin(_pack(quest, choice.fillna(0).to_numpy(np.int64)), self.correct)
+
+        # Marks by binary search; questions missing from Exam_Question count DEFAULT_MARKS
+        wanted = _pack(exam, quest)
+        position = np.searchsorted(self.mark_keys, wanted)
+        possible = np.where(self.mark_keys[position] == wanted, self.mark_values[position], DEFAULT_MARKS)
+        earned = np.where(is_correct, possible, 0.0)
+
+        course = pd.Series(exam).map(self.exam_courses)
+        fact = pd.DataFrame({
+            'Date_Key': date_keys(answers['Submission_Date']).values,
+            'Student_Key': map_keys(answers['S_ID'].values, self.keys['student']).values,
+            'Exam_Key': map_keys(exam, self.keys['exam']).values,
+            'Question_Key': map_keys(quest, self.keys['question']).values,
+            'Course_Key': map_keys(course.values, self.keys['course']).values,
+            'Student_Answer_ID': answers['Student_Answer_ID'].to_numpy(np.int64),
+            'Takes_ID': answers['Takes_ID'].to_numpy(np.int64),
+            'Is_Correct': pd.array(np.where(graded, is_correct, False), dtype='boolean'),
+            'Points_Earned': np.where(graded, earned, np.nan),
+            'Points_Possible': possible
+        })
+        fact.loc[~graded, 'Is_Correct'] = pd.NA
+
+        # Date keys must exist in Dim_Date (FK)
+        known_date = np.isin(fact['Date_Key'].fillna(-1).astype(np.int64).values, self.date_keys)
+        fact.loc[~known_date, 'Date_Key'] = pd.NA
+
+        fact['Ready'] = fact[list(KEY_COLUMNS)].notna().all(axis=1).values
+        return fact
@@ -0,0 +1,259 @@
+# etl/fact_teaching.py - Fact_Teaching aggregates in one grouped pass
+
+from app.database import DatabaseConnection, DWHConnection
+from etl.warehouse import load_key_map, map_keys, fetch_frame, bulk_insert, column_values
+from etl.dimensions import row_hashes
+from etl.fact_exam_performance import PASS_PERCENTAGE
+import time
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+GRAIN = ['I_ID', 'Course_ID', 'Year']
+
+MEASURES = (
+    'Total_Students_Taught', 'Average_Student_Score', 'Pass_Rate', 'Attendance_Rate',
+    'Total_Classes_Scheduled', 'Total_Classes_Conducted'
+)
+
+KEYS = ('Instructor_Key', 'Course_Key', 'Branch_Key', 'Year')
+
+WEEKDAYS = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6}
+
+
+class TeachingFactBuilder:
+    """
+    Rebuilds every instructor / course / year aggregate of Fact_Teaching and
+    writes only the rows that changed.
+
+    Six small extracts (attendance sessions and distinct attendees are
+    pre-grouped in SQL, so Attendance is never pulled row by row) are
+    combined with pandas group-bys:
+
+    - Total_Students_Taught: distinct students who sat an exam or attended
+    - Average_Student_Score / Pass_Rate: graded TAKES of the instructor's exams
+      (percentage of Total_marks; pass at PASS_PERCENTAGE)
+    - Attendance_Rate: share of attendance marks that are present
+    - Total_Classes_Conducted: distinct dates with attendance
+    - Total_Classes_Scheduled: weekly Class_Schedule slots counted over the
+      first-to-last attendance date span
+    - Branch: where most of the instructor's classes for the course were
+      scheduled, else where most of its students are enrolled
+
+    Rows are matched to Fact_Teaching on the business grain (instructor id,
+    course id, year, through the dimensions) and compared by hash, keys
+    included: new rows are inserted, changed ones updated in place (so a new
+    SCD2 version or branch moves the row instead of duplicating it),
+    unchanged ones left alone. Grains whose keys cannot be resolved are
+    skipped and logged.
+    """
+
+    def __init__(self, batch_size=None):
+        self.keys = {}
+
+    # ==================== EXTRACT ====================
+
+    def extract(self):
+        with DatabaseConnection.get_cursor() as cursor:
+            teaching = fetch_frame(cursor, "SELECT I_ID, Course_ID, year AS Year FROM Teaching")
+            takes = fetch_frame(cursor, """
+            SELECT e.I_ID, e.Course_ID, e.year AS Year, t.S_ID,
+                   t.Score * 100.0 / NULLIF(ISNULL(e.Total_marks, 100), 0) AS Percentage
+            FROM TAKES t
+            JOIN Exam e ON e.Exam_ID = t.Exam_ID
+            WHERE t.Grade IS NOT NULL
+            """)
+            sessions = fetch_frame(cursor, """
+            SELECT instructor_id AS I_ID, course_id AS Course_ID, YEAR(attendance_date) AS Year,
+                   attendance_date, COUNT(*) AS Marks, SUM(CAST(is_present AS INT)) AS Present
+            FROM Attendance
+            GROUP BY instructor_id, course_id, YEAR(attendance_date), attendance_date
+            """)
+            attendees = fetch_frame(cursor, """
+            SELECT DISTINCT instructor_id AS I_ID, course_id AS Course_ID, YEAR(attendance_date) AS Year,
+                   student_id AS S_ID
+            FROM Attendance
+            """)
+            schedule = fetch_frame(cursor, """
+            SELECT cs.instructor_id AS I_ID, cs.course_id AS Course_ID, cs.year AS Year,
+                   cs.day_of_week, c.branch_id AS Branch_ID
+            FROM Class_Schedule cs
+            JOIN Classroom c ON c.classroom_id = cs.classroom_id
+            """)
+            # Same student -> branch rule as Fact_Exam_Performance: latest enrollment's intake
+            enrollment = fetch_frame(cursor, """
+            SELECT e.S_ID, b.Branch_ID
+            FROM (
+                SELECT S_ID, Intake_ID,
+                       ROW_NUMBER() OVER (PARTITION BY S_ID ORDER BY Enrollment_date DESC, Intake_ID DESC) AS rn
+                FROM When_Enroll
+            ) e
+            JOIN (SELECT Intake_ID, MIN(Branch_ID) AS Branch_ID FROM Branch_Offered GROUP BY Intake_ID) b
+                ON b.Intake_ID = e.Intake_ID
+            WHERE e.rn = 1
+            """)
+        return teaching, takes, sessions, attendees, schedule, enrollment
+
+    # ==================== TRANSFORM ====================
+
+    def aggregate(self, teaching, takes, sessions, attendees, schedule, enrollment):
+        """
+        Returns:
+            DataFrame: GRAIN + Branch_ID + MEASURES, one row per instructor / course / year
+        """
+        grain = pd.concat([frame[GRAIN] for frame in (teaching, takes, sessions, schedule)]).drop_duplicates()
+
+        takes = takes.assign(Percentage=pd.to_numeric(takes['Percentage'], errors='coerce').astype(float))
+        takes = takes.assign(Passed=takes['Percentage'] >= PASS_PERCENTAGE)
+        exams = takes.groupby(GRAIN).agg(Average_Student_Score=('Percentage', 'mean'),
+                                         Pass_Rate=('Passed', 'mean'))
+        exams['Pass_Rate'] *= 100
+
+        taught = pd.concat([takes[GRAIN + ['S_ID']], attendees[GRAIN + ['S_ID']]]).drop_duplicates()
+        students = taught.groupby(GRAIN).size().rename('Total_Students_Taught')
+
+        sessions = sessions.assign(attendance_date=pd.to_datetime(sessions['attendance_date']))
+        attendance = sessions.groupby(GRAIN).agg(Marks=('Marks', 'sum'), Present=('Present', 'sum'),
+                                                 Total_Classes_Conducted=('attendance_date', 'nunique'),
+                                                 First=('attendance_date', 'min'), Last=('attendance_date', 'max'))
+        attendance['Attendance_Rate'] = attendance['Present'] / attendance['Marks'].where(attendance['Marks'] > 0) * 100
+
+        # Most-scheduled branch per grain; unscheduled grains fall back to
+        # the branch most of their students are enrolled in
+        branch = self._mode_branch(schedule).combine_first(
+            self._mode_branch(taught.merge(enrollment, on='S_ID')))
+
+        fact = (grain.set_index(GRAIN)
+                .join(exams).join(students).join(attendance).join(branch)
+                .reset_index())
+        fact['Total_Classes_Scheduled'] = self._scheduled(fact, schedule)
+        fact['Total_Students_Taught'] = fact['Total_Students_Taught'].fillna(0)
+        fact['Total_Classes_Conducted'] = fact['Total_Classes_Conducted'].fillna(0)
+        for column in ('Average_Student_Score', 'Pass_Rate', 'Attendance_Rate'):
+            fact[column] = fact[column].astype(float).round(2)
+        return fact[GRAIN + ['Branch_ID'] + list(MEASURES)]
+
+    @staticmethod
+    def _mode_branch(frame):
+        """Most frequent Branch_ID per grain (lowest id on ties)"""
+        return (frame.groupby(GRAIN + ['Branch_ID']).size().rename('n').reset_index()
+                .sort_values(['n', 'Branch_ID'], ascending=[False, True])
+                .drop_duplicates(GRAIN).set_index(GRAIN)['Branch_ID'])
+
+    @staticmethod
+    def _scheduled(fact, schedule):
+        """Weekly slots x occurrences of their weekday between the first and last class date"""
+        total = np.zeros(len(fact))
+        has_span = fact['First'].notna().to_numpy()
+        if not has_span.any() or schedule.empty:
+            return np.where(has_span, total, np.nan)
+
+        first = fact['First'].to_numpy('datetime64[D]')
+        last = fact['Last'].to_numpy('datetime64[D]') + np.timedelta64(1, 'D')
+        weekday = schedule['day_of_week'].astype(str).str.strip().str.lower().map(WEEKDAYS)
+        slots = (schedule.assign(weekday=weekday).dropna(subset=['weekday'])
+                 .groupby(GRAIN + ['weekday']).size().rename('slots').reset_index())
+
+        index = pd.MultiIndex.from_frame(fact[GRAIN])
+        for day, per_day in slots.groupby('weekday'):
+            counts = per_day.set_index(GRAIN)['slots'].reindex(index).fillna(0).to_numpy()
+            mask = [0] * 7
+            mask[int(day)] = 1
+            # One vectorized busday_count per weekday covers every grain row
+            occurrences = np.zeros(len(fact))
+            occurrences[has_span] = np.busday_count(first[has_span], last[has_span], weekmask=mask)
+            total += counts * occurrences
+        return np.where(has_span, total, np.nan)
+
+    # ==================== LOAD ====================
+
+    def run(self):
+        """
+        Returns:
+            dict: Counts and timing
+        """
+        start = time.time()
+        fact = self.aggregate(*self.extract())
+
+        self.keys = {
+            'instructor': load_key_map('Dim_Instructor', 'Instructor_ID', 'Instructor_Key', current_only=True),
+            'course': load_key_map('Dim_Course', 'Course_ID', 'Course_Key', current_only=True),
+            'branch': load_key_map('Dim_Branch', 'Branch_ID', 'Branch_Key')
+        }
+        fact['Instructor_Key'] = map_keys(fact['I_ID'].values, self.keys['instructor']).values
+        fact['Course_Key'] = map_keys(fact['Course_ID'].values, self.keys['course']).values
+        fact['Branch_Key'] = map_keys(fact['Branch_ID'].values, self.keys['branch']).values
+        resolved = fact[list(KEYS)].notna().all(axis=1)
+        unresolved = int((~resolved).sum())
+        if unresolved:
+            dropped = fact.loc[~resolved, GRAIN + ['Branch_ID']]
+            logger.warning(f"⚠️ Fact_Teaching: {unresolved} instructor/course/year rows without instructor, course "
+                           f"or branch keys skipped, e.g. {dropped.head(10).to_dict('records')}")
+        fact = fact[resolved]
+
+        conn = DWHConnection.get_connection()
+        try:
+            cursor = conn.cursor()
+            existing = fetch_frame(cursor, f"""
+            SELECT t.Teaching_Key, i.Instructor_ID AS I_ID, c.Course_ID, {', '.join('t.' + k for k in KEYS + MEASURES)}
+            FROM Fact_Teaching t
+            JOIN Dim_Instructor i ON i.Instructor_Key = t.Instructor_Key
+            JOIN Dim_Course c ON c.Course_Key = t.Course_Key
+            """)
+            for column in MEASURES:
+                existing[column] = pd.to_numeric(existing[column], errors='coerce').astype(float)
+
+            # Matched on the business grain: a new SCD2 instructor/course version or a
+            # different branch updates the row's keys in place instead of adding a row
+            existing = existing.astype({c: 'int64' for c in GRAIN}).sort_values('Teaching_Key')
+            duplicates = existing.duplicated(GRAIN, keep='last')
+            stale = existing.loc[duplicates, 'Teaching_Key'].tolist()
+            existing = existing[~duplicates]
+            fact = fact.astype({c: 'int64' for c in GRAIN})
+
+            matched = fact.merge(existing[['Teaching_Key'] + GRAIN], on=GRAIN, how='left')
+            new = matched['Teaching_Key'].isna().to_numpy()
+
+            compared = list(KEYS + MEASURES)
+            stored = existing.set_index('Teaching_Key').reindex(matched.loc[~new, 'Teaching_Key'].astype('int64'))
+            changed = np.zeros(len(matched), dtype=bool)
+            changed[~new] = (row_hashes(matched[~new], compared).to_numpy()
+                             != row_hashes(stored, compared).to_numpy())
+
+            # Extra rows for one grain (left by a key change) are double counts
+            if stale:
+                cursor.fast_executemany = True
+                cursor.executemany("DELETE FROM Fact_Teaching WHERE Teaching_Key = ?", [(int(k),) for k in stale])
+
+            bulk_insert(cursor, 'Fact_Teaching', KEYS + MEASURES, matched[new])
+            updates = matched[changed]
+            if len(updates):
+                cursor.fast_executemany = True
+                assignments = ', '.join(f"{c} = ?" for c in compared)
+                values = [column_values(updates, c) for c in compared + ['Teaching_Key']]
+                cursor.executemany(f"UPDATE Fact_Teaching SET {assignments}, ETL_Load_Date = SYSDATETIME() "
+                                   f"WHERE Teaching_Key = ?", list(zip(*values)))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        elapsed = time.time() - start
+        summary = {
+            'read': len(fact) + unresolved,
+            'loaded': int(new.sum()) + len(updates),
+            'inserted': int(new.sum()),
+            'updated': len(updates),
+            'removed': len(stale),
+            'unchanged': int((~new & ~changed).sum()),
+            'unresolved': unresolved,
+            'seconds': round(elapsed, 2),
+            'rows_per_second': int((len(fact) + unresolved) / elapsed) if elapsed else 0
+        }
+        logger.info(f"✓ Fact_Teaching: {summary}")
+        return summary
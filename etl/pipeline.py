@@ -0,0 +1,197 @@
+# etl/pipeline.py - Warehouse load DAG: parallel stages, run log, resume
+
+from app.database import DWHConnection
+from etl.dim_date import DateDimensionLoader
+from etl.dimensions import DIMENSIONS, DimensionSync
+from etl.fact_exam_performance import ExamPerformanceLoader
+from etl.fact_student_answer import StudentAnswerLoader
+from etl.fact_teaching import TeachingFactBuilder
+from etl.export_parquet import EXPORTS, ParquetExporter
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+import datetime
+import os
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# factory(batch_size=...) returns a loader whose run() returns a summary dict
+Stage = namedtuple('Stage', ['name', 'factory', 'depends_on'])
+
+STAGES = [Stage('dim_date', DateDimensionLoader, ())]
+STAGES += [Stage(table.lower(), partial(DimensionSync, table), ()) for table in DIMENSIONS]
+STAGES += [
+    Stage('fact_exam_performance', ExamPerformanceLoader,
+          ('dim_date', 'dim_student', 'dim_instructor', 'dim_course', 'dim_exam',
+           'dim_track', 'dim_intake', 'dim_branch')),
+    Stage('fact_student_answer', StudentAnswerLoader,
+          ('dim_date', 'dim_student', 'dim_exam', 'dim_question', 'dim_course')),
+    Stage('fact_teaching', TeachingFactBuilder, ('dim_instructor', 'dim_course', 'dim_branch'))
+]
+# Parquet exports follow the fact load of the same table (Fact_Attendance has none here)
+STAGES += [Stage(f"export_{table.lower()}", partial(ParquetExporter, table),
+                 tuple(s.name for s in STAGES if s.name == table.lower())) for table in EXPORTS]
+
+
+# ==================== RUN LOG ====================
+
+# One row per stage per run; the latest run's rows drive --resume
+LOG_DDL = """
+IF OBJECT_ID('dbo.ETL_Log') IS NULL
+BEGIN
+    CREATE TABLE dbo.ETL_Log (
+        Log_ID BIGINT IDENTITY(1,1) PRIMARY KEY,
+        Run_ID VARCHAR(36) NOT NULL,
+        Stage_Name VARCHAR(100) NOT NULL,
+        Status VARCHAR(20) NOT NULL,
+        Started_At DATETIME2 NULL,
+        Finished_At DATETIME2 NULL,
+        Rows_Read BIGINT NULL,
+        Rows_Written BIGINT NULL,
+        Duration_Seconds DECIMAL(10, 2) NULL,
+        Rows_Per_Second INT NULL,
+        Error_Message NVARCHAR(2000) NULL
+    );
+END
+"""
+
+
+class Pipeline:
+    """
+    Runs load stages as a DAG.
+
+    - a stage starts as soon as every stage it depends on has succeeded;
+      independent stages run side by side on ETL_WORKERS threads (default 4)
+    - each stage is logged to ETL_Log with its duration and rows/sec
+    - a failed stage does not stop independent branches; its dependents are skipped
+    - resume=True continues the latest run: stages that already succeeded
+      in it are not run again. Fact stages commit their watermark per batch,
+      so a resumed fact load continues from its last committed batch
+    """
+
+    def __init__(self, stages=None, workers=None, batch_size=None):
+        self.stages = {stage.name: stage for stage in (stages or STAGES)}
+        self.workers = workers or int(os.getenv('ETL_WORKERS', '4'))
+        self.batch_size = batch_size
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Stage dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dependency in self.stages[name].depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage {name} depends on unknown stage {dependency}")
+                visit(dependency, path + [name])
+            state[name] = 'done'
+
+        for name in self.stages:
+            visit(name, [])
+
+    # ==================== RUN LOG ====================
+
+    @staticmethod
+    def _log(run_id, name, status, started=None, summary=None, error=None):
+        summary = summary or {}
+        try:
+            DWHConnection.execute_query("""
+            INSERT INTO ETL_Log (Run_ID, Stage_Name, Status, Started_At, Finished_At, Rows_Read, Rows_Written,
+                                 Duration_Seconds, Rows_Per_Second, Error_Message)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (run_id, name, status, started, datetime.datetime.now(), summary.get('read'), summary.get('loaded'),
+                  summary.get('seconds'), summary.get('rows_per_second'), str(error)[:2000] if error else None))
+        except Exception as e:
+            logger.warning(f"ETL_Log write failed: {str(e)}")
+
+    @staticmethod
+    def last_run():
+        """
+        Returns:
+            tuple: (run_id, names of the stages that succeeded in it) - (None, set()) if none
+        """
+        row = DWHConnection.fetch_one("SELECT TOP 1 Run_ID FROM ETL_Log ORDER BY Log_ID DESC")
+        if not row:
+            return None, set()
+        rows = DWHConnection.fetch_all("SELECT Stage_Name FROM ETL_Log WHERE Run_ID = ? AND Status = 'succeeded'", (row[0],))
+        return row[0], {r[0] for r in rows}
+
+    # ==================== SCHEDULER ====================
+
+    def _run_stage(self, run_id, name):
+        started = datetime.datetime.now()
+        summary = self.stages[name].factory(batch_size=self.batch_size).run()
+        self._log(run_id, name, 'succeeded', started, summary)
+        return summary
+
+    def run(self, selected=None, resume=False):
+        """
+        Run the selected stages (default: all) in dependency order
+
+        Dependencies outside the selection are assumed to be loaded already.
+
+        Returns:
+            dict: run_id, seconds, and per stage: status (succeeded / failed / skipped / resumed), summary, error
+        """
+        DWHConnection.execute_query(LOG_DDL)
+        wanted = set(selected or self.stages)
+
+        done = set()
+        run_id = None
+        if resume:
+            run_id, done = self.last_run()
+            done &= wanted
+        run_id = run_id or str(uuid.uuid4())
+
+        results = {name: {'status': 'resumed', 'summary': None, 'error': None} for name in done}
+        pending = {name for name in wanted if name not in done}
+        failed = set()
+        start = time.time()
+        logger.info(f"🏭 ETL run {run_id}: {len(pending)} stages, {self.workers} workers")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='etl') as pool:
+            running = {}
+            while pending or running:
+                # Dependents of a failed stage are skipped, and theirs in turn
+                blocked = [name for name in pending if any(d in failed for d in self.stages[name].depends_on)]
+                while blocked:
+                    for name in blocked:
+                        pending.discard(name)
+                        failed.add(name)
+                        results[name] = {'status': 'skipped', 'summary': None, 'error': 'dependency failed'}
+                        self._log(run_id, name, 'skipped', error='dependency failed')
+                    blocked = [name for name in pending if any(d in failed for d in self.stages[name].depends_on)]
+
+                ready = [name for name in sorted(pending)
+                         if all(d in done or d not in wanted for d in self.stages[name].depends_on)]
+                for name in ready:
+                    pending.discard(name)
+                    running[pool.submit(self._run_stage, run_id, name)] = name
+                    logger.info(f"▶ {name}")
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        summary = future.result()
+                        done.add(name)
+                        results[name] = {'status': 'succeeded', 'summary': summary, 'error': None}
+                        logger.info(f"✓ {name}: {summary.get('seconds')}s, {summary.get('rows_per_second')} rows/s")
+                    except Exception as e:
+                        failed.add(name)
+                        results[name] = {'status': 'failed', 'summary': None, 'error': str(e)}
+                        self._log(run_id, name, 'failed', error=e)
+                        logger.error(f"❌ {name} failed: {str(e)}")
+
+        return {'run_id': run_id, 'seconds': round(time.time() - start, 2), 'stages': results}
@@ -0,0 +1,343 @@
+# etl/warehouse.py - Shared DWH plumbing: watermarks, dimension key maps, bulk inserts
+
+from app.database import DatabaseConnection, DWHConnection
+from abc import ABC, abstractmethod
+import os
+import time
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== WATERMARKS ====================
+
+# One row per ETL stage: the highest source key / date it has fully loaded
+WATERMARK_DDL = """
+IF OBJECT_ID('dbo.ETL_Watermark') IS NULL
+BEGIN
+    CREATE TABLE dbo.ETL_Watermark (
+        Stage_Name VARCHAR(100) NOT NULL PRIMARY KEY,
+        Last_Key BIGINT NULL,
+        Last_Date DATETIME2 NULL,
+        Rows_Loaded BIGINT NOT NULL DEFAULT 0,
+        Updated_Date DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+    );
+END
+"""
+
+_watermark_table_checked = False
+
+
+def ensure_watermark_table():
+    global _watermark_table_checked
+    if not _watermark_table_checked:
+        DWHConnection.execute_query(WATERMARK_DDL)
+        _watermark_table_checked = True
+
+
+def get_watermark(stage):
+    """
+    Returns:
+        tuple: (last_key, last_date) - (0, None) for a stage that never ran
+    """
+    ensure_watermark_table()
+    # Read on a raising cursor: a failed read must fail the stage, not look like "never ran"
+    rows = read_frame("SELECT Last_Key, Last_Date FROM ETL_Watermark WHERE Stage_Name = ?", (stage,))
+    if rows.empty:
+        return 0, None
+    last_key, last_date = rows.iloc[0]
+    return (0 if pd.isna(last_key) else int(last_key)), (None if pd.isna(last_date) else pd.Timestamp(last_date).to_pydatetime())
+
+
+def save_watermark(cursor, stage, last_key, last_date, rows_loaded):
+    """
+    Move a stage's watermark forward on the caller's cursor, so it commits
+    in the same transaction as the rows it covers
+    """
+    cursor.execute("""
+    MERGE ETL_Watermark AS target
+    USING (SELECT ? AS Stage_Name) AS source ON target.Stage_Name = source.Stage_Name
+    WHEN MATCHED THEN
+        UPDATE SET Last_Key = ?, Last_Date = ?, Rows_Loaded = target.Rows_Loaded + ?, Updated_Date = SYSDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (Stage_Name, Last_Key, Last_Date, Rows_Loaded) VALUES (?, ?, ?, ?);
+    """, (stage, last_key, last_date, rows_loaded, stage, last_key, last_date, rows_loaded))
+
+
+# ==================== HELD-BACK ROWS ====================
+
+# Source rows a fact stage could not load yet. 'held' rows keep the
+# watermark behind them; after ETL_MAX_HOLD_HOURS they become 'rejected'
+# and the watermark moves past them (reload them by hand once fixed)
+REJECT_DDL = """
+IF OBJECT_ID('dbo.ETL_Reject') IS NULL
+BEGIN
+    CREATE TABLE dbo.ETL_Reject (
+        Stage_Name VARCHAR(100) NOT NULL,
+        Source_Key BIGINT NOT NULL,
+        Status VARCHAR(20) NOT NULL,
+        Reason NVARCHAR(400) NULL,
+        Attempts INT NOT NULL DEFAULT 1,
+        First_Held DATETIME2 NOT NULL DEFAULT SYSDATETIME(),
+        Last_Held DATETIME2 NOT NULL DEFAULT SYSDATETIME(),
+        PRIMARY KEY (Stage_Name, Source_Key)
+    );
+END
+"""
+
+_reject_table_checked = False
+
+
+def ensure_reject_table():
+    global _reject_table_checked
+    if not _reject_table_checked:
+        DWHConnection.execute_query(REJECT_DDL)
+        _reject_table_checked = True
+
+
+def save_held(cursor, stage, held):
+    """
+    Record held-back rows on the caller's cursor (same transaction as the batch)
+
+    Args:
+        held (DataFrame): Source_Key, Status ('held' / 'rejected'), Reason
+    """
+    if not len(held):
+        return
+    cursor.fast_executemany = True
+    cursor.executemany("""
+    MERGE ETL_Reject AS target
+    USING (SELECT ? AS Stage_Name, ? AS Source_Key) AS source
+        ON target.Stage_Name = source.Stage_Name AND target.Source_Key = source.Source_Key
+    WHEN MATCHED THEN
+        UPDATE SET Status = ?, Reason = ?, Attempts = target.Attempts + 1, Last_Held = SYSDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (Stage_Name, Source_Key, Status, Reason) VALUES (source.Stage_Name, source.Source_Key, ?, ?);
+    """, [(stage, key, status, reason, status, reason)
+          for key, status, reason in zip(held['Source_Key'].tolist(), held['Status'].tolist(), held['Reason'].tolist())])
+
+
+def release_held(cursor, stage, keys):
+    """Forget held rows that have now been loaded"""
+    if not len(keys):
+        return
+    cursor.fast_executemany = True
+    cursor.executemany("DELETE FROM ETL_Reject WHERE Stage_Name = ? AND Source_Key = ? AND Status = 'held'",
+                       [(stage, key) for key in keys])
+
+
+# ==================== DIMENSION KEYS ====================
+
+def load_key_map(table, business_key, surrogate_key, current_only=False):
+    """
+    Business key -> surrogate key for a whole dimension, read once per run
+
+    SCD2 dimensions pass current_only=True to map to the current version.
+    """
+    query = f"SELECT {business_key}, {surrogate_key} FROM {table}"
+    if current_only:
+        query += " WHERE Is_Current = 1"
+    keys = read_frame(query)
+    return dict(zip(keys[business_key].tolist(), keys[surrogate_key].tolist()))
+
+
+def map_keys(values, key_map):
+    """Vectorized lookup: a Series of business keys -> nullable Int64 surrogate keys"""
+    return pd.Series(values).map(key_map).astype('Int64')
+
+
+def load_date_keys():
+    """Every Date_Key in Dim_Date, sorted, for np.isin checks"""
+    return np.sort(read_frame("SELECT Date_Key FROM Dim_Date")['Date_Key'].to_numpy(np.int64))
+
+
+def date_keys(dates):
+    """Datetimes -> Dim_Date keys (YYYYMMDD), nullable"""
+    dates = pd.to_datetime(pd.Series(dates))
+    keys = dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day
+    return keys.astype('Int64')
+
+
+# ==================== EXTRACT / LOAD ====================
+
+def fetch_frame(cursor, query, params=()):
+    """Run a query on the caller's cursor and return the result as a DataFrame"""
+    cursor.execute(query, params)
+    columns = [c[0] for c in cursor.description]
+    return pd.DataFrame.from_records([tuple(row) for row in cursor.fetchall()], columns=columns)
+
+
+def read_frame(query, params=()):
+    """
+    A DWH query as a DataFrame on its own connection
+
+    Unlike DWHConnection.fetch_all, errors raise instead of returning no rows,
+    so ETL state (watermarks, loaded keys, key maps) is never silently empty.
+    """
+    with DWHConnection.get_cursor() as cursor:
+        return fetch_frame(cursor, query, params)
+
+
+def column_values(frame, column):
+    """A column as plain Python values for pyodbc: NaN / NA -> None, integral floats -> int"""
+    series = frame[column]
+    if series.dtype.kind == 'f' and (series.dropna() % 1 == 0).all():
+        series = series.astype('Int64')
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def bulk_insert(cursor, table, columns, frame):
+    """Append a DataFrame's columns to a table in one fast_executemany round trip"""
+    if not len(frame):
+        return 0
+    cursor.fast_executemany = True
+    placeholders = ', '.join('?' * len(columns))
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    values = [column_values(frame, c) for c in columns]
+    cursor.executemany(query, list(zip(*values)))
+    return len(frame)
+
+
+# ==================== INCREMENTAL FACT LOADS ====================
+
+class IncrementalFactLoader(ABC):
+    """
+    Base for fact loads that append source rows newer than a watermark.
+
+    Subclasses set STAGE, FACT_TABLE, SOURCE_KEY (an increasing source id),
+    DATE_COLUMN, FACT_COLUMNS and implement:
+
+    - load_lookups(): dimension maps, once per run
+    - extract(cursor, after_id): next batch of source rows (SOURCE_KEY order)
+    - transform(batch): FACT_COLUMNS plus a boolean Ready column
+
+    Rows that are not Ready (e.g. a dimension row not loaded yet) are held
+    back: the watermark stops before the first one so the next run retries
+    it, and rows loaded past it are skipped then. Held rows are tracked in
+    ETL_Reject; one still unresolved MAX_HOLD_HOURS after it was first held
+    is marked rejected there and no longer stops the watermark, so a row
+    that can never resolve does not make every later run rescan. Each batch
+    is one bulk insert committed together with the watermark.
+    """
+
+    STAGE = None
+    FACT_TABLE = None
+    SOURCE_KEY = None
+    DATE_COLUMN = None
+    FACT_COLUMNS = ()
+    BATCH_SIZE = 5000
+    MAX_HOLD_HOURS = float(os.getenv('ETL_MAX_HOLD_HOURS', '72'))
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self._lookups_loaded = False
+
+    @abstractmethod
+    def load_lookups(self):
+        """Dimension maps and other lookups, once per run"""
+
+    @abstractmethod
+    def extract(self, cursor, after_id):
+        """Next batch of source rows after after_id, in SOURCE_KEY order (empty when done)"""
+
+    @abstractmethod
+    def transform(self, batch):
+        """FACT_COLUMNS plus a boolean Ready column for one batch"""
+
+    def held_rows(self, fact, expired):
+        """ETL_Reject rows for not-Ready facts: the unresolved key columns are the reason"""
+        keys = [c for c in self.FACT_COLUMNS if c.endswith('_Key')]
+        missing = fact[keys].isna()
+        return pd.DataFrame({
+            'Source_Key': fact[self.SOURCE_KEY].astype('int64').values,
+            'Status': np.where(expired, 'rejected', 'held'),
+            'Reason': ['missing ' + ', '.join(missing.columns[row]) if row.any() else 'not settled'
+                       for row in missing.to_numpy()]
+        })
+
+    def run(self):
+        """
+        Load every source row after the watermark
+
+        Returns:
+            dict: Counts, watermark and timing for the run
+        """
+        start = time.time()
+        watermark, last_date = get_watermark(self.STAGE)
+        if not self._lookups_loaded:
+            self.load_lookups()
+            self._lookups_loaded = True
+
+        # Rows after the watermark loaded by an earlier run (behind a held-back row)
+        loaded = set(read_frame(f"SELECT {self.SOURCE_KEY} FROM {self.FACT_TABLE} WHERE {self.SOURCE_KEY} > ?",
+                                (watermark,))[self.SOURCE_KEY].tolist())
+
+        # Rows held back by earlier runs and when they were first held
+        ensure_reject_table()
+        held_rows = read_frame("SELECT Source_Key, First_Held FROM ETL_Reject WHERE Stage_Name = ? AND Source_Key > ?",
+                               (self.STAGE, watermark))
+        first_held = pd.Series(pd.to_datetime(held_rows['First_Held']).values, index=held_rows['Source_Key'].astype('int64'))
+        cutoff = pd.Timestamp.now() - pd.Timedelta(hours=self.MAX_HOLD_HOURS)
+
+        summary = {'read': 0, 'loaded': 0, 'held_back': 0, 'rejected': 0, 'start_watermark': watermark}
+        source = DatabaseConnection.get_connection()
+        target = DWHConnection.get_connection()
+        held = False
+        try:
+            source_cursor = source.cursor()
+            target_cursor = target.cursor()
+            position = watermark
+
+            while True:
+                batch = self.extract(source_cursor, position)
+                if batch.empty:
+                    break
+                summary['read'] += len(batch)
+                position = int(batch[self.SOURCE_KEY].iloc[-1])
+
+                fact = self.transform(batch)
+                ready = fact['Ready'].values
+                source_keys = fact[self.SOURCE_KEY].to_numpy(np.int64)
+                new = ~fact[self.SOURCE_KEY].isin(loaded).values
+                inserted = bulk_insert(target_cursor, self.FACT_TABLE, self.FACT_COLUMNS, fact[ready & new])
+
+                # Held past MAX_HOLD_HOURS: rejected, no longer blocks the watermark
+                since = first_held.reindex(source_keys).to_numpy()
+                expired = ~ready & (pd.notna(since) & (since < cutoff.to_datetime64()))
+                save_held(target_cursor, self.STAGE, self.held_rows(fact[~ready], expired[~ready]))
+                release_held(target_cursor, self.STAGE, source_keys[ready & np.isin(source_keys, first_held.index)].tolist())
+                blocking = ~ready & ~expired
+
+                # The watermark only covers the unbroken run of loaded (or rejected) rows
+                if not held:
+                    if not blocking.any():
+                        watermark = position
+                    else:
+                        watermark = max(watermark, int(source_keys[blocking][0]) - 1)
+                        held = True
+                    dates = batch.loc[batch[self.SOURCE_KEY] <= watermark, self.DATE_COLUMN].dropna()
+                    if len(dates):
+                        last_date = pd.Timestamp(dates.max()).to_pydatetime()
+
+                save_watermark(target_cursor, self.STAGE, watermark, last_date, inserted)
+                target.commit()
+
+                summary['loaded'] += inserted
+                summary['held_back'] += int(blocking.sum())
+                summary['rejected'] += int(expired.sum())
+                logger.info(f"⏳ {self.FACT_TABLE}: {summary['read']} read, {summary['loaded']} loaded, "
+                            f"{summary['held_back']} held back, {summary['rejected']} rejected")
+        except Exception:
+            target.rollback()
+            raise
+        finally:
+            source.close()
+            target.close()
+
+        elapsed = time.time() - start
+        summary['watermark'] = watermark
+        summary['seconds'] = round(elapsed, 2)
+        summary['rows_per_second'] = int(summary['read'] / elapsed) if elapsed else 0
+        return summary
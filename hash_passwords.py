@@ -1,18 +1,30 @@
-from werkzeug.security import generate_password_hash
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import bcrypt
 from app.database import DatabaseConnection
+from app.utils.security import PasswordHelper
+
+def _hash_batch(batch, rounds):
+    """Worker: hash (ID, Email) pairs, default password = email"""
+    return [
+        (bcrypt.hashpw(email.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8'), user_id)
+        for user_id, email in batch
+    ]
+
+def hash_all_passwords(batch_size=200, workers=None):
+    """Hash passwords for every user that has none yet (safe to re-run after an interruption)"""
 
-def hash_all_passwords():
-    """Hash all existing passwords in the database"""
-    
     print("\n" + "="*60)
     print("🔐 Starting Password Hashing Process...")
     print("="*60 + "\n")
-    
+
     # First, add Password column if it doesn't exist
     try:
         query_add_column = """
-        IF NOT EXISTS (SELECT * FROM sys.columns 
-                      WHERE object_id = OBJECT_ID('Person') 
+        IF NOT EXISTS (SELECT * FROM sys.columns
+                      WHERE object_id = OBJECT_ID('Person')
                       AND name = 'Password')
         BEGIN
             ALTER TABLE Person ADD Password NVARCHAR(255);
@@ -22,49 +34,85 @@ def hash_all_passwords():
         print("✅ Password column checked/added successfully\n")
     except Exception as e:
         print(f"ℹ️  Column already exists or error: {e}\n")
-    
-    # Get all users
-    query_users = "SELECT ID, Email FROM Person"
-    users = DatabaseConnection.fetch_all(query_users)
-    
-    if not users:
-        print("❌ No users found!")
+
+    # Users hashed by an earlier (interrupted) run are skipped
+    pending_filter = "Password IS NULL AND Email IS NOT NULL"
+    total = DatabaseConnection.execute_scalar(f"SELECT COUNT(*) FROM Person WHERE {pending_filter}") or 0
+
+    if not total:
+        print("✅ Every user already has a password - nothing to do")
         return
-    
-    print(f"Found {len(users)} users. Hashing passwords...\n")
-    
-    # Hash passwords (using email as default password)
-    success_count = 0
-    for user in users:
-        user_id = user[0]
-        email = user[1]
-        
-        try:
-            # Generate hash (default password = email)
-            hashed_password = generate_password_hash(email)
-            
-            # Update database
-            update_query = "UPDATE Person SET Password = ? WHERE ID = ?"
-            DatabaseConnection.execute_query(update_query, (hashed_password, user_id))
-            
-            print(f"✅ User {user_id}: {email} - Password hashed")
-            success_count += 1
-            
-        except Exception as e:
-            print(f"❌ User {user_id}: {email} - Error: {e}")
-    
-    print("\n" + "="*60)
+
+    workers = workers or os.cpu_count() or 1
+    rounds = PasswordHelper.rounds()
+    print(f"Found {total} users without a password.")
+    print(f"Hashing with {workers} processes, bcrypt cost {rounds}, batches of {batch_size}...\n")
+
+    reader_conn = DatabaseConnection.get_connection()
+    writer_conn = DatabaseConnection.get_connection()
+    reader = reader_conn.cursor()
+    writer = writer_conn.cursor()
+    writer.fast_executemany = True
+
+    update_query = "UPDATE Person SET Password = ? WHERE ID = ? AND Password IS NULL"
+    done = 0
+    start = time.time()
+
+    try:
+        reader.execute(f"SELECT ID, Email FROM Person WHERE {pending_filter} ORDER BY ID")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = set()
+            exhausted = False
+
+            while in_flight or not exhausted:
+                # Keep every process busy, without reading the whole table ahead
+                while not exhausted and len(in_flight) < workers * 2:
+                    batch = reader.fetchmany(batch_size)
+                    if not batch:
+                        exhausted = True
+                        break
+                    in_flight.add(pool.submit(_hash_batch, [tuple(row) for row in batch], rounds))
+
+                if not in_flight:
+                    break
+
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    rows = future.result()
+                    writer.executemany(update_query, rows)
+                    # Commit per batch so an interrupted run keeps its progress
+                    writer_conn.commit()
+                    done += len(rows)
+
+                elapsed = time.time() - start
+                rate = done / elapsed if elapsed else 0
+                print(f"\r⏳ {done}/{total} ({done * 100 // total}%) - {rate:.0f} users/s", end='', flush=True)
+    finally:
+        reader.close()
+        writer.close()
+        reader_conn.close()
+        writer_conn.close()
+
+    print("\n\n" + "="*60)
     print(f"✅ Password hashing completed!")
-    print(f"   Success: {success_count}/{len(users)} users")
+    print(f"   Success: {done}/{total} users in {time.time() - start:.1f}s")
     print("="*60 + "\n")
-    
+
     print("ℹ️  Default passwords are set to user's email address")
     print("   Example: If email is 'test@iti.com', password is 'test@iti.com'")
     print("\n")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Provision hashed default passwords for all users')
+    parser.add_argument('--batch-size', type=int, default=200, help='Users per hashing batch / UPDATE round trip')
+    parser.add_argument('--workers', type=int, default=None, help='Hashing processes (default: CPU count)')
+    args = parser.parse_args()
+
     try:
-        hash_all_passwords()
+        hash_all_passwords(args.batch_size, args.workers)
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Interrupted - committed batches are kept, re-run to continue")
     except Exception as e:
         print(f"\n❌ Fatal error: {e}")
         import traceback
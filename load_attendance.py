@@ -0,0 +1,41 @@
+import argparse
+from etl.attendance import AttendanceLoader
+
+def load_attendance(paths, reject_path=None, chunk_size=None, dry_run=False):
+    """Validate and bulk-load attendance files (CSV or Excel)"""
+    
+    print("\n" + "="*60)
+    print("🗓️  Starting Attendance ETL...")
+    print("="*60 + "\n")
+    
+    loader = AttendanceLoader(chunk_size=chunk_size)
+    loader.load_lookups()
+    
+    for path in paths:
+        summary = loader.run(path, reject_path=reject_path, dry_run=dry_run)
+        print(f"✅ {path}: {summary['read']} read | {summary['loaded']} loaded | {summary['rejected']} rejected")
+        print(f"   {summary['seconds']}s ({summary['rows_per_minute']} rows/min)")
+        if summary['reject_file']:
+            print(f"   ⚠️  Rejects written to {summary['reject_file']}")
+    
+    print("\n" + "="*60)
+    if dry_run:
+        print("ℹ️  Dry run - nothing written to Attendance")
+    else:
+        print("✅ Attendance ETL completed!")
+    print("="*60 + "\n")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load attendance files into the Attendance table')
+    parser.add_argument('paths', nargs='+', help='CSV or Excel files with Student_ID, Course_ID, Date, Status')
+    parser.add_argument('--rejects', default=None, help='Reject file (default: <input>.rejects.csv)')
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true', help='Validate only, write rejects but no rows')
+    args = parser.parse_args()
+    
+    try:
+        load_attendance(args.paths, args.rejects, args.chunk_size, args.dry_run)
+    except Exception as e:
+        print(f"\n❌ Fatal error: {e}")
+        import traceback
+        traceback.print_exc()
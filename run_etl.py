@@ -0,0 +1,59 @@
+import argparse
+import sys
+from etl.pipeline import Pipeline, STAGES
+
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+def run_etl(stages=None, batch_size=None, workers=None, resume=False):
+    """Run the warehouse load DAG and print per-stage metrics"""
+
+    print("\n" + "="*60)
+    print("🏭 Starting Warehouse ETL...")
+    print("="*60 + "\n")
+
+    pipeline = Pipeline(workers=workers, batch_size=batch_size)
+    result = pipeline.run(stages, resume=resume)
+
+    print(f"Run {result['run_id']} ({pipeline.workers} workers)\n")
+    print(f"{'Stage':<30}{'Status':<11}{'Read':>10}{'Written':>10}{'Seconds':>9}{'Rows/s':>10}")
+    print("-"*80)
+    failed = 0
+    for name in STAGE_NAMES:
+        if name not in result['stages']:
+            continue
+        stage = result['stages'][name]
+        summary = stage['summary'] or {}
+        print(f"{name:<30}{stage['status']:<11}{summary.get('read', ''):>10}{summary.get('loaded', ''):>10}"
+              f"{summary.get('seconds', ''):>9}{summary.get('rows_per_second', ''):>10}")
+        if stage['status'] == 'failed':
+            failed += 1
+            print(f"   ❌ {stage['error']}")
+
+    print("\n" + "="*60)
+    if failed:
+        print(f"❌ {failed} stage(s) failed after {result['seconds']}s - fix and re-run with --resume")
+    else:
+        print(f"✅ Warehouse ETL completed in {result['seconds']}s!")
+    print("="*60 + "\n")
+    return not failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incremental loads into the ITI_Examination_System_DWH warehouse')
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help=f"Stages to run (default: all): {', '.join(STAGE_NAMES)}")
+    parser.add_argument('--batch-size', type=int, default=None, help='Source rows per batch')
+    parser.add_argument('--workers', type=int, default=None, help='Stages run in parallel (default: ETL_WORKERS or 4)')
+    parser.add_argument('--resume', action='store_true', help='Continue the last run, skipping stages that succeeded')
+    args = parser.parse_args()
+    unknown = [s for s in args.stages if s not in STAGE_NAMES]
+    if unknown:
+        parser.error(f"unknown stage: {', '.join(unknown)}")
+
+    try:
+        ok = run_etl(args.stages or None, args.batch_size, args.workers, args.resume)
+        sys.exit(0 if ok else 1)
+    except Exception as e:
+        print(f"\n❌ Fatal error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)